@@ -0,0 +1,286 @@
+"""
+Offline load test of the API against recorded upstream fixtures.
+
+Every upstream (yfinance, Binance, CoinGecko, NewsAPI, Azure and GitHub
+Models) is replayed from a fixture directory with its typical latency injected
+(services.fixtures), so runs need no network or keys and are comparable across
+commits. The app runs in-process with its lifespan, behind httpx's ASGI
+transport. Each endpoint is hit at several concurrency levels; p50/p95/p99
+latency, requests per second and errors are printed and saved as JSON under
+benchmarks/results/ (named after the commit) for comparison.
+
+Without a fixture directory, synthetic fixtures are generated first. With
+--record, the endpoints are called once against the real upstreams (keys from
+.env) to record fresh fixtures instead.
+
+    python -m benchmarks.bench_load [--fixtures DIR] [--record] [--concurrency 1,10,50]
+                                   [--requests 100] [--latency-scale 1.0] [--output PATH]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+ENDPOINTS = [
+    "/market",
+    "/news",
+    "/news/crypto",
+    "/technical/stock/AAPL",
+    "/technical/crypto/BTC",
+    "/strategy/stock/AAPL",
+    "/strategy/crypto/BTC",
+    "/strategy?symbol=MSFT",
+    "/strategy/recommended-stocks",
+    "/strategy/recommended-cryptos",
+    "/recommend/stocks",
+    "/recommend/cryptos",
+]
+CONCURRENCY = [1, 10, 50]
+REQUESTS = 100  # per endpoint and concurrency level
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+INDEX_SYMBOLS = ["^GSPC", "^IXIC", "^DJI"]
+COINS = {"bitcoin": "BTC", "ethereum": "ETH", "binancecoin": "BNB", "solana": "SOL", "dogecoin": "DOGE"}
+HEADLINE_WORDS = ["gains", "falls", "record", "rally", "cut", "growth", "beats", "misses", "steady", "outlook"]
+
+
+def isolate_state():
+    """Point every file the app writes at a scratch directory, before the app is imported."""
+    scratch = tempfile.mkdtemp(prefix="load_test_")
+    os.environ.setdefault("GITHUB_TOKEN", "fixture")
+    os.environ.setdefault("OHLCV_STORE_DIR", os.path.join(scratch, "ohlcv_store"))
+    os.environ.setdefault("INDICATOR_STATE_FILE", os.path.join(scratch, "indicator_state.json"))
+    os.environ.setdefault("SNAPSHOT_FILE", os.path.join(scratch, "snapshots.json"))
+    os.environ.setdefault("SCHEDULER_ENABLED", "0")  # the routes compute on demand, so upstream costs show up
+    os.environ.setdefault("RATE_LIMIT_FILE", os.path.join(scratch, "rate_limits.json"))
+    # Replayed upstreams have no quota: lift the limits so the serving path is measured, not the throttling
+    for name in ("GPT", "AZURE", "NEWSAPI"):
+        os.environ.setdefault(f"RATE_LIMIT_{name}_PER_MINUTE", "1000000")
+        os.environ.setdefault(f"RATE_LIMIT_{name}_BURST", "1000000")
+        os.environ.setdefault(f"RATE_LIMIT_{name}_PER_DAY", "0")
+
+
+# --- Synthetic fixtures ---
+def write_synthetic_fixtures(directory: str, rng: random.Random, stocks=(), cryptos=()):
+    """Generate fixtures for every symbol the endpoints use, plus the extra `stocks` and `cryptos`."""
+    import pandas as pd
+    from services import fixtures
+    from services.recommendation import STOCK_LIST
+    from services.strategy_analyzer import STOCK_SCAN_SYMBOLS, CRYPTO_SCAN_SYMBOLS
+
+    def walk(count: int, price: float) -> np.ndarray:
+        steps = np.array([rng.gauss(0.0003, 0.02) for _ in range(count)])
+        return price * np.exp(np.cumsum(steps))
+
+    def add_json(method: str, url: str, payload, request_body: bytes = b""):
+        store.add(method, url, 200, json.dumps(payload).encode(), request_body=request_body)
+
+    def headlines(topic: str, count: int = 20) -> dict:
+        articles = []
+        for i in range(count):
+            title = f"{topic} {rng.choice(HEADLINE_WORDS)} as traders weigh outlook #{i + 1}"
+            articles.append({
+                "source": {"id": None, "name": "Fixture Wire"},
+                "title": title,
+                "description": f"{title}. Analysts {rng.choice(HEADLINE_WORDS)} expectations.",
+                "content": f"{title}. " * 5,
+                "url": f"https://example.com/{topic.lower().replace(' ', '-')}/{i}",
+                "urlToImage": None,
+                "publishedAt": f"2024-01-{i % 28 + 1:02d}T12:00:00Z",
+            })
+        return {"status": "ok", "totalResults": count, "articles": articles}
+
+    store = fixtures.FixtureStore()
+    prices = os.path.join(directory, fixtures.PRICES_DIR)
+    os.makedirs(prices, exist_ok=True)
+
+    # Three years of daily stock and index history
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=3 * 252)
+    for symbol in sorted(set(INDEX_SYMBOLS + STOCK_LIST + STOCK_SCAN_SYMBOLS) | set(stocks)):
+        close = walk(len(dates), rng.uniform(20, 500))
+        frame = pd.DataFrame({
+            "Open": close * (1 + np.array([rng.gauss(0, 0.005) for _ in close])),
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": [rng.randint(1_000_000, 50_000_000) for _ in close],
+        }, index=dates)
+        frame.to_csv(os.path.join(prices, f"{symbol}.csv"))
+        add_json("GET", f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}",
+                 {"chart": {"result": [{"meta": {"regularMarketPrice": close[-1], "previousClose": close[-2]}}]}})
+
+    # Binance: the 24h ticker table and daily klines of every pair
+    tickers = []
+    day_ms = 86_400_000
+    last_open = int(time.time() // 86_400) * day_ms
+    for base in sorted(set(CRYPTO_SCAN_SYMBOLS) | set(COINS.values()) | {"AVAX", "TRX", "LINK", "PEPE"} | set(cryptos)):
+        pair = f"{base}USDT"
+        close = walk(500, rng.uniform(0.1, 60_000))
+        tickers.append({"symbol": pair, "lastPrice": str(close[-1]),
+                        "priceChangePercent": str(round((close[-1] / close[-2] - 1) * 100, 3)),
+                        "volume": str(rng.uniform(1e4, 1e7)), "quoteVolume": str(rng.uniform(1e6, 1e10))})
+        klines = [[last_open - (len(close) - 1 - i) * day_ms, str(c), str(c * 1.02), str(c * 0.98), str(c),
+                   str(rng.uniform(1e3, 1e6)), 0, "0", 0, "0", "0", "0"] for i, c in enumerate(close)]
+        for limit in (120, 121):
+            add_json("GET", f"https://api.binance.com/api/v3/klines?symbol={pair}&interval=1d&limit={limit}", klines[-limit:])
+        add_json("GET", f"https://api.binance.com/api/v3/klines?symbol={pair}&interval=1d&limit=1000&startTime={klines[-1][0]}",
+                 klines[-1:])
+    add_json("GET", "https://api.binance.com/api/v3/ticker/24hr", tickers)
+
+    add_json("GET", "https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&ids="
+             + ",".join(COINS) + "&price_change_percentage=24h",
+             [{"id": coin, "symbol": symbol.lower(), "current_price": rng.uniform(0.1, 60_000),
+               "price_change_percentage_24h": rng.uniform(-5, 5)} for coin, symbol in COINS.items()])
+
+    # NewsAPI feeds and the per-symbol searches of the strategy endpoints
+    add_json("GET", "https://newsapi.org/v2/top-headlines?category=business", headlines("Markets"))
+    add_json("GET", "https://newsapi.org/v2/everything?q=crypto&language=en&sortBy=publishedAt", headlines("Crypto"))
+    for symbol in sorted(set(STOCK_LIST + STOCK_SCAN_SYMBOLS) | set(stocks)):
+        add_json("GET", f"https://newsapi.org/v2/everything?q={symbol} stock&language=en&sortBy=publishedAt",
+                 headlines(symbol))
+    for symbol in sorted(set(CRYPTO_SCAN_SYMBOLS) | set(COINS.values()) | set(cryptos)):
+        add_json("GET", f"https://newsapi.org/v2/everything?q={symbol} crypto&language=en&sortBy=publishedAt",
+                 headlines(symbol))
+
+    # GitHub Models: one reply with enough numbered analyses for any prompt (matched by route on replay)
+    reply = "\n".join(f"{i + 1}. The move may {rng.choice(HEADLINE_WORDS)} sentiment in the near term." for i in range(40))
+    add_json("POST", "https://models.github.ai/inference/chat/completions",
+             {"choices": [{"message": {"role": "assistant", "content": reply}}]}, request_body=b"{}")
+
+    store.save(os.path.join(directory, fixtures.HTTP_FILE))
+    # Azure scores are left to the word-list fallback of FixtureSentimentClient
+
+
+# --- Load generation ---
+async def hit(client, path: str, latencies: list, errors: list):
+    start = time.perf_counter()
+    try:
+        response = await client.get(path)
+        ok = response.status_code < 400 and not (isinstance(body := response.json(), dict) and "error" in body)
+    except Exception as e:
+        ok, response = False, e
+    latencies.append(time.perf_counter() - start)
+    if not ok:
+        errors.append(getattr(response, "status_code", repr(response)))
+
+
+async def run_level(client, path: str, concurrency: int, requests: int) -> dict:
+    latencies, errors = [], []
+    queue = iter(range(requests))
+
+    async def worker():
+        for _ in queue:
+            await hit(client, path, latencies, errors)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = (float(np.percentile(latencies, q) * 1000) for q in (50, 95, 99))
+    return {"concurrency": concurrency, "requests": requests, "p50_ms": round(p50, 2), "p95_ms": round(p95, 2),
+            "p99_ms": round(p99, 2), "rps": round(requests / elapsed, 1), "errors": len(errors)}
+
+
+async def load_test(args) -> dict:
+    import httpx
+    from main import app
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=None) as client:
+            for path in args.endpoints:
+                # The first request pays the upstream round trips; later ones show the caching and coalescing
+                start = time.perf_counter()
+                first = await client.get(path)
+                cold_ms = round((time.perf_counter() - start) * 1000, 2)
+                print(f"{path}  (cold {cold_ms:.0f} ms, status {first.status_code})")
+                levels = []
+                for concurrency in args.concurrency:
+                    level = await run_level(client, path, concurrency, max(args.requests, concurrency))
+                    levels.append(level)
+                    print(f"  c={concurrency:<4d} p50 {level['p50_ms']:8.1f} ms  p95 {level['p95_ms']:8.1f} ms  "
+                          f"p99 {level['p99_ms']:8.1f} ms  {level['rps']:8.1f} req/s  errors {level['errors']}")
+                results[path] = {"cold_ms": cold_ms, "status": first.status_code, "levels": levels}
+    return results
+
+
+async def record(args):
+    import httpx
+    from main import app
+    from services import fixtures
+
+    recording = fixtures.install_recording(args.fixtures)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=None) as client:
+            for path in args.endpoints:
+                response = await client.get(path)
+                print(f"recorded {path} ({response.status_code})")
+    recording.save()
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=os.getenv("FIXTURE_DIR", DEFAULT_FIXTURES), help="fixture directory")
+    parser.add_argument("--record", action="store_true", help="record fixtures from the real upstreams and exit")
+    parser.add_argument("--concurrency", default=",".join(map(str, CONCURRENCY)),
+                        type=lambda value: [int(level) for level in value.split(",")])
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="requests per endpoint and level")
+    parser.add_argument("--latency-scale", type=float, default=None, help="multiply the injected upstream latency")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), type=lambda value: value.split(","))
+    parser.add_argument("--output", help="result file (default benchmarks/results/load_<commit>_<time>.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    isolate_state()
+    if args.record:
+        asyncio.run(record(args))
+        return
+
+    from services import fixtures
+    if not os.path.exists(os.path.join(args.fixtures, fixtures.HTTP_FILE)):
+        print(f"No fixtures in {args.fixtures}, generating synthetic ones")
+        write_synthetic_fixtures(args.fixtures, random.Random(0))
+    scale = args.latency_scale if args.latency_scale is not None else fixtures.FIXTURE_LATENCY_SCALE
+    latency = fixtures.latency_table(scale=scale)
+    transport = fixtures.install_replay(args.fixtures, latency)
+
+    started = time.time()
+    results = asyncio.run(load_test(args))
+    print(f"fixtures: {transport.stats()}")
+
+    report = {
+        "commit": commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "python": sys.version.split()[0],
+        "fixtures": os.path.abspath(args.fixtures),
+        "latency": latency,
+        "fixture_stats": transport.stats(),
+        "endpoints": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_{report['commit']}_{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Response size and encode time of /news with field projection and paging.
+
+The same /news-shaped payload as bench_serialization is cut down the way the
+frontend asks for it: the news pages request one page of the fields they
+render, the sentiment widget only each article's label. Each view is built
+and encoded as a fresh snapshot version would be (later requests for the
+same version reuse the bytes).
+
+    python -m benchmarks.bench_news_projection [articles]
+"""
+import sys
+import gzip
+import random
+
+from benchmarks.bench_serialization import ARTICLES, make_payload, timed
+from services import pagination, serialization
+
+PAGE_FIELDS = "title,original_title,url,source.name,publishedAt,gpt_analysis,azure_sentiment"
+PAGE_LIMIT = 10
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ARTICLES
+    payload = make_payload(count, random.Random(0))
+    page_fields = pagination.parse_fields(PAGE_FIELDS)
+    label_fields = pagination.parse_fields("azure_sentiment.label")
+
+    views = [
+        ("full snapshot", lambda: payload),
+        (f"news page ({PAGE_LIMIT}, page fields)", lambda: pagination.article_page(payload, page_fields, PAGE_LIMIT, None)),
+        ("all articles, page fields", lambda: pagination.article_page(payload, page_fields, None, None)),
+        ("sentiment labels only", lambda: pagination.article_page(payload, label_fields, None, None)),
+    ]
+
+    print(f"/news payload with {count} articles\n")
+    print(f"{'view':<32}{'bytes':>10}{'gzip':>9}{'build + encode ms':>20}{'reduction':>11}")
+    full = None
+    for label, view in views:
+        body = serialization.dumps(view())
+        full = full or len(body)
+        compressed = len(gzip.compress(body, compresslevel=serialization.GZIP_LEVEL))
+        print(f"{label:<32}{len(body):>10d}{compressed:>9d}{timed(lambda: serialization.dumps(view())):>20.3f}"
+              f"{full / len(body):>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
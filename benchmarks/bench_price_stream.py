@@ -0,0 +1,88 @@
+"""
+Fan-out throughput of the price hub with thousands of simulated clients.
+
+Replays synthetic Binance kline ticks (or a recording made with
+services.price_stream.record_binance_ticks) through a PriceHub with no
+replay delay. Clients subscribe to a few symbols each. Most drain their updates
+immediately; a share of them are slow, which shows coalescing at work. Runs
+in-process without sockets, so it measures the hub itself.
+
+    python -m benchmarks.bench_price_stream [recording.ndjson]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from services.price_stream import PriceHub, ReplayFeed, Subscriber
+
+PAIRS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "DOTUSDT", "LTCUSDT", "LINKUSDT"]
+TICKS_PER_PAIR = 500
+CLIENTS = [100, 1_000, 5_000]
+SYMBOLS_PER_CLIENT = 3
+SLOW_SHARE = 0.2  # clients that take 20 ms to handle each frame
+DAY_MS = 86_400_000
+
+
+def synthetic_recording(rng: random.Random) -> list:
+    messages = []
+    for pair in PAIRS:
+        price, open_time, event_time = rng.uniform(1, 50_000), 1_700_000_000_000 - 150 * DAY_MS, 1_700_000_000_000
+        for i in range(TICKS_PER_PAIR):
+            price *= 1 + rng.gauss(0, 0.001)
+            closed = i % 20 == 19  # a candle closes every 20 ticks
+            messages.append({"e": "kline", "E": event_time, "s": pair, "k": {
+                "t": open_time, "s": pair, "i": "1d", "c": str(price), "v": str(rng.uniform(1, 100)), "x": closed}})
+            event_time += 250
+            if closed:
+                open_time += DAY_MS
+    return messages
+
+
+async def client(subscriber: Subscriber, slow: bool, done: asyncio.Event):
+    while not done.is_set():
+        await subscriber.next_batch()
+        if slow:
+            await asyncio.sleep(0.02)
+
+
+async def run(messages: list, clients: int, rng: random.Random):
+    hub = PriceHub(ReplayFeed(messages=messages, speed=0, loop=False), warm=False)
+    pairs = sorted({message["s"] for message in messages})
+    done = asyncio.Event()
+    subscribers, tasks = [], []
+    for _ in range(clients):
+        subscriber = Subscriber()
+        for pair in rng.sample(pairs, min(SYMBOLS_PER_CLIENT, len(pairs))):
+            hub.subscribe(subscriber, pair[:-4], is_crypto=True)
+        subscribers.append(subscriber)
+        tasks.append(asyncio.ensure_future(client(subscriber, rng.random() < SLOW_SHARE, done)))
+
+    start = time.perf_counter()
+    feeds = [channel.task for channel in hub._channels.values()]
+    await asyncio.gather(*feeds)
+    elapsed = time.perf_counter() - start
+    done.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    delivered = sum(subscriber.delivered for subscriber in subscribers)
+    coalesced = sum(subscriber.coalesced for subscriber in subscribers)
+    print(f"{clients:6d} clients : {elapsed:6.2f}s  {hub.ticks / elapsed:9.0f} ticks/s  "
+          f"{hub.pushes / elapsed:10.0f} pushes/s  delivered {delivered:9d}  coalesced {coalesced:9d}")
+
+
+async def main():
+    rng = random.Random(0)
+    messages = ReplayFeed(path=sys.argv[1]).by_symbol if len(sys.argv) > 1 else None
+    if messages is not None:
+        messages = [message for recorded in messages.values() for message in recorded]
+    else:
+        messages = synthetic_recording(rng)
+    for clients in CLIENTS:
+        await run(messages, clients, rng)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Multi-process check of the shared rate limiter.
+
+PROCESSES worker processes hammer one limit for DURATION seconds, as uvicorn
+workers would. The shared run uses one state (the lock-protected file, or
+Redis when REDIS_URL is set); the per-process run gives every worker its own
+state, which is what the old per-worker globals amounted to. Reported:
+
+  - grants against the bound burst + rate * duration (and the daily quota)
+  - how many waiting callers were served vs. fail-fast callers refused
+  - the time one take() costs under contention
+
+    python -m benchmarks.bench_rate_limiter [--processes 4] [--duration 5]
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+
+PER_MINUTE = 120  # 2 tokens a second
+BURST = 5
+PER_DAY = 12
+
+
+def worker(path: str, limit: tuple, duration: float, timeout: float, concurrency: int, results):
+    from services import rate_limiter
+
+    if os.getenv("REDIS_URL") and path == "shared":
+        rate_limiter.get_backend()
+    else:
+        rate_limiter.set_backend(rate_limiter.FileBackend(path))
+    rate_limiter.set_limit("bench", rate_limiter.Limit(*limit))
+
+    counts = {"granted": 0, "rate": 0, "daily": 0}
+    takes = []
+
+    async def caller(stop: float):
+        while time.time() < stop:
+            start = time.perf_counter()
+            try:
+                await rate_limiter.acquire("bench", timeout=timeout)
+                counts["granted"] += 1
+            except rate_limiter.RateLimited as e:
+                counts[e.reason] += 1
+                if e.reason == "daily":
+                    return
+                await asyncio.sleep(0.01)
+            takes.append(time.perf_counter() - start)
+
+    async def run():
+        stop = time.time() + duration
+        await asyncio.gather(*(caller(stop) for _ in range(concurrency)))
+
+    asyncio.run(run())
+    results.put((counts, statistics.median(takes) if takes else 0.0))
+
+
+def run(label: str, paths: list, limit: tuple, args, timeout: float) -> dict:
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(path, limit, args.duration, timeout, args.concurrency, results))
+        for path in paths
+    ]
+    start = time.time()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.time() - start
+
+    totals = {"granted": 0, "rate": 0, "daily": 0}
+    for counts, _ in outcomes:
+        for key, value in counts.items():
+            totals[key] += value
+    take_ms = statistics.median(take for _, take in outcomes) * 1000
+    print(f"{label:<28} granted {totals['granted']:5d}  refused rate {totals['rate']:5d}  "
+          f"daily {totals['daily']:5d}  median acquire {take_ms:7.2f} ms  ({elapsed:.1f}s)")
+    totals["bound"] = BURST + PER_MINUTE / 60 * elapsed  # process start-up and the last waits included
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8, help="callers per process")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_rate_limiter_")
+    shared = "shared" if os.getenv("REDIS_URL") else os.path.join(scratch, "shared.json")
+    print(f"{args.processes} processes x {args.concurrency} callers, {args.duration:.0f}s, "
+          f"{PER_MINUTE}/min burst {BURST}: at most {BURST} + {PER_MINUTE / 60:.0f}/s grants\n")
+
+    def isolated(name: str) -> list:
+        if shared == "shared":  # keys on a shared Redis persist between runs
+            from services import rate_limiter
+            rate_limiter.get_backend().client.delete(rate_limiter.RATE_LIMIT_PREFIX + "bench")
+            return ["shared"] * args.processes
+        directory = os.path.join(scratch, name)
+        os.makedirs(directory)
+        return [os.path.join(directory, "shared.json")] * args.processes
+
+    # Waiting callers queue for tokens; fail-fast callers (timeout 0) are refused instead
+    waiting = run("shared, waiting", isolated("waiting"), (PER_MINUTE, BURST, None, 1.0), args, timeout=1.0)
+    failing = run("shared, fail fast", isolated("fast"), (PER_MINUTE, BURST, None, 0.0), args, timeout=0.0)
+    daily = run("shared, daily quota", isolated("daily"), (PER_MINUTE, BURST, PER_DAY, 1.0), args, timeout=1.0)
+    per_process = run("per-process state (old)", [os.path.join(scratch, f"own_{i}.json") for i in range(args.processes)],
+                      (PER_MINUTE, BURST, None, 1.0), args, timeout=1.0)
+
+    print()
+    within = all(totals["granted"] <= totals["bound"] for totals in (waiting, failing))
+    print(f"shared grants within bound       : {within}")
+    print(f"daily quota exact                : {daily['granted'] == PER_DAY} ({daily['granted']}/{PER_DAY})")
+    print(f"fail-fast callers refused        : {failing['rate'] > 0}")
+    print(f"per-process state over-grants by : {per_process['granted'] / max(waiting['granted'], 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Wall-clock comparison of the serial recommendation loop against scan_symbols.
+
+Each simulated symbol analysis mimics generate_strategy_signal: one price fetch,
+one NewsAPI fetch, one Azure batch and one GPT call, each holding the matching
+upstream slot for a fixed latency. No network access is needed.
+
+    python -m benchmarks.bench_scanner
+"""
+import asyncio
+import random
+import time
+
+from services.scanner import scan_symbols, upstream_slot
+
+SYMBOLS = ["AAPL", "MSFT", "GOOG", "AMZN", "TSLA", "NVDA", "META", "SPY", "AMD", "NFLX"]
+
+# Simulated upstream latencies in seconds
+LATENCY = {"yfinance": 0.30, "newsapi": 0.25, "azure": 0.20, "gpt": 0.15}
+
+
+async def fake_analysis(symbol: str) -> dict:
+    for upstream, latency in LATENCY.items():
+        async with upstream_slot(upstream):
+            await asyncio.sleep(latency * random.uniform(0.8, 1.2))
+    return {"symbol": symbol, "final_signal": "Buy"}
+
+
+async def slow_analysis(symbol: str) -> dict:
+    # One symbol hangs, to show partial results under the per-symbol deadline
+    if symbol == "TSLA":
+        await asyncio.sleep(5)
+    return await fake_analysis(symbol)
+
+
+async def main():
+    random.seed(0)
+
+    start = time.perf_counter()
+    serial = [await fake_analysis(symbol) for symbol in SYMBOLS]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scan = await scan_symbols(SYMBOLS, fake_analysis)
+    scan_time = time.perf_counter() - start
+
+    print(f"serial loop   : {serial_time:6.2f}s  ({len(serial)} symbols)")
+    print(f"scan_symbols  : {scan_time:6.2f}s  ({len(scan['results'])} symbols)")
+    print(f"speedup       : {serial_time / scan_time:6.2f}x")
+
+    scan = await scan_symbols(SYMBOLS, slow_analysis, symbol_timeout=2)
+    print(f"with a hung symbol (2s deadline): {scan['elapsed']:.2f}s, "
+          f"{len(scan['results'])} results, timed out: {scan['timed_out']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
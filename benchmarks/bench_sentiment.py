@@ -0,0 +1,69 @@
+"""
+Throughput of the sentiment stage against the sequential batch loop it replaced.
+
+Scores a day's worth of headlines as the news endpoints see them: the business
+feed, the crypto feed and per-symbol queries, which overlap heavily. Uses
+LocalSentimentClient with a fixed per-call latency, so no Azure access is needed.
+
+    python -m benchmarks.bench_sentiment
+"""
+import asyncio
+import random
+import time
+
+from services import sentiment
+from services.sentiment import LocalSentimentClient, analyze_sentiment, sentiment_cache
+
+LATENCY = 0.15  # seconds per Azure call
+HEADLINES = 300
+QUERIES = 20  # feeds and per-symbol queries sharing the headline pool
+PER_QUERY = 40
+
+WORDS = ["stocks", "rally", "fall", "earnings", "beat", "miss", "crypto", "surge", "drop", "record",
+         "growth", "weak", "strong", "bitcoin", "fed", "rates", "cut", "tech", "shares", "market"]
+
+
+def make_queries(rng: random.Random):
+    pool = [" ".join(rng.choice(WORDS) for _ in range(8)) + f" #{i}" for i in range(HEADLINES)]
+    return [[rng.choice(pool) for _ in range(PER_QUERY)] for _ in range(QUERIES)]
+
+
+def sequential(client: LocalSentimentClient, documents: list) -> list:
+    # The previous implementation: batches of 10, one after another, no cache
+    results = []
+    for i in range(0, len(documents), 10):
+        for doc in client.analyze_sentiment(documents[i:i + 10], language="en"):
+            results.append({"label": doc.sentiment})
+    return results
+
+
+async def main():
+    queries = make_queries(random.Random(0))
+    documents = sum(len(query) for query in queries)
+
+    client = LocalSentimentClient(latency=LATENCY)
+    start = time.perf_counter()
+    expected = [sequential(client, query) for query in queries]
+    sequential_time = time.perf_counter() - start
+    print(f"sequential batches : {sequential_time:6.2f}s  {client.calls:4d} calls  {documents} documents")
+
+    client = LocalSentimentClient(latency=LATENCY)
+    sentiment.set_client(client)
+    sentiment_cache.clear()
+    start = time.perf_counter()
+    results = [await analyze_sentiment(query) for query in queries]
+    cold_time = time.perf_counter() - start
+    print(f"dedupe + parallel  : {cold_time:6.2f}s  {client.calls:4d} calls  ({sequential_time / cold_time:.1f}x)")
+
+    calls = client.calls
+    start = time.perf_counter()
+    await asyncio.gather(*(analyze_sentiment(query) for query in queries))
+    warm_time = time.perf_counter() - start
+    print(f"warm cache         : {warm_time:6.3f}s  {client.calls - calls:4d} calls")
+
+    labels = [[result["label"] for result in query] for query in results]
+    assert labels == [[result["label"] for result in query] for query in expected], "results differ"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Payload size and encode time of a /news snapshot in every representation.
+
+A /news-shaped payload (ARTICLES analyzed articles with content, Azure scores
+and GPT text) is encoded the way FastAPI's default JSONResponse does it
+(jsonable_encoder + json.dumps), with services.serialization.dumps (orjson
+when installed), as MessagePack, and compressed with gzip and brotli where
+available. The per-request cost of a cached snapshot encoding and of an ETag
+revalidation (304) is measured through the real response helper.
+
+    python -m benchmarks.bench_serialization [articles]
+"""
+import sys
+import json
+import time
+import gzip
+import random
+
+from services import serialization
+
+ARTICLES = 100
+WORDS = ["market", "shares", "rally", "earnings", "guidance", "inflation", "rates", "growth", "outlook", "volatility"]
+
+
+def make_payload(count: int, rng: random.Random) -> dict:
+    def sentence(words: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    articles = []
+    for i in range(count):
+        positive = rng.random()
+        negative = rng.random() * (1 - positive)
+        articles.append({
+            "source": {"id": None, "name": "Fixture Wire"},
+            "author": "Staff",
+            "title": sentence(10),
+            "description": sentence(30),
+            "url": f"https://example.com/markets/{i}",
+            "urlToImage": f"https://example.com/images/{i}.jpg",
+            "publishedAt": f"2024-01-{i % 28 + 1:02d}T12:00:00Z",
+            "content": " ".join(sentence(20) for _ in range(8)) + " [+2400 chars]",
+            "azure_sentiment": {"label": "positive", "confidence_scores": {
+                "positive": positive, "neutral": 1 - positive - negative, "negative": negative}},
+            "gpt_analysis": " ".join(sentence(15) for _ in range(3)),
+        })
+    return {"articles": articles}
+
+
+def timed(fn, repeat: int = 50) -> float:
+    """Median time of one call, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+class FakeRequest:
+    """Just enough of a Starlette request for the negotiation helpers."""
+
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+def main():
+    from fastapi.encoders import jsonable_encoder
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ARTICLES
+    payload = make_payload(count, random.Random(0))
+
+    def fastapi_default() -> bytes:
+        return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":")).encode("utf-8")
+
+    plain = serialization.dumps(payload)
+    rows = [
+        ("json (FastAPI default)", fastapi_default, len(fastapi_default())),
+        (f"json ({'orjson' if serialization.orjson else 'stdlib'})", lambda: serialization.dumps(payload), len(plain)),
+    ]
+    if serialization.msgpack is not None:
+        rows.append(("msgpack", lambda: serialization.packb(payload), len(serialization.packb(payload))))
+    level = serialization.GZIP_LEVEL
+    rows.append((f"json + gzip {level}", lambda: gzip.compress(serialization.dumps(payload), compresslevel=level),
+                 len(gzip.compress(plain, compresslevel=level))))
+    if serialization.brotli is not None:
+        quality = serialization.BROTLI_QUALITY
+        rows.append((f"json + br {quality}", lambda: serialization.brotli.compress(serialization.dumps(payload), quality=quality),
+                     len(serialization.brotli.compress(plain, quality=quality))))
+
+    print(f"/news payload with {count} articles\n")
+    print(f"{'representation':<26}{'bytes':>10}{'encode ms':>12}")
+    for label, encode, size in rows:
+        print(f"{label:<26}{size:>10d}{timed(encode):>12.3f}")
+
+    # A snapshot is encoded once per version; later requests reuse the bytes or answer 304
+    key = ("bench", time.time(), None)
+    first = serialization.encoded_response(FakeRequest({"accept-encoding": "gzip"}), payload, key=key)
+    etag = first.headers["etag"]
+    cached = timed(lambda: serialization.encoded_response(FakeRequest({"accept-encoding": "gzip"}), payload, key=key), 500)
+    revalidated = serialization.encoded_response(FakeRequest({"if-none-match": etag}), payload, key=key)
+    not_modified = timed(lambda: serialization.encoded_response(FakeRequest({"if-none-match": etag}), payload, key=key), 500)
+    print(f"\ncached snapshot response (gzip): {len(first.body):>8d} bytes  {cached:8.3f} ms")
+    print(f"If-None-Match revalidation     : {len(revalidated.body):>8d} bytes  {not_modified:8.3f} ms  (status {revalidated.status_code})")
+
+
+if __name__ == "__main__":
+    main()
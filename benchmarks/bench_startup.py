@@ -0,0 +1,76 @@
+"""
+Cold start time of the API, without any credentials.
+
+Each run is a fresh interpreter with no GITHUB_TOKEN, Azure or NewsAPI
+settings (and scratch state files). It measures the import of main, then the
+lifespan startup up to the first /ready answer, and lists the heavy libraries
+that the import pulled in. Medians over RUNS runs are reported.
+
+    python -m benchmarks.bench_startup [runs]
+"""
+import os
+import sys
+import json
+import tempfile
+import statistics
+import subprocess
+
+RUNS = 5
+HEAVY_MODULES = ["pandas", "yfinance", "numpy", "azure.ai.textanalytics", "websockets"]
+CREDENTIALS = ["GITHUB_TOKEN", "AZURE_KEY", "AZURE_ENDPOINT", "NEWS_API_KEY", "REDIS_URL"]
+
+CHILD = r"""
+import sys, time, json, asyncio
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+async def boot():
+    import httpx
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://app") as client:
+            response = await client.get("/ready")
+            return response.status_code, response.json()
+
+status, body = asyncio.run(boot())
+ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "ready": ready - imported, "loaded": loaded,
+                  "status": status, "degraded": body["degraded"]}))
+"""
+
+
+def run_once(root: str) -> dict:
+    scratch = tempfile.mkdtemp(prefix="bench_startup_")
+    env = {name: value for name, value in os.environ.items() if name not in CREDENTIALS}
+    env.update({
+        "OHLCV_STORE_DIR": os.path.join(scratch, "ohlcv_store"),
+        "INDICATOR_STATE_FILE": os.path.join(scratch, "indicator_state.json"),
+        "SNAPSHOT_FILE": os.path.join(scratch, "snapshots.json"),
+        "SCHEDULER_ENABLED": "0",
+        "PYTHONPATH": root,
+    })
+    # Run from the scratch directory so a local .env doesn't bring the credentials back
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n" + CHILD
+    result = subprocess.run([sys.executable, "-c", code], cwd=scratch, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = [run_once(root) for _ in range(runs)]
+
+    import_ms = statistics.median(result["import"] for result in results) * 1000
+    ready_ms = statistics.median(result["ready"] for result in results) * 1000
+    last = results[-1]
+    print(f"import main : {import_ms:7.1f} ms (median of {runs})")
+    print(f"to /ready   : {ready_ms:7.1f} ms more, status {last['status']}")
+    print(f"heavy modules loaded by the import: {', '.join(last['loaded']) or 'none'}")
+    print(f"degraded upstreams without credentials: {', '.join(last['degraded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
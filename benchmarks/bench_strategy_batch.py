@@ -0,0 +1,118 @@
+"""
+One POST /strategy/batch against the equivalent single /strategy calls.
+
+A 50-symbol watchlist (35 stocks, 15 cryptos) is analyzed from cold state
+twice, each in a fresh interpreter on replayed fixtures with the usual
+upstream latency: once as 50 concurrent GET /strategy?symbol=... calls, once
+as a single batch. Wall time and the number of calls made to every upstream
+(from the upstream_call_duration_seconds metric) are compared.
+
+    python -m benchmarks.bench_strategy_batch [--latency-scale 1.0]
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import subprocess
+
+STOCKS = [
+    "AAPL", "MSFT", "TSLA", "NVDA", "AMZN", "GOOG", "META", "NFLX", "INTC", "AMD",
+    "SPY", "JPM", "V", "WMT", "KO", "PEP", "DIS", "BA", "XOM", "CVX",
+    "ORCL", "CRM", "ADBE", "CSCO", "QCOM", "TXN", "IBM", "UBER", "PYPL", "SHOP",
+    "COST", "NKE", "MCD", "PFE", "MRK",
+]
+CRYPTOS = ["BTC", "ETH", "BNB", "ADA", "SOL", "XRP", "DOGE", "DOT", "LTC", "MATIC", "AVAX", "TRX", "LINK", "PEPE", "SHIB"]
+ARTICLES_PER_SYMBOL = 3  # of each symbol's own feed, copied into the shared pull
+
+CHILD = r"""
+import re, json, time, asyncio
+import httpx
+from benchmarks.bench_load import isolate_state
+isolate_state()
+from services import fixtures, metrics
+fixtures.install_replay(FIXTURES, fixtures.latency_table(scale=SCALE))
+from main import app
+
+async def run():
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=None) as client:
+            start = time.perf_counter()
+            if MODE == "batch":
+                response = await client.post("/strategy/batch", json={"symbols": [
+                    {"symbol": symbol, "is_crypto": is_crypto} for symbol, is_crypto in SYMBOLS]})
+                results = response.json()["results"]
+            else:
+                responses = await asyncio.gather(*(
+                    client.get("/strategy", params={"symbol": symbol, "is_crypto": str(is_crypto).lower()})
+                    for symbol, is_crypto in SYMBOLS))
+                results = {symbol: response.json() for (symbol, _), response in zip(SYMBOLS, responses)}
+            elapsed = time.perf_counter() - start
+    calls = {name: int(float(value)) for name, value in
+             re.findall(r'upstream_call_duration_seconds_count\{upstream="([^"]+)"\} (\S+)', metrics.render())}
+    signals = {symbol: result.get("final_signal", "error") for symbol, result in results.items()}
+    print(json.dumps({"elapsed": elapsed, "calls": calls, "signals": signals}))
+
+asyncio.run(run())
+"""
+
+
+def write_fixtures(directory: str):
+    from benchmarks.bench_load import write_synthetic_fixtures
+    from services import fixtures
+    from services.strategy_analyzer import NEWS_BATCH_PAGE_SIZE, news_queries, news_search_url
+
+    write_synthetic_fixtures(directory, random.Random(0), stocks=STOCKS, cryptos=CRYPTOS)
+
+    # The shared pulls of the batch: a few articles from each symbol's own feed
+    path = os.path.join(directory, fixtures.HTTP_FILE)
+    store = fixtures.FixtureStore.load(path)
+    for symbols, topic in ((STOCKS, "stock"), (CRYPTOS, "crypto")):
+        for query in news_queries(symbols, topic):
+            articles = []
+            for symbol in symbols:
+                if f"({symbol} " in query or f" {symbol} " in query or f" {symbol})" in query:
+                    entry, _ = store.lookup("GET", news_search_url(f"{symbol} {topic}"))
+                    articles += json.loads(entry["body"])["articles"][:ARTICLES_PER_SYMBOL]
+            body = {"status": "ok", "totalResults": len(articles), "articles": articles[:NEWS_BATCH_PAGE_SIZE]}
+            store.add("GET", news_search_url(query, NEWS_BATCH_PAGE_SIZE), 200, json.dumps(body).encode())
+    store.save(path)
+
+
+def run(mode: str, fixture_dir: str, scale: float) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    scratch = tempfile.mkdtemp(prefix=f"bench_batch_{mode}_")
+    symbols = [(symbol, False) for symbol in STOCKS] + [(symbol, True) for symbol in CRYPTOS]
+    code = f"MODE = {mode!r}\nFIXTURES = {fixture_dir!r}\nSCALE = {scale!r}\nSYMBOLS = {symbols!r}\n" + CHILD
+    env = dict(os.environ, PYTHONPATH=root, NEWS_API_KEY="fixture")
+    env.pop("REDIS_URL", None)
+    result = subprocess.run([sys.executable, "-c", code], cwd=scratch, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply the injected upstream latency")
+    args = parser.parse_args()
+
+    fixture_dir = tempfile.mkdtemp(prefix="bench_batch_fixtures_")
+    write_fixtures(fixture_dir)
+    single = run("single", fixture_dir, args.latency_scale)
+    batch = run("batch", fixture_dir, args.latency_scale)
+
+    count = len(STOCKS) + len(CRYPTOS)
+    print(f"{count} symbols ({len(STOCKS)} stocks, {len(CRYPTOS)} cryptos), latency scale {args.latency_scale}\n")
+    print(f"{'':<24}{'single calls':>14}{'batch':>10}")
+    print(f"{'wall time (s)':<24}{single['elapsed']:>14.2f}{batch['elapsed']:>10.2f}")
+    print(f"{'symbols / s':<24}{count / single['elapsed']:>14.1f}{count / batch['elapsed']:>10.1f}")
+    for upstream in sorted(set(single["calls"]) | set(batch["calls"])):
+        print(f"{upstream + ' calls':<24}{single['calls'].get(upstream, 0):>14d}{batch['calls'].get(upstream, 0):>10d}")
+    same = sum(single["signals"][symbol] == batch["signals"].get(symbol) for symbol in single["signals"])
+    print(f"\nsame final signal for {same} of {count} symbols (news differs: one shared pull vs. one per symbol)")
+
+
+if __name__ == "__main__":
+    main()
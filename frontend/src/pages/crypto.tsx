@@ -80,6 +80,22 @@ export function Crypto() {
     // 页面加载时尝试获取推荐加密货币
     useEffect(() => {
         const fetchRecommendations = async () => {
+            // Rows appear as soon as each symbol is analyzed; the summary replaces them with the final list
+            try {
+                const rows: CryptoRecommendation[] = [];
+                await apiService.strategy.streamRecommendedCryptos((event) => {
+                    if (event.event === "result" && event.status === "ok" && event.data?.final_signal === "Buy") {
+                        rows.push({ ...event.data, name: event.data.name || event.data.symbol });
+                        setCryptoRecommendations([...rows]);
+                    } else if (event.event === "summary" && event.recommendations && event.recommendations.length > 0) {
+                        setCryptoRecommendations(event.recommendations.map((item) => ({ ...item, name: item.name || item.symbol })));
+                    }
+                });
+                return;
+            } catch (err) {
+                console.error("Streaming recommendations failed, falling back:", err);
+            }
+
             try {
                 // 尝试使用直接方法获取数据
                 const cryptosData = await apiService.directData.getTopCryptos();
@@ -18,10 +18,16 @@ interface Article {
     gpt_analysis: string;
 }
 
+// Only what the cards below render, a page at a time
+const ARTICLE_FIELDS = ["title", "original_title", "source.name", "publishedAt", "url", "azure_sentiment", "gpt_analysis"];
+const PAGE_SIZE = 20;
+
 export function CryptoNews() {
     const [articles, setArticles] = useState<Article[]>([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         const fetchNews = async () => {
@@ -29,10 +35,11 @@ export function CryptoNews() {
                 setLoading(true);
                 setError(null);
 
-                const data = await apiService.directData.getCryptoNews();
+                const data = await apiService.directData.getCryptoNews({ fields: ARTICLE_FIELDS, limit: PAGE_SIZE });
 
                 if (data && data.articles) {
                     setArticles(data.articles);
+                    setNextCursor(data.next_cursor || null);
                 } else {
                     setError("Failed to retrieve crypto news.");
                 }
@@ -47,6 +54,22 @@ export function CryptoNews() {
         fetchNews();
     }, []);
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        try {
+            setLoadingMore(true);
+            const data = await apiService.news.getCryptoNews({ fields: ARTICLE_FIELDS, limit: PAGE_SIZE, cursor: nextCursor });
+            if (data && data.articles) {
+                setArticles((current) => [...current, ...data.articles]);
+                setNextCursor(data.next_cursor || null);
+            }
+        } catch (err) {
+            console.error("Failed to load more news:", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const getSentimentColor = (label: string) => {
         switch (label.toLowerCase()) {
             case "positive":
@@ -119,6 +142,17 @@ export function CryptoNews() {
                     </div>
                 ))}
             </div>
+            {nextCursor && (
+                <div className="flex justify-center mt-8">
+                    <button
+                        onClick={loadMore}
+                        disabled={loadingMore}
+                        className="px-6 py-2 border border-gray-700 rounded-xl bg-gray-900 hover:bg-gray-800 text-white disabled:opacity-50"
+                    >
+                        {loadingMore ? "Loading..." : "Load more"}
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
@@ -18,10 +18,16 @@ interface Article {
     gpt_analysis: string;
 }
 
+// Only what the cards below render, a page at a time
+const ARTICLE_FIELDS = ["title", "original_title", "source.name", "publishedAt", "url", "azure_sentiment", "gpt_analysis"];
+const PAGE_SIZE = 20;
+
 export function StockNews() {
     const [articles, setArticles] = useState<Article[]>([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         const fetchNews = async () => {
@@ -30,10 +36,11 @@ export function StockNews() {
                 setError(null);
 
                 // 尝试使用直接方法获取新闻数据
-                const data = await apiService.directData.getBusinessNews();
+                const data = await apiService.directData.getBusinessNews({ fields: ARTICLE_FIELDS, limit: PAGE_SIZE });
 
                 if (data && data.articles) {
                     setArticles(data.articles);
+                    setNextCursor(data.next_cursor || null);
                 } else {
                     setError("Failed to retrieve news data.");
                 }
@@ -48,6 +55,22 @@ export function StockNews() {
         fetchNews();
     }, []);
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        try {
+            setLoadingMore(true);
+            const data = await apiService.news.getBusinessNews({ fields: ARTICLE_FIELDS, limit: PAGE_SIZE, cursor: nextCursor });
+            if (data && data.articles) {
+                setArticles((current) => [...current, ...data.articles]);
+                setNextCursor(data.next_cursor || null);
+            }
+        } catch (err) {
+            console.error("Failed to load more news:", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const getSentimentColor = (label: string) => {
         switch (label.toLowerCase()) {
             case "positive":
@@ -120,6 +143,17 @@ export function StockNews() {
                     </div>
                 ))}
             </div>
+            {nextCursor && (
+                <div className="flex justify-center mt-8">
+                    <button
+                        onClick={loadMore}
+                        disabled={loadingMore}
+                        className="px-6 py-2 border border-gray-700 rounded-xl bg-gray-900 hover:bg-gray-800 text-white disabled:opacity-50"
+                    >
+                        {loadingMore ? "Loading..." : "Load more"}
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
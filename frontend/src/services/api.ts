@@ -7,9 +7,74 @@ interface MarketData {
     indicators?: string[];
 }
 
+export interface PriceUpdate {
+    symbol: string;
+    market: "crypto" | "stock";
+    price: number;
+    time: number;
+    closed: boolean;
+    indicators: {
+        RSI: number | null;
+        MA_20: number | null;
+        MA_50: number | null;
+        MA_120: number | null;
+        Volume: number | null;
+    };
+}
+
+export interface NewsQuery {
+    fields?: string[];  // article fields to return, e.g. "source.name" or "azure_sentiment.label"
+    limit?: number;     // articles per page
+    cursor?: string;    // next_cursor of the previous page
+}
+
+// Query parameters of a projected / paged news request
+const newsParams = (query?: NewsQuery) => ({
+    fields: query?.fields?.join(","),
+    limit: query?.limit,
+    cursor: query?.cursor,
+});
+
 // Base API URL
 const API_URL = "http://localhost:8000";
 
+export interface RecommendationEvent {
+    event: "result" | "summary";
+    symbol?: string;
+    status?: "ok" | "error" | "timeout";
+    data?: any;
+    recommendations?: any[];
+}
+
+// Read an NDJSON response line by line, calling onEvent for each object as soon as it arrives
+export const streamNdjson = async (path: string, onEvent: (event: any) => void) => {
+    const response = await fetch(`${API_URL}${path}`, { headers: { Accept: "application/x-ndjson" } });
+    if (!response.ok || !response.body) {
+        throw new Error(`Stream request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = buffer.split("\n");
+        buffer = lines.pop() || "";
+        for (const line of lines) {
+            if (line.trim()) {
+                onEvent(JSON.parse(line));
+            }
+        }
+        if (done) {
+            if (buffer.trim()) {
+                onEvent(JSON.parse(buffer));
+            }
+            break;
+        }
+    }
+};
+
 // Create axios instance
 const apiClient = axios.create({
     baseURL: API_URL,
@@ -34,9 +99,9 @@ const apiService = {
     // News related API
     news: {
         // Get business news
-        getBusinessNews: async () => {
+        getBusinessNews: async (query?: NewsQuery) => {
             try {
-                const response = await apiClient.get("/news");
+                const response = await apiClient.get("/news", { params: newsParams(query) });
                 return response.data;
             } catch (error) {
                 console.error("Error fetching business news:", error);
@@ -45,9 +110,9 @@ const apiService = {
         },
 
         // Get crypto news
-        getCryptoNews: async () => {
+        getCryptoNews: async (query?: NewsQuery) => {
             try {
-                const response = await apiClient.get("/news/crypto");
+                const response = await apiClient.get("/news/crypto", { params: newsParams(query) });
                 return response.data;
             } catch (error) {
                 console.error("Error fetching crypto news:", error);
@@ -111,6 +176,26 @@ const apiService = {
                 console.error('Error fetching recommended cryptos:', error);
                 throw error;
             }
+        },
+
+        // Stream recommended stocks: one "result" event per symbol as soon as it is analyzed, then a "summary"
+        streamRecommendedStocks: async (onEvent: (event: RecommendationEvent) => void) => {
+            try {
+                await streamNdjson('/strategy/recommended-stocks?stream=ndjson', onEvent);
+            } catch (error) {
+                console.error('Error streaming recommended stocks:', error);
+                throw error;
+            }
+        },
+
+        // Stream recommended cryptocurrencies, in the same format as streamRecommendedStocks
+        streamRecommendedCryptos: async (onEvent: (event: RecommendationEvent) => void) => {
+            try {
+                await streamNdjson('/strategy/recommended-cryptos?stream=ndjson', onEvent);
+            } catch (error) {
+                console.error('Error streaming recommended cryptos:', error);
+                throw error;
+            }
         }
     },
 
@@ -164,6 +249,26 @@ const apiService = {
         }
     },
 
+    // Live prices and indicators over a WebSocket
+    prices: {
+        // Subscribe to symbols; onUpdate receives the newest update of each changed symbol.
+        // Returns a function that closes the stream.
+        subscribe: (symbols: string[], isCrypto: boolean, onUpdate: (updates: PriceUpdate[]) => void) => {
+            const url = `${API_URL.replace(/^http/, "ws")}/ws/prices?symbols=${symbols.join(",")}&crypto=${isCrypto}`;
+            const socket = new WebSocket(url);
+            socket.onmessage = (event) => {
+                const message = JSON.parse(event.data);
+                if (message.updates) {
+                    onUpdate(message.updates);
+                } else if (message.error) {
+                    console.error("Price stream error:", message.error);
+                }
+            };
+            socket.onerror = (error) => console.error("Price stream connection error:", error);
+            return () => socket.close();
+        }
+    },
+
     // Direct data fetching functions (not relying on backend)
     directData: {
         // Get top stocks with real market data
@@ -280,10 +385,10 @@ const apiService = {
         },
 
         // Get business news directly
-        getBusinessNews: async () => {
+        getBusinessNews: async (query?: NewsQuery) => {
             try {
                 // Try to get data from our API
-                const response = await apiClient.get('/news');
+                const response = await apiClient.get('/news', { params: newsParams(query) });
                 return response.data;
             } catch (error) {
                 console.error("Error in getBusinessNews:", error);
@@ -363,10 +468,10 @@ const apiService = {
         },
 
         // Get crypto news directly
-        getCryptoNews: async () => {
+        getCryptoNews: async (query?: NewsQuery) => {
             try {
                 // Try to get data from our API
-                const response = await apiClient.get('/news/crypto');
+                const response = await apiClient.get('/news/crypto', { params: newsParams(query) });
                 return response.data;
             } catch (error) {
                 console.error("Error in getCryptoNews:", error);
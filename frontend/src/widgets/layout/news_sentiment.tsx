@@ -30,7 +30,8 @@ export function NewsSentimentOverview() {
         const fetchData = async () => {
             try {
                 setLoading(true);
-                const res = await apiService.news.getBusinessNews();
+                // Only the labels are counted, so skip the rest of each article
+                const res = await apiService.news.getBusinessNews({ fields: ["azure_sentiment.label"] });
                 const articles = res.articles;
 
                 const sentimentCount = getSentimentDistribution(articles);
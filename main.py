@@ -1,8 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import news, market, technical, strategy, recommend
+from routes import news, market, technical, strategy, recommend, stream, metrics, health
+from services import http_client, indicator_state, scheduler
+from services.news_index import ingest_snapshots
+from services.metrics import MetricsMiddleware
+from services.price_stream import hub
+from services.serialization import FastJSONResponse
+from services.tracing import TracingMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Persisted state is loaded here rather than at import, so importing the app stays cheap
+    await asyncio.to_thread(indicator_state.load_states)
+    # Serve persisted snapshots right away and keep them refreshed in the background
+    scheduler.start()
+    ingest_snapshots(news.NEWS_FEEDS)
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await scheduler.stop()
+    await hub.close()
+    # Close the shared upstream connection pools
+    await http_client.aclose()
+
+
+# Every JSON response is rendered with orjson when it is installed
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 
 # Configure CORS
@@ -12,8 +38,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Snapshot-Age", "Server-Timing", "ETag"],
 )
 
+# Per-request timing breakdown and profiles on demand (X-Debug-Timing / X-Debug-Profile)
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so the latency covers the whole stack
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/")
 def root():
@@ -23,7 +56,9 @@ def root():
 app.include_router(news.router)
 app.include_router(strategy.router)
 app.include_router(market.router)
-<<<<<<< HEAD
 app.include_router(technical.router)
 app.include_router(recommend.router)
+app.include_router(stream.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
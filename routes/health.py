@@ -0,0 +1,49 @@
+import os
+import asyncio
+from fastapi import APIRouter, Request, Response
+from services import gpt_client, price_history, sentiment
+from services.cache import REDIS_URL, shared_backend
+
+router = APIRouter()
+
+def upstream_status() -> dict:
+    """Which upstreams can be used, from the credentials and providers in place (no network)."""
+    return {
+        "newsapi": {"configured": bool(os.getenv("NEWS_API_KEY"))},
+        "azure": {"configured": sentiment.is_configured()},
+        "gpt": {"configured": gpt_client.is_configured()},
+        "price_history": {"configured": True, "provider": type(price_history.get_provider()).__name__},
+        # Public APIs, no credentials needed
+        "binance": {"configured": True},
+        "coingecko": {"configured": True},
+        "yahoo": {"configured": True},
+    }
+
+async def redis_status() -> dict:
+    backend = shared_backend()
+    if not REDIS_URL or backend is None:
+        return {"configured": bool(REDIS_URL), "reachable": False}
+    try:
+        ping = getattr(backend, "ping", None)
+        reachable = bool(await asyncio.to_thread(ping)) if ping else True
+    except Exception:
+        reachable = False
+    return {"configured": True, "reachable": reachable}
+
+@router.get("/ready", tags=["Monitoring"])
+async def ready(request: Request, response: Response):
+    """
+    Readiness: 200 once startup has finished, 503 before. Also lists the
+    upstreams that are configured; the API still serves without the optional
+    ones (e.g. no GPT analysis without GITHUB_TOKEN), which shows in "degraded".
+    """
+    started = getattr(request.app.state, "ready", False)
+    upstreams = upstream_status()
+    upstreams["redis"] = await redis_status()
+    if not started:
+        response.status_code = 503
+    return {
+        "ready": started,
+        "upstreams": upstreams,
+        "degraded": [name for name, status in upstreams.items() if not status["configured"]],
+    }
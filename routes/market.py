@@ -1,10 +1,13 @@
 # routes/market.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from services import scheduler
+from services.serialization import snapshot_response
 from services.trend_analyzer import analyze_market_trend
 
 router = APIRouter()
 
-@router.get("/market", tags=["Market Trend"])
-def market_overview():
-    return analyze_market_trend()
+scheduler.register_job("market", 60, analyze_market_trend)
 
+@router.get("/market", tags=["Market Trend"])
+async def market_overview(request: Request):
+    return await snapshot_response(request, "market")
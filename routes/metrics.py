@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from services import metrics
+
+router = APIRouter()
+
+@router.get("/metrics", tags=["Monitoring"])
+async def get_metrics():
+    """
+    Prometheus metrics: latency per route and per upstream, upstream errors and
+    retries, cache hit ratios, single-flight and snapshot stats, and the GPT quota.
+    """
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,17 +1,62 @@
-from fastapi import APIRouter
-from services.news_analyzer import fetch_and_analyze_news_by_url
+from typing import Optional
+from fastapi import APIRouter, Request
+from services import pagination, rate_limiter, scheduler
+from services.news_analyzer import FEED_GPT_SHARE, FEED_NEWSAPI_SHARE, WATCHLIST_NEWSAPI_SHARE, fetch_and_analyze_news_by_url
+from services.serialization import encoded_response, snapshot_response
+from services.strategy_analyzer import ingest_watchlist_news, watchlist_queries
 import os
 
 router = APIRouter()
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
-@router.get("/news",tags=["Business News"])
-def get_news():
+async def fetch_business_news():
     url = f"https://newsapi.org/v2/top-headlines?category=business&apiKey={NEWS_API_KEY}"
-    return fetch_and_analyze_news_by_url(url)
+    return await fetch_and_analyze_news_by_url(url)
 
-@router.get("/news/crypto",tags=["Crypto News"])
-def get_crypt_news():
+async def fetch_crypto_news():
     url = f"https://newsapi.org/v2/everything?q=crypto&language=en&sortBy=publishedAt&apiKey={NEWS_API_KEY}"
-    return fetch_and_analyze_news_by_url(url)
+    return await fetch_and_analyze_news_by_url(url)
+
+# Refresh intervals that keep each job within its share of the daily NewsAPI and GPT
+# quotas: a feed refresh takes one call of each, a watchlist refresh one NewsAPI call per query
+FEED_INTERVAL = max(rate_limiter.quota_interval("newsapi", FEED_NEWSAPI_SHARE, minimum=600),
+                    rate_limiter.quota_interval("gpt", FEED_GPT_SHARE, minimum=600))
+WATCHLIST_INTERVAL = rate_limiter.quota_interval("newsapi", WATCHLIST_NEWSAPI_SHARE, calls=len(watchlist_queries()), minimum=1800)
+
+# Both feeds are refreshed in the background and served from their latest snapshot
+scheduler.register_job("news", FEED_INTERVAL, fetch_business_news)
+scheduler.register_job("news_crypto", FEED_INTERVAL, fetch_crypto_news)
+# Every pull also feeds the per-symbol news index; this one covers the scanned symbols by name
+scheduler.register_job("news_watchlist", WATCHLIST_INTERVAL, ingest_watchlist_news)
+
+# Feeds whose persisted snapshots seed the news index at startup
+NEWS_FEEDS = ["news", "news_crypto", "news_watchlist"]
+
+async def news_response(request: Request, name: str, fields: Optional[str], limit: Optional[int], cursor: Optional[str]):
+    """A news snapshot, projected to `fields` and paged by `limit` / `cursor` when asked."""
+    try:
+        paths = pagination.parse_fields(fields)
+        position = pagination.decode_cursor(cursor)
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1.")
+    except ValueError as e:
+        return encoded_response(request, {"error": str(e)})
+    if paths is None and limit is None and position is None:
+        return await snapshot_response(request, name)
+    return await snapshot_response(request, name, view=lambda value: pagination.article_page(value, paths, limit, position),
+                                   view_key=(paths, limit, position))
+
+@router.get("/news",tags=["Business News"])
+async def get_news(request: Request, fields: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Get analyzed business news. `fields` (e.g. title,url,source.name,azure_sentiment.label)
+    keeps only those article fields; `limit` pages the articles, and the returned
+    `next_cursor` is passed back as `cursor` for the next page.
+    """
+    return await news_response(request, "news", fields, limit, cursor)
+
+@router.get("/news/crypto",tags=["Crypto News"])
+async def get_crypt_news(request: Request, fields: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Get analyzed crypto news, with the same `fields`, `limit` and `cursor` parameters as /news."""
+    return await news_response(request, "news_crypto", fields, limit, cursor)
@@ -1,16 +1,30 @@
-from fastapi import APIRouter
-from services.strategy_analyzer import get_recommended_stocks, get_recommended_cryptos
+from typing import Optional
+from fastapi import APIRouter, Request
+from services import scheduler
+from services.serialization import snapshot_response
+from services.streaming import event_stream, stream_format
+from services.strategy_analyzer import get_recommended_stocks, get_recommended_cryptos, stream_recommendations
 
 router = APIRouter(prefix="/recommend", tags=["Recommendation"])
 
+# Same datasets as /strategy/recommended-*; whichever router registers first owns the job
+scheduler.register_job("recommended_stocks", 900, get_recommended_stocks)
+scheduler.register_job("recommended_cryptos", 900, get_recommended_cryptos)
+
 @router.get("/stocks")
-def get_stock_recommendations(count: int = 10):
+async def get_stock_recommendations(request: Request, count: int = 10, stream: Optional[str] = None):
     
-    recommendations = get_recommended_stocks()
-    return {"recommendations": recommendations[:count] if count else recommendations}
+    fmt = stream_format(request, stream)
+    if fmt:
+        return event_stream(stream_recommendations(is_crypto=False, count=count), fmt)
+    return await snapshot_response(request, "recommended_stocks", view=lambda recommendations: {
+        "recommendations": recommendations[:count] if count else recommendations}, view_key=count)
 
 @router.get("/cryptos")
-def get_crypto_recommendations(count: int = 10):
+async def get_crypto_recommendations(request: Request, count: int = 10, stream: Optional[str] = None):
    
-    recommendations = get_recommended_cryptos()
-    return {"recommendations": recommendations[:count] if count else recommendations}
+    fmt = stream_format(request, stream)
+    if fmt:
+        return event_stream(stream_recommendations(is_crypto=True, count=count), fmt)
+    return await snapshot_response(request, "recommended_cryptos", view=lambda recommendations: {
+        "recommendations": recommendations[:count] if count else recommendations}, view_key=count)
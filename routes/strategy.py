@@ -1,47 +1,90 @@
-from fastapi import APIRouter
-from services.strategy_analyzer import analyze_stock_strategy, analyze_crypto_strategy, get_recommended_stocks, get_recommended_cryptos
+from typing import List, Optional
+from fastapi import APIRouter, Request
+from pydantic import BaseModel
+from services import scheduler, sentiment_store
+from services.serialization import snapshot_response
+from services.streaming import event_stream, stream_format
+from services.strategy_analyzer import analyze_stock_strategy, analyze_crypto_strategy, analyze_strategy_batch, get_recommended_stocks, get_recommended_cryptos, stream_recommendations
 
 router = APIRouter()
 
+scheduler.register_job("recommended_stocks", 900, get_recommended_stocks)
+scheduler.register_job("recommended_cryptos", 900, get_recommended_cryptos)
+
 @router.get("/strategy/stock/{symbol}", tags=["Stock Strategy"])
-def get_stock_strategy(symbol: str):
+async def get_stock_strategy(symbol: str):
     """
     Get trading strategy recommendation for a stock symbol.
     This includes both news sentiment analysis and technical indicators.
     """
-    return analyze_stock_strategy(symbol)
+    return await analyze_stock_strategy(symbol)
 
 @router.get("/strategy/crypto/{symbol}", tags=["Crypto Strategy"])
-def get_crypto_strategy(symbol: str):
+async def get_crypto_strategy(symbol: str):
     """
     Get trading strategy recommendation for a crypto symbol.
     This includes both news sentiment analysis and technical indicators.
     """
-    return analyze_crypto_strategy(symbol)
+    return await analyze_crypto_strategy(symbol)
 
 @router.get("/strategy", tags=["Strategy"])
-def get_strategy(symbol: str, is_crypto: bool = False):
+async def get_strategy(symbol: str, is_crypto: bool = False):
     """
     Get trading strategy recommendation based on the is_crypto flag.
     This endpoint is used by the frontend.
     """
     if is_crypto:
-        return analyze_crypto_strategy(symbol)
+        return await analyze_crypto_strategy(symbol)
     else:
-        return analyze_stock_strategy(symbol)
+        return await analyze_stock_strategy(symbol)
+
+@router.get("/strategy/sentiment/{symbol}", tags=["Strategy"])
+async def get_symbol_sentiment(symbol: str):
+    """
+    Get the rolling news sentiment of a symbol: the time-decayed share of positive
+    articles, the decayed article weight behind it and its recent history.
+    """
+    sentiment = sentiment_store.get_sentiment(symbol)
+    if sentiment is None:
+        return {"error": f"No news sentiment for {symbol.upper()} yet."}
+    return sentiment
+
+class BatchSymbol(BaseModel):
+    symbol: str
+    is_crypto: bool = False
+
+class StrategyBatch(BaseModel):
+    symbols: List[BatchSymbol]
+
+@router.post("/strategy/batch", tags=["Strategy"])
+async def get_strategy_batch(batch: StrategyBatch):
+    """
+    Get trading strategy recommendations for a mixed list of stock and crypto symbols,
+    returned as {"results": {symbol: strategy}}. Price history, news and sentiment
+    scoring are fetched once for the whole batch instead of once per symbol.
+    """
+    return await analyze_strategy_batch([(item.symbol, item.is_crypto) for item in batch.symbols])
 
 @router.get("/strategy/recommended-stocks", tags=["Recommendations"])
-def get_stock_recommendations():
+async def get_stock_recommendations(request: Request, stream: Optional[str] = None):
     """
     Get a list of recommended stocks based on technical and sentiment analysis.
+    With ?stream=ndjson|sse, each symbol's result is sent as soon as it is ready.
     """
-    return get_recommended_stocks()
+    fmt = stream_format(request, stream)
+    if fmt:
+        return event_stream(stream_recommendations(is_crypto=False), fmt)
+    return await snapshot_response(request, "recommended_stocks")
 
 @router.get("/strategy/recommended-cryptos", tags=["Recommendations"])
-def get_crypto_recommendations():
+async def get_crypto_recommendations(request: Request, stream: Optional[str] = None):
     """
     Get a list of recommended cryptocurrencies based on technical and sentiment analysis.
+    With ?stream=ndjson|sse, each symbol's result is sent as soon as it is ready.
     """
-    return get_recommended_cryptos()
+    fmt = stream_format(request, stream)
+    if fmt:
+        return event_stream(stream_recommendations(is_crypto=True), fmt)
+    return await snapshot_response(request, "recommended_cryptos")
 
 
@@ -0,0 +1,68 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from services.price_stream import STREAM_MAX_SYMBOLS, Subscriber, hub
+
+router = APIRouter()
+
+STREAM_SEND_TIMEOUT = 10  # seconds a client may take to receive one batch
+
+def _symbols(value) -> list:
+    if isinstance(value, str):
+        value = value.split(",")
+    return [symbol.strip().upper() for symbol in value or [] if symbol and symbol.strip()]
+
+@router.websocket("/ws/prices")
+async def price_stream(websocket: WebSocket):
+    """
+    Stream live prices and indicators for the subscribed symbols.
+
+    Subscribe with query parameters (`?symbols=BTC,ETH&crypto=true`) and/or
+    messages: {"action": "subscribe" | "unsubscribe", "symbols": [...], "crypto": true}.
+    Each frame is {"updates": [...]} with the newest update of every symbol that
+    changed since the previous frame.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+
+    def apply(action: str, symbols: list, is_crypto: bool) -> bool:
+        if action == "subscribe":
+            if len(subscriber.channels) + len(symbols) > STREAM_MAX_SYMBOLS:
+                return False
+            for symbol in symbols:
+                hub.subscribe(subscriber, symbol, is_crypto)
+        elif action == "unsubscribe":
+            for symbol in symbols:
+                hub.unsubscribe(subscriber, symbol, is_crypto)
+        return True
+
+    async def send_updates():
+        while True:
+            batch = await subscriber.next_batch()
+            await asyncio.wait_for(websocket.send_json({"updates": batch}), STREAM_SEND_TIMEOUT)
+
+    sender = asyncio.ensure_future(send_updates())
+    receiver = None
+    try:
+        params = websocket.query_params
+        if not apply("subscribe", _symbols(params.get("symbols")), params.get("crypto", "true").lower() != "false"):
+            await websocket.send_json({"error": f"At most {STREAM_MAX_SYMBOLS} symbols per connection."})
+
+        receiver = asyncio.ensure_future(websocket.receive_json())
+        while True:
+            # Stop as soon as either side fails: a client that can't keep up is disconnected
+            done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                sender.result()
+            message = receiver.result()
+            if not isinstance(message, dict) or message.get("action") not in ("subscribe", "unsubscribe"):
+                await websocket.send_json({"error": "Expected {\"action\": \"subscribe\" | \"unsubscribe\", \"symbols\": [...]}"})
+            elif not apply(message["action"], _symbols(message.get("symbols")), bool(message.get("crypto", True))):
+                await websocket.send_json({"error": f"At most {STREAM_MAX_SYMBOLS} symbols per connection."})
+            receiver = asyncio.ensure_future(websocket.receive_json())
+    except (WebSocketDisconnect, asyncio.TimeoutError, ValueError):
+        pass
+    finally:
+        hub.unsubscribe_all(subscriber)
+        sender.cancel()
+        if receiver is not None:
+            receiver.cancel()
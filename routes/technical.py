@@ -4,20 +4,20 @@ from services.technical_analysis import get_stock_technical_indicator, get_crypt
 router = APIRouter()
 
 @router.get("/technical/stock/{symbol}", tags=["Stock Technical"])
-def get_stock_technical(symbol: str):
+async def get_stock_technical(symbol: str):
     """
     Get technical indicators for a given stock symbol.
 
     Returns common indicators such as RSI, MA (Moving Average), and Volume.
     """
-    return get_stock_technical_indicator(symbol)
+    return await get_stock_technical_indicator(symbol)
 
 @router.get("/technical/crypto/{symbol}", tags=["Crypto Technical"])
-def get_crypto_technical(symbol: str):
+async def get_crypto_technical(symbol: str):
     """
     Get technical indicators for a given crypto symbol.
 
     Returns common indicators such as RSI, MA (Moving Average), and Volume.
     """
-    return get_crypto_technical_indicator(symbol)
+    return await get_crypto_technical_indicator(symbol)
 
@@ -0,0 +1,174 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.indicators import compute_indicators, pad_histories
+from services.price_history import fetch_history, symbol_history
+
+# Rule settings, as in generate_strategy_signal
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+SENTIMENT_THRESHOLD = 0.6  # share of positive (or negative) headlines that counts as a signal
+TRADING_DAYS = 252
+
+# Signal codes
+BUY = 1
+HOLD = 0
+SELL = -1
+
+def strategy_signals(
+    close: np.ndarray,
+    volume: Optional[np.ndarray] = None,
+    sentiment: Optional[np.ndarray] = None,
+    ma_windows: Tuple[int, int] = (20, 120),
+    volume_spike: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Evaluate the generate_strategy_signal rules on every bar of a universe.
+
+    `close`, `volume` and `sentiment` are (symbols x time) matrices; sentiment
+    is the share of positive headlines known at each bar's close (NaN where
+    there is none). Returns an int8 matrix of BUY / HOLD / SELL:
+
+    - RSI below 30 is a buy, above 70 a sell
+    - the fast MA above the slow MA is a buy, below it a sell
+    - a positive share above 0.6 is a buy, a negative share above 0.6 a sell
+    - conflicting buy and sell signals make a hold
+
+    The live volume rule compares the volume with itself and never fires, so it
+    is off by default; `volume_spike` (e.g. 1.5) applies the intended rule, a
+    sell when volume exceeds that multiple of its 20-bar mean.
+    """
+    fast, slow = ma_windows
+    indicators = compute_indicators(close, volume, ma_windows=(fast, slow))
+    rsi = indicators["RSI"]
+    ma_fast, ma_slow = indicators[f"MA_{fast}"], indicators[f"MA_{slow}"]
+
+    # NaN compares False, so bars without enough history raise no signal, as in the live code
+    with np.errstate(invalid="ignore"):
+        buy = (rsi < RSI_OVERSOLD) | (ma_fast > ma_slow)
+        sell = (rsi > RSI_OVERBOUGHT) | (ma_fast < ma_slow)
+        if volume_spike is not None and volume is not None:
+            sell |= indicators["Volume_ratio"] > volume_spike
+        if sentiment is not None:
+            sentiment = np.atleast_2d(np.asarray(sentiment, dtype=float))
+            buy |= sentiment > SENTIMENT_THRESHOLD
+            sell |= (1 - sentiment) > SENTIMENT_THRESHOLD
+
+    signals = np.zeros(buy.shape, dtype=np.int8)
+    signals[buy & ~sell] = BUY
+    signals[sell & ~buy] = SELL
+    return signals
+
+def positions_from_signals(signals: np.ndarray, allow_short: bool = False) -> np.ndarray:
+    """
+    Target position after each bar: long on Buy, flat (or short) on Sell, and
+    unchanged on Hold. Forward-filled along time without a Python loop.
+    """
+    rows, width = signals.shape
+    target = np.where(signals == BUY, 1.0, np.where(signals == SELL, -1.0 if allow_short else 0.0, np.nan))
+    # Index of the last bar with a Buy/Sell at or before each bar, then gather
+    last = np.where(~np.isnan(target), np.arange(width), -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    filled = target[np.arange(rows)[:, None], np.maximum(last, 0)]
+    return np.where(last >= 0, filled, 0.0)
+
+def run_backtest(
+    close: np.ndarray,
+    volume: Optional[np.ndarray] = None,
+    sentiment: Optional[np.ndarray] = None,
+    ma_windows: Tuple[int, int] = (20, 120),
+    volume_spike: Optional[float] = None,
+    allow_short: bool = False,
+    cost_bps: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Backtest the strategy rules over a (symbols x time) universe.
+
+    A signal is acted on at the close of the bar it is computed on, so the
+    position earns the next bar's return (no look-ahead). `cost_bps` is charged
+    on every change of position. Returns (symbols x time) "signals",
+    "positions", "returns" and "equity" (starting at 1.0), plus per-symbol
+    arrays "total_return", "cagr", "max_drawdown", "hit_rate", "trades",
+    "exposure" and "buy_and_hold".
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=float))
+    rows, width = close.shape
+    signals = strategy_signals(close, volume, sentiment, ma_windows, volume_spike)
+    positions = positions_from_signals(signals, allow_short)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bar_returns = np.zeros((rows, width))
+        bar_returns[:, 1:] = close[:, 1:] / close[:, :-1] - 1
+    bar_returns = np.nan_to_num(bar_returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    held = np.zeros((rows, width))
+    held[:, 1:] = positions[:, :-1]
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    returns = held * bar_returns - turnover * cost_bps / 10_000
+    equity = np.cumprod(1 + returns, axis=1)
+
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+    bars = np.maximum((~np.isnan(close)).sum(axis=1), 1)
+    total_return = equity[:, -1] - 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cagr = np.where(equity[:, -1] > 0, equity[:, -1] ** (TRADING_DAYS / bars) - 1, -1.0)
+
+    # Trades: runs of bars spent in the same non-zero position; a trade wins if its compounded return is positive
+    entering = (held != 0) & (np.diff(held, axis=1, prepend=0.0) != 0)
+    trade_ids = np.cumsum(entering, axis=1) * (held != 0)
+    trades = trade_ids.max(axis=1)
+    offsets = np.concatenate(([0], np.cumsum(trades + 1)[:-1]))
+    flat_ids = (trade_ids + offsets[:, None]).ravel()
+    log_returns = np.log1p(np.maximum(returns, -0.999999)).ravel()
+    trade_returns = np.bincount(flat_ids, weights=log_returns, minlength=int((trades + 1).sum()))
+    wins = trade_returns > 0
+    wins[offsets] = False  # id 0 of each row collects the bars out of the market
+    win_counts = np.add.reduceat(wins.astype(np.int64), offsets) if rows else np.zeros(0)
+    hit_rate = np.where(trades > 0, win_counts / np.maximum(trades, 1), np.nan)
+
+    first = np.argmax(~np.isnan(close), axis=1)
+    last_close = close[:, -1]
+    buy_and_hold = last_close / close[np.arange(rows), first] - 1
+
+    return {
+        "signals": signals,
+        "positions": positions,
+        "returns": returns,
+        "equity": equity,
+        "total_return": total_return,
+        "cagr": cagr,
+        "max_drawdown": drawdown.min(axis=1),
+        "hit_rate": hit_rate,
+        "trades": trades,
+        "exposure": (held != 0).sum(axis=1) / bars,
+        "buy_and_hold": buy_and_hold,
+    }
+
+def summarize(result: Dict[str, np.ndarray], symbols: Sequence[str]) -> List[dict]:
+    """Per-symbol statistics of a run_backtest result, JSON-ready."""
+    def number(value, digits=4):
+        value = float(value)
+        return None if np.isnan(value) else round(value, digits)
+
+    return [
+        {
+            "symbol": symbol,
+            "total_return": number(result["total_return"][row]),
+            "cagr": number(result["cagr"][row]),
+            "max_drawdown": number(result["max_drawdown"][row]),
+            "hit_rate": number(result["hit_rate"][row]),
+            "trades": int(result["trades"][row]),
+            "exposure": number(result["exposure"][row]),
+            "buy_and_hold": number(result["buy_and_hold"][row]),
+        }
+        for row, symbol in enumerate(symbols)
+    ]
+
+async def backtest_symbols(symbols: List[str], period: str = "10y", **kwargs) -> List[dict]:
+    """Fetch daily history for `symbols` in one bulk request and backtest them."""
+    history = await fetch_history(symbols, period=period)
+    histories = [symbol_history(history, symbol) for symbol in symbols]
+    close = pad_histories([hist["Close"] for hist in histories])
+    volume = pad_histories([hist["Volume"] for hist in histories])
+    return summarize(run_backtest(close, volume, **kwargs), symbols)
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Cache settings
+REDIS_URL = os.getenv("REDIS_URL")  # shared tier; without it each worker only has its local tier
+CACHE_KEY_PREFIX = "tradesense"
+CACHE_MAX_ITEMS = int(os.getenv("CACHE_MAX_ITEMS", 1024))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+SWEEP_EVERY = 256  # writes between sweeps of expired local entries
+CACHE_BREAKER_SECONDS = float(os.getenv("CACHE_BREAKER_SECONDS", 30))  # shared tier skipped this long after a failure
+
+def _json_default(value):
+    # numpy scalars and similar expose .item()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def encode(value: Any) -> bytes:
+    return json.dumps(value, default=_json_default).encode()
+
+class LocalBackend:
+    """
+    In-process stand-in for the Redis tier (get / set with expiry / delete).
+    Used in tests and benchmarks; fakeredis.FakeRedis() works as well.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                del self._data[key]
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+def _default_backend():
+    if not REDIS_URL:
+        return None
+    try:
+        import redis
+        return redis.Redis.from_url(REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+    except Exception as e:
+        logging.error(f"Redis cache tier disabled: {e}")
+        return None
+
+class TieredCache:
+    """
+    Two-tier cache: a bounded in-process LRU with per-entry TTL in front of a
+    shared Redis tier. Values must be JSON-serializable.
+
+    Lookups go local first, then shared (re-filling the local tier). Writes go to
+    both. The local tier is bounded by item count and encoded size; expired
+    entries are dropped lazily on read and by a periodic sweep. Errors from the
+    shared tier are logged and treated as misses, never raised; after one the
+    shared tier is skipped for CACHE_BREAKER_SECONDS, so a slow or down Redis
+    costs one timeout rather than one per lookup.
+
+    Async code uses aget / aset / adelete, which reach the shared tier from a
+    worker thread and never block the event loop; get / set / delete are for
+    synchronous callers.
+
+    Cached values are shared, not copied: every hit of the local tier returns
+    the same object, so callers must treat them as read-only.
+    """
+
+    def __init__(self, name: str, ttl: int, max_items: int = CACHE_MAX_ITEMS,
+                 max_bytes: int = CACHE_MAX_BYTES, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.shared_errors = 0
+        self._shared_down_until = 0.0
+
+    def _shared_key(self, key: str) -> str:
+        return f"{CACHE_KEY_PREFIX}:{self.name}:{key}"
+
+    def _drop(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _store_local(self, key: str, value: Any, expires_at: float, size: int):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_items or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    # --- Shared tier, behind a circuit breaker ---
+    def _shared_available(self) -> bool:
+        return self.backend is not None and time.time() >= self._shared_down_until
+
+    def _shared_failed(self, action: str, error: Exception):
+        with self._lock:
+            self.shared_errors += 1
+            self._shared_down_until = time.time() + CACHE_BREAKER_SECONDS
+        logging.error(f"Shared cache {action} failed for {self.name}, skipping it for {CACHE_BREAKER_SECONDS:g}s: {error}")
+
+    def _read_shared(self, key: str) -> Optional[bytes]:
+        if not self._shared_available():
+            return None
+        try:
+            return self.backend.get(self._shared_key(key))
+        except Exception as e:
+            self._shared_failed("read", e)
+            return None
+
+    def _write_shared(self, key: str, raw: bytes, ttl: float):
+        if not self._shared_available():
+            return
+        try:
+            self.backend.set(self._shared_key(key), raw, ex=max(1, int(ttl)))
+        except Exception as e:
+            self._shared_failed("write", e)
+
+    def _delete_shared(self, key: str):
+        if not self._shared_available():
+            return
+        try:
+            self.backend.delete(self._shared_key(key))
+        except Exception as e:
+            self._shared_failed("delete", e)
+
+    # --- Local tier ---
+    def _get_local(self, key: str, now: float) -> tuple:
+        """(True, value) on a local hit, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[0]
+                self._drop(key)
+                self.expirations += 1
+        return False, None
+
+    def _from_shared(self, key: str, raw: Optional[bytes], now: float, default: Any) -> Any:
+        if raw is not None:
+            entry = json.loads(raw)
+            if entry["expires_at"] > now:
+                with self._lock:
+                    self._store_local(key, entry["value"], entry["expires_at"], len(raw))
+                    self.shared_hits += 1
+                return entry["value"]
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _set_local(self, key: str, value: Any, ttl: float) -> bytes:
+        expires_at = time.time() + ttl
+        # The expiry travels with the value so the local tier never outlives the shared entry
+        raw = encode({"expires_at": expires_at, "value": value})
+        with self._lock:
+            self._store_local(key, value, expires_at, len(raw))
+            self._writes += 1
+            sweep = self._writes % SWEEP_EVERY == 0
+        if sweep:
+            self.sweep()
+        return raw
+
+    def _delete_local(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    # --- Synchronous API ---
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        hit, value = self._get_local(key, now)
+        if hit:
+            return value
+        return self._from_shared(key, self._read_shared(key), now, default)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = ttl or self.ttl
+        raw = self._set_local(key, value, ttl)
+        self._write_shared(key, raw, ttl)
+
+    def delete(self, key: str):
+        self._delete_local(key)
+        self._delete_shared(key)
+
+    # --- Async API: the shared tier is reached from a worker thread ---
+    async def aget(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        hit, value = self._get_local(key, now)
+        if hit:
+            return value
+        raw = await asyncio.to_thread(self._read_shared, key) if self._shared_available() else None
+        return self._from_shared(key, raw, now, default)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = ttl or self.ttl
+        raw = self._set_local(key, value, ttl)
+        if self._shared_available():
+            await asyncio.to_thread(self._write_shared, key, raw, ttl)
+
+    async def adelete(self, key: str):
+        self._delete_local(key)
+        if self._shared_available():
+            await asyncio.to_thread(self._delete_shared, key)
+
+    def sweep(self) -> int:
+        """Drop expired local entries; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[1] <= now]
+            for key in expired:
+                self._drop(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        """Empty the local tier (the shared tier expires on its own)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "shared_errors": self.shared_errors,
+            }
+
+# --- Named caches shared across the services ---
+_caches: Dict[str, TieredCache] = {}
+_caches_lock = threading.Lock()
+_shared_backend = _default_backend()
+
+def get_cache(name: str, ttl: int, **kwargs) -> TieredCache:
+    """Return the cache registered under `name`, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            kwargs.setdefault("backend", _shared_backend)
+            cache = _caches[name] = TieredCache(name, ttl, **kwargs)
+        return cache
+
+def all_caches() -> Dict[str, TieredCache]:
+    return dict(_caches)
+
+def shared_backend():
+    """The shared tier every cache uses, or None when there is none."""
+    return _shared_backend
+
+def set_shared_backend(backend):
+    """Point every cache at another shared tier (e.g. LocalBackend() in tests)."""
+    global _shared_backend
+    _shared_backend = backend
+    for cache in _caches.values():
+        cache.backend = backend
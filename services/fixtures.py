@@ -0,0 +1,276 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+import httpx
+
+from services import http_client, price_history, sentiment
+from services.price_history import FixtureProvider, RecordingProvider
+
+# Fixture layout: http.json (upstream HTTP responses), sentiment.json (scored
+# documents) and prices/<SYMBOL>.csv (price history), all under FIXTURE_DIR
+FIXTURE_DIR = os.getenv("FIXTURE_DIR", "fixtures")
+HTTP_FILE = "http.json"
+SENTIMENT_FILE = "sentiment.json"
+PRICES_DIR = "prices"
+
+# Upstream of each host, for the injected latency
+UPSTREAM_HOSTS = {
+    "api.binance.com": "binance",
+    "api.coingecko.com": "coingecko",
+    "newsapi.org": "newsapi",
+    "models.github.ai": "gpt",
+    "query1.finance.yahoo.com": "yahoo",
+}
+
+# Typical round trip of each upstream (seconds), injected on replay; scale with FIXTURE_LATENCY_SCALE
+DEFAULT_LATENCY = {
+    "yfinance": 0.4,
+    "yahoo": 0.15,
+    "binance": 0.08,
+    "coingecko": 0.25,
+    "newsapi": 0.3,
+    "azure": 0.3,
+    "gpt": 2.5,
+}
+FIXTURE_LATENCY_SCALE = float(os.getenv("FIXTURE_LATENCY_SCALE", 1))
+
+# Query parameters that carry credentials; never part of a fixture key
+SECRET_PARAMS = {"apikey", "api_key", "key", "token", "access_token"}
+
+def latency_table(latency: Optional[Dict[str, float]] = None, scale: float = FIXTURE_LATENCY_SCALE) -> Dict[str, float]:
+    """DEFAULT_LATENCY with overrides applied, multiplied by `scale` (0 disables the delays)."""
+    table = dict(DEFAULT_LATENCY, **(latency or {}))
+    return {name: seconds * scale for name, seconds in table.items()}
+
+def request_params(url: str) -> Dict[str, str]:
+    """Query parameters of a URL, without credentials."""
+    return {name: value for name, value in parse_qsl(urlsplit(url).query) if name.lower() not in SECRET_PARAMS}
+
+def fixture_key(method: str, url: str, body: bytes = b"") -> str:
+    """
+    Key of a recorded request: method, host, path and the sorted query without
+    credentials, plus a hash of the body for requests that have one.
+    """
+    parts = urlsplit(url)
+    query = "&".join(f"{name}={value}" for name, value in sorted(request_params(url).items()))
+    key = f"{method.upper()} {parts.netloc}{parts.path}?{query}"
+    if body:
+        key += "#" + hashlib.sha256(body).hexdigest()[:16]
+    return key
+
+def _route(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.netloc}{parts.path}"
+
+class FixtureStore:
+    """
+    Recorded upstream responses, keyed by fixture_key.
+
+    `lookup` prefers an exact match. Otherwise it falls back to a response for
+    the same method, host and path whose query shares the most parameters
+    (e.g. the klines of the same symbol with another startTime), so a replay
+    keeps working when the app asks a slightly different question.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, dict]] = None):
+        self.entries: Dict[str, dict] = {}
+        self._routes: Dict[str, List[Tuple[Dict[str, str], dict]]] = {}
+        for key, entry in (entries or {}).items():
+            self._index(key, entry)
+
+    def _index(self, key: str, entry: dict):
+        previous = self.entries.get(key)
+        self.entries[key] = entry
+        routes = self._routes.setdefault(_route(entry["method"], entry["url"]), [])
+        routes[:] = [item for item in routes if item[1] is not previous]
+        routes.append((request_params(entry["url"]), entry))
+
+    def add(self, method: str, url: str, status: int, body: bytes, content_type: str = "application/json",
+            request_body: bytes = b""):
+        # Credentials are dropped from the stored URL as well as the key
+        parts = urlsplit(url)
+        query = "&".join(f"{name}={value}" for name, value in request_params(url).items())
+        self._index(fixture_key(method, url, request_body), {
+            "method": method.upper(),
+            "url": parts._replace(query=query).geturl(),
+            "status": status,
+            "content_type": content_type,
+            "body": body.decode("utf-8", errors="replace"),
+        })
+
+    def lookup(self, method: str, url: str, body: bytes = b"") -> Tuple[Optional[dict], bool]:
+        """The recorded response for a request and whether it matched exactly."""
+        entry = self.entries.get(fixture_key(method, url, body))
+        if entry is not None:
+            return entry, True
+        candidates = self._routes.get(_route(method, url))
+        if not candidates:
+            return None, False
+        params = request_params(url)
+        _, entry = max(candidates, key=lambda item: sum(params.get(name) == value for name, value in item[0].items()))
+        return entry, False
+
+    @classmethod
+    def load(cls, path: str) -> "FixtureStore":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+# --- HTTP transports ---
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Send requests to the network and record every response into a FixtureStore."""
+
+    def __init__(self, store: FixtureStore, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.store = store
+        self.inner = inner or httpx.AsyncHTTPTransport(http2=http_client.HTTP2_ENABLED)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        # Read through a Response so the body is stored decoded
+        body = await httpx.Response(response.status_code, headers=response.headers, stream=response.stream).aread()
+        content_type = response.headers.get("content-type", "application/json")
+        self.store.add(request.method, str(request.url), response.status_code, body, content_type, request.content)
+        return httpx.Response(response.status_code, headers={"content-type": content_type}, content=body)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answer requests from a FixtureStore without touching the network.
+
+    Every response is delayed by its upstream's entry in `latency`, so the app
+    sees realistic round trips. Requests without any recording get a 404 and
+    are counted in `misses`.
+    """
+
+    def __init__(self, store: FixtureStore, latency: Optional[Dict[str, float]] = None):
+        self.store = store
+        self.latency = latency if latency is not None else latency_table()
+        self.hits = 0
+        self.fallbacks = 0
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        delay = self.latency.get(UPSTREAM_HOSTS.get(request.url.host, ""), 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        entry, exact = self.store.lookup(request.method, str(request.url), request.content)
+        if entry is None:
+            self.misses += 1
+            logging.warning(f"No fixture for {request.method} {_route(request.method, str(request.url))}")
+            return httpx.Response(404, json={"error": "no fixture recorded"}, request=request)
+        if exact:
+            self.hits += 1
+        else:
+            self.fallbacks += 1
+        return httpx.Response(entry["status"], headers={"content-type": entry["content_type"]},
+                              content=entry["body"].encode(), request=request)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "fallbacks": self.fallbacks, "misses": self.misses}
+
+# --- Sentiment ---
+class FixtureSentimentClient(sentiment.LocalSentimentClient):
+    """
+    Sentiment client that records or replays scored documents by content hash.
+
+    With `inner` (e.g. the Azure client) documents are scored by it and
+    recorded; without it recorded scores are replayed and unknown documents are
+    scored with the LocalSentimentClient word list. `latency` seconds are spent
+    on every replayed call.
+    """
+
+    def __init__(self, scores: Optional[Dict[str, dict]] = None, inner=None, latency: float = 0.0):
+        super().__init__(latency=0.0 if inner else latency)
+        self.scores = scores if scores is not None else {}
+        self.inner = inner
+
+    def analyze_sentiment(self, documents: List[str], language: str = "en") -> list:
+        if self.inner is not None:
+            results = self.inner.analyze_sentiment(documents, language=language)
+            for doc, result in zip(documents, results):
+                if not getattr(result, "is_error", False):
+                    scores = result.confidence_scores
+                    self.scores[sentiment.document_key(doc)] = {
+                        "label": result.sentiment, "positive": scores.positive,
+                        "neutral": scores.neutral, "negative": scores.negative,
+                    }
+            return results
+
+        results = super().analyze_sentiment(documents, language=language)
+        for i, doc in enumerate(documents):
+            recorded = self.scores.get(sentiment.document_key(doc))
+            if recorded is not None:
+                scores = self._Scores(recorded["positive"], recorded["neutral"], recorded["negative"])
+                results[i] = self._Document(str(i), recorded["label"], scores)
+        return results
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "FixtureSentimentClient":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f), **kwargs)
+        except FileNotFoundError:
+            return cls(**kwargs)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.scores, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+# --- Installing ---
+class Recording:
+    """Handle of install_recording; `save()` writes what was recorded so far."""
+
+    def __init__(self, directory: str, store: FixtureStore, sentiment_client: FixtureSentimentClient):
+        self.directory = directory
+        self.store = store
+        self.sentiment_client = sentiment_client
+
+    def save(self):
+        self.store.save(os.path.join(self.directory, HTTP_FILE))
+        self.sentiment_client.save(os.path.join(self.directory, SENTIMENT_FILE))
+
+def install_recording(directory: str = FIXTURE_DIR) -> Recording:
+    """
+    Record every upstream the app talks to (HTTP, price history and sentiment)
+    into `directory`, on top of what is already there. Call before the first
+    request and `save()` the returned handle when done.
+    """
+    store = FixtureStore.load(os.path.join(directory, HTTP_FILE))
+    http_client.set_transport(RecordingTransport(store))
+    price_history.set_provider(RecordingProvider(price_history.get_provider(), os.path.join(directory, PRICES_DIR)))
+    client = FixtureSentimentClient.load(os.path.join(directory, SENTIMENT_FILE), inner=sentiment.get_client())
+    sentiment.set_client(client)
+    return Recording(directory, store, client)
+
+def install_replay(directory: str = FIXTURE_DIR, latency: Optional[Dict[str, float]] = None) -> ReplayTransport:
+    """
+    Serve every upstream from the recordings in `directory`, with `latency`
+    seconds per upstream (defaults to latency_table()). Call before the first
+    request; returns the transport, whose stats() count the matches.
+    """
+    latency = latency if latency is not None else latency_table()
+    transport = ReplayTransport(FixtureStore.load(os.path.join(directory, HTTP_FILE)), latency)
+    http_client.set_transport(transport)
+    price_history.set_provider(FixtureProvider(os.path.join(directory, PRICES_DIR), latency=latency.get("yfinance", 0)))
+    sentiment.set_client(FixtureSentimentClient.load(os.path.join(directory, SENTIMENT_FILE), latency=latency.get("azure", 0)))
+    logging.info(f"Replaying {len(transport.store.entries)} HTTP fixtures from {directory}")
+    return transport
@@ -1,9 +1,12 @@
 import os
-import requests
 from dotenv import load_dotenv
-import time
-from typing import List, Dict, Optional
-import json
+import hashlib
+from typing import List, Optional
+from services import http_client, metrics, rate_limiter
+from services.cache import get_cache
+from services.rate_limiter import RateLimited
+from services.scanner import upstream_slot
+from services.tracing import traced
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,101 +15,51 @@ GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 ENDPOINT = "https://models.github.ai/inference"
 MODEL_NAME = "openai/gpt-4.1"
 
-if not GITHUB_TOKEN:
-    raise ValueError("GITHUB_TOKEN is not set in the .env file")
+def is_configured() -> bool:
+    return bool(GITHUB_TOKEN)
 
-headers = {
-    "Authorization": f"Bearer {GITHUB_TOKEN}",
-    "Content-Type": "application/json"
-}
+def request_headers() -> dict:
+    # Checked per call rather than at import, so the app boots (with GPT analysis disabled) without a token
+    if not GITHUB_TOKEN:
+        raise ValueError("GITHUB_TOKEN is not set in the .env file")
+    return {
+        "Authorization": f"Bearer {GITHUB_TOKEN}",
+        "Content-Type": "application/json"
+    }
 
-# Global variables tracking API call status
-LAST_CALL_TIMESTAMP = 0
-CALLS_TODAY = 0
-MAX_CALLS_PER_DAY = 40  # Safety limit, slightly lower than actual limit to leave margin
-CACHE_FILE = "gpt_cache.json"
+# The daily call budget and request rate are enforced by the shared "gpt" rate limit
+# (services/rate_limiter.py), so every worker process draws from the same quota
+GPT_CACHE_TTL = 7 * 24 * 3600  # GPT analyses are kept for a week
 
-# Load cache
-def load_gpt_cache() -> Dict:
-    try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r') as f:
-                cache_data = json.load(f)
-                
-                # Reset daily counter (if it's a new day)
-                last_date = time.strftime("%Y-%m-%d", time.localtime(cache_data.get("last_timestamp", 0)))
-                today = time.strftime("%Y-%m-%d")
-                
-                if last_date != today:
-                    cache_data["calls_today"] = 0
-                
-                global LAST_CALL_TIMESTAMP, CALLS_TODAY
-                LAST_CALL_TIMESTAMP = cache_data.get("last_timestamp", 0)
-                CALLS_TODAY = cache_data.get("calls_today", 0)
-                
-                return cache_data.get("results", {})
-        return {}
-    except Exception as e:
-        print(f"Error loading GPT cache: {e}")
-        return {}
-
-# Save cache
-def save_gpt_cache(cache: Dict):
-    try:
-        with open(CACHE_FILE, 'w') as f:
-            cache_data = {
-                "results": cache,
-                "last_timestamp": LAST_CALL_TIMESTAMP,
-                "calls_today": CALLS_TODAY
-            }
-            json.dump(cache_data, f)
-    except Exception as e:
-        print(f"Error saving GPT cache: {e}")
-
-# Global cache
-gpt_cache = load_gpt_cache()
-
-def analyze_news_sentiment(news_headlines: List[str]) -> str:
-    """
-    Send financial news headlines to a GPT model and receive 
-    a concise, market-oriented explanation for each headline.
+# GPT results live in the tiered cache (shared through Redis when configured)
+gpt_cache = get_cache("gpt", ttl=GPT_CACHE_TTL)
 
-    The model is expected to provide analytical interpretations
-    without performing sentiment classification.
+NO_ANALYSIS = "No analysis available."
+LIMIT_FALLBACK = "{title} - This news may have some impact on the market, please refer to other analysis tools for detailed information."
 
-    Args:
-        news_headlines (List[str]): A list of news titles/headlines.
+def headline_key(headline: str) -> str:
+    """Content-addressed cache key of a single headline."""
+    return hashlib.sha256(headline.strip().encode()).hexdigest()
 
-    Returns:
-        str: Raw GPT response as a single text block.
+async def request_gpt_analysis(news_headlines: List[str]) -> Optional[str]:
     """
-    global LAST_CALL_TIMESTAMP, CALLS_TODAY, gpt_cache
-    
-    # Generate cache key
-    cache_key = "_".join(sorted(news_headlines))[:500]  # Limit key length
-    
-    # Check cache
-    if cache_key in gpt_cache:
-        print("Using cached GPT results")
-        return gpt_cache[cache_key]
-    
-    # Check API call limits
-    current_time = time.time()
-    today = time.strftime("%Y-%m-%d")
-    last_call_date = time.strftime("%Y-%m-%d", time.localtime(LAST_CALL_TIMESTAMP))
-    
-    # If it's a new day, reset counter
-    if last_call_date != today:
-        CALLS_TODAY = 0
-    
-    # Check if daily limit exceeded
-    if CALLS_TODAY >= MAX_CALLS_PER_DAY:
-        print(f"Daily API call limit reached ({MAX_CALLS_PER_DAY})")
-        return "Daily API call limit reached. Here is a general analysis:\n" + "\n".join([
-            f"{i+1}. {title} - This news may have some impact on the market, please refer to other analysis tools for detailed information."
-            for i, title in enumerate(news_headlines)
-        ])
-    
+    Send headlines to the GPT model in a single prompt and return the raw reply,
+    or None if the daily call limit has been reached.
+
+    Waits for a token of the shared "gpt" rate limit and raises RateLimited
+    if none frees up within the limit's wait.
+    """
+    headers = request_headers()
+
+    try:
+        await rate_limiter.acquire("gpt")
+    except RateLimited as e:
+        if e.reason != "daily":
+            raise
+        print(f"Daily API call limit reached ({rate_limiter.LIMITS['gpt'].per_day})")
+        metrics.fallbacks.inc("gpt", "daily_limit")
+        return None
+
     prompt = (
         "Analyze each financial news headline below individually. For each one, provide a market-focused interpretation that highlights potential impact, risks, or opportunities. DO NOT include any introductory text like 'Certainly' or 'Here's my analysis'. DO NOT provide interpretations for multiple headlines in one answer. For each headline, only give the analysis for that specific headline.\n\n"
         + "\n".join([f"{i + 1}. {title}" for i, title in enumerate(news_headlines)])
@@ -122,35 +75,155 @@ def analyze_news_sentiment(news_headlines: List[str]) -> str:
         "max_tokens": 600
     }
 
-    try:
-        # Update call statistics
-        LAST_CALL_TIMESTAMP = current_time
-        CALLS_TODAY += 1
-        
-        response = requests.post(f"{ENDPOINT}/chat/completions", headers=headers, json=payload)
-
-        if response.status_code == 200:
-            result = response.json()["choices"][0]["message"]["content"]
-            
-            # Cache results
-            gpt_cache[cache_key] = result
-            save_gpt_cache(gpt_cache)
-            
-            return result
+    # No transport retries: every attempt would spend quota the limiter counted once
+    async with upstream_slot("gpt"):
+        response = await http_client.post(f"{ENDPOINT}/chat/completions", headers=headers, json=payload, retries=0)
+
+    if response.status_code == 200:
+        return response.json()["choices"][0]["message"]["content"]
+
+    error_msg = f"Error from GPT API: {response.status_code} - {response.text}"
+    print(error_msg)
+
+    # If rate limit error, give the call back to the daily quota (since call wasn't successful)
+    if response.status_code == 429:
+        await rate_limiter.refund("gpt")
+
+    raise Exception(error_msg)
+
+async def cached_analysis(headline: str) -> Optional[str]:
+    return await gpt_cache.aget(headline_key(headline or ""))
+
+async def uncached_headlines(news_headlines: List[str]) -> List[str]:
+    """Distinct headlines that have no cached analysis yet, in first-seen order."""
+    missing = []
+    for headline in news_headlines:
+        headline = headline or ""
+        if headline not in missing and await cached_analysis(headline) is None:
+            missing.append(headline)
+    return missing
+
+@traced("gpt")
+async def analyze_headlines(news_headlines: List[str]) -> List[str]:
+    """
+    Return one market-oriented analysis per headline, in input order.
+
+    Analyses are cached per headline by content hash, so only headlines that
+    were never analyzed go into the prompt; the reply is split with
+    parse_gpt_response and merged back with the cached ones.
+    """
+    headlines = [headline or "" for headline in news_headlines]
+    missing = await uncached_headlines(headlines)
+
+    fresh = {}
+    if missing:
+        gpt_raw_response = await request_gpt_analysis(missing)
+        if gpt_raw_response is None:
+            fresh = {headline: LIMIT_FALLBACK.format(title=headline) for headline in missing}
         else:
-            error_msg = f"Error from GPT API: {response.status_code} - {response.text}"
-            print(error_msg)
-            
-            # If rate limit error, reduce counter (since call wasn't successful)
-            if response.status_code == 429:
-                CALLS_TODAY -= 1
-                
-            raise Exception(error_msg)
-    except Exception as e:
-        # Save current state
-        save_gpt_cache(gpt_cache)
-        raise e
+            for headline, analysis in zip(missing, parse_gpt_response(gpt_raw_response, expected_count=len(missing))):
+                fresh[headline] = analysis
+                if analysis != NO_ANALYSIS:
+                    await gpt_cache.aset(headline_key(headline), analysis)
+    else:
+        print("Using cached GPT results")
 
+    return [
+        fresh[headline] if headline in fresh else await gpt_cache.aget(headline_key(headline), NO_ANALYSIS)
+        for headline in headlines
+    ]
 
+async def analyze_news_sentiment(news_headlines: List[str]) -> str:
+    """
+    Send financial news headlines to a GPT model and receive 
+    a concise, market-oriented explanation for each headline.
 
+    The model is expected to provide analytical interpretations
+    without performing sentiment classification.
 
+    Args:
+        news_headlines (List[str]): A list of news titles/headlines.
+
+    Returns:
+        str: Numbered analyses as a single text block, one line per headline.
+    """
+    return "\n".join(f"{i + 1}. {analysis}" for i, analysis in enumerate(await analyze_headlines(news_headlines)))
+
+def parse_gpt_response(gpt_response: str, expected_count: int) -> list:
+    """Parse GPT response into a list of analysis strings with padding if needed."""
+    explanations = []
+    
+    # Split the response by numbered lines (e.g., "1. ", "2. ", etc.)
+    lines = gpt_response.strip().split('\n')
+    current_explanation = ""
+    
+    for line in lines:
+        line = line.strip()
+        # Skip empty lines
+        if not line:
+            continue
+            
+        # Skip intro lines that don't start with a number
+        if not (line[0].isdigit() and ". " in line[:4]):
+            # Check if this is a continuation of a previous explanation
+            if current_explanation:
+                current_explanation += " " + line
+            continue
+            
+        # If we have an existing explanation, add it to the list before starting a new one
+        if current_explanation:
+            explanations.append(clean_explanation(current_explanation))
+            
+        # Start a new explanation, removing the number prefix
+        parts = line.split(". ", 1)
+        if len(parts) > 1:
+            current_explanation = parts[1]
+        else:
+            current_explanation = line
+    
+    # Add the last explanation if there is one
+    if current_explanation:
+        explanations.append(clean_explanation(current_explanation))
+
+    # Pad or trim to match expected count
+    if len(explanations) < expected_count:
+        # Fill missing explanations with placeholder
+        while len(explanations) < expected_count:
+            explanations.append(NO_ANALYSIS)
+    elif len(explanations) > expected_count:
+        explanations = explanations[:expected_count]  # Trim to match expected count
+
+    return explanations
+
+def clean_explanation(text: str) -> str:
+    """Clean up explanation text to remove unwanted patterns"""
+    # Remove introductory phrases
+    patterns_to_remove = [
+        "Certainly!", 
+        "Here's a market-oriented interpretation",
+        "Here's my analysis",
+        "Market analysis:",
+        "Market interpretation:",
+        "**Interpretation:**"
+    ]
+    
+    cleaned_text = text
+    for pattern in patterns_to_remove:
+        if cleaned_text.startswith(pattern):
+            cleaned_text = cleaned_text[len(pattern):].strip()
+    
+    # Remove headline repetition (often appears when GPT repeats the headline)
+    if "**" in cleaned_text and cleaned_text.count("**") >= 2:
+        # Extract content between first set of ** markers
+        headline_parts = cleaned_text.split("**", 2)
+        if len(headline_parts) >= 3:
+            # Check if this looks like a headline
+            potential_headline = headline_parts[1]
+            if len(potential_headline.split()) <= 15:  # Reasonable headline length
+                # Remove the headline part
+                cleaned_text = "".join(headline_parts[2:]).strip()
+                # If the next part starts with **, remove those too
+                if cleaned_text.startswith("**"):
+                    cleaned_text = cleaned_text[2:].strip()
+    
+    return cleaned_text
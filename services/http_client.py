@@ -0,0 +1,130 @@
+import os
+import random
+import asyncio
+import importlib.util
+import logging
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from services import metrics
+from services.scanner import loop_local, loop_local_values
+
+# Client settings (overridable from the environment)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 20))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+HTTP_BACKOFF_BASE = 0.25  # seconds; doubled per attempt, with full jitter
+HTTP_BACKOFF_MAX = 8.0
+HTTP_MAX_RESPONSE_BYTES = int(os.getenv("HTTP_MAX_RESPONSE_BYTES", 16 * 1024 * 1024))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 20))
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None  # httpx needs the h2 package for HTTP/2
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class ResponseTooLarge(httpx.HTTPError):
+    """The upstream response body exceeded the configured size limit."""
+
+_transport: Optional[httpx.AsyncBaseTransport] = None
+
+def set_transport(transport: Optional[httpx.AsyncBaseTransport]):
+    """
+    Send every upstream request through `transport` (e.g. a fixture replay in
+    tests and benchmarks), or back to the network with None. Applies to pools
+    created afterwards, so call it before the first request.
+    """
+    global _transport
+    _transport = transport
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=_transport,
+        http2=HTTP2_ENABLED,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+        ),
+    )
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Shared client for the URL's host: one keep-alive pool per host and event loop."""
+    host = urlsplit(url).netloc.lower()
+    return loop_local(("http_client", host), _new_client)
+
+def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(HTTP_BACKOFF_BASE * 2 ** attempt, HTTP_BACKOFF_MAX))
+
+async def request(method: str, url: str, *, max_bytes: int = HTTP_MAX_RESPONSE_BYTES,
+                  retries: int = HTTP_MAX_RETRIES, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared per-host pool and return the fully read response.
+
+    Connection failures, timeouts and 429/5xx replies are retried with jittered
+    exponential backoff (honouring Retry-After). Non-idempotent requests are only
+    retried when they can't have reached the server (connect errors, 429).
+    Bodies larger than `max_bytes` raise ResponseTooLarge.
+    """
+    method = method.upper()
+    idempotent = method in IDEMPOTENT_METHODS
+    client = get_client(url)
+    host = urlsplit(url).netloc
+
+    for attempt in range(retries + 1):
+        last_attempt = attempt == retries
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        raise ResponseTooLarge(f"Response from {url} exceeded {max_bytes} bytes")
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            metrics.http_responses.inc(host, "connect_error")
+            if last_attempt:
+                raise
+            logging.warning(f"{method} {host} failed ({e!r}), retrying")
+            metrics.http_retries.inc(host)
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        except httpx.TransportError as e:
+            metrics.http_responses.inc(host, "transport_error")
+            if last_attempt or not idempotent:
+                raise
+            logging.warning(f"{method} {host} failed ({e!r}), retrying")
+            metrics.http_retries.inc(host)
+            await asyncio.sleep(_backoff(attempt))
+            continue
+
+        metrics.http_responses.inc(host, f"{response.status_code // 100}xx")
+
+        # The body is already decoded, so the encoding headers no longer apply
+        headers = [
+            (name, value) for name, value in response.headers.multi_items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        result = httpx.Response(response.status_code, headers=headers, content=bytes(body), request=response.request)
+        retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+        if retryable and not last_attempt:
+            metrics.http_retries.inc(host)
+            await asyncio.sleep(_backoff(attempt, response.headers.get("Retry-After")))
+            continue
+        return result
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+async def aclose():
+    """Close the pools of the running event loop (called on application shutdown)."""
+    for client in loop_local_values("http_client"):
+        await client.aclose()
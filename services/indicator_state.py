@@ -0,0 +1,313 @@
+import os
+import json
+import math
+import time
+import atexit
+import logging
+import threading
+from array import array
+from typing import Dict, Optional, Tuple
+
+# State settings
+INDICATOR_STATE_FILE = os.getenv("INDICATOR_STATE_FILE", "indicator_state.json")
+STATE_SAVE_INTERVAL = 30  # min seconds between state file writes
+RSI_PERIOD = 14
+MA_WINDOWS = (20, 50, 120)
+VOLUME_WINDOW = 20
+
+# Candle length per interval, in milliseconds
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+    "1w": 604_800_000,
+}
+
+class IndicatorState:
+    """
+    Incrementally updated RSI / moving-average state for one (symbol, interval).
+
+    `update` ingests one closed candle in constant time: rolling sums are kept
+    over ring buffers of the last closes, gains/losses and volumes. RSI matches
+    the batch engine (simple means of the last 14 moves); a Wilder-smoothed RSI
+    is kept alongside it. Sums are rebuilt from the buffers whenever the close
+    buffer wraps, so float drift cannot accumulate.
+    """
+
+    __slots__ = (
+        "symbol", "interval", "last_time", "last_close", "last_volume", "count",
+        "closes", "gains", "losses", "volumes",
+        "ma_sums", "gain_sum", "loss_sum", "volume_sum",
+        "wilder_gain", "wilder_loss",
+    )
+
+    def __init__(self, symbol: str, interval: str = "1d"):
+        self.symbol = symbol
+        self.interval = interval
+        self.last_time = -1
+        self.last_close = math.nan
+        self.last_volume = math.nan
+        self.count = 0
+        self.closes = array("d", [0.0] * max(MA_WINDOWS))
+        self.gains = array("d", [0.0] * RSI_PERIOD)
+        self.losses = array("d", [0.0] * RSI_PERIOD)
+        self.volumes = array("d", [0.0] * VOLUME_WINDOW)
+        self.ma_sums = array("d", [0.0] * len(MA_WINDOWS))
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.volume_sum = 0.0
+        self.wilder_gain = math.nan
+        self.wilder_loss = math.nan
+
+    def update(self, open_time: int, close: float, volume: float) -> bool:
+        """
+        Ingest one closed candle. Candles at or before the last one are ignored;
+        callers make sure it continues the state (see follows and update_from_candles).
+        """
+        if open_time <= self.last_time:
+            return False
+
+        move = 0.0 if self.count == 0 else close - self.last_close
+        gain, loss = max(move, 0.0), max(-move, 0.0)
+        n = self.count
+
+        # Rolling sums: add the new value, drop the one leaving each window
+        slot = n % len(self.closes)
+        for i, window in enumerate(MA_WINDOWS):
+            leaving = self.closes[(n - window) % len(self.closes)] if n >= window else 0.0
+            self.ma_sums[i] += close - leaving
+        self.closes[slot] = close
+
+        slot = n % RSI_PERIOD
+        self.gain_sum += gain - (self.gains[slot] if n >= RSI_PERIOD else 0.0)
+        self.loss_sum += loss - (self.losses[slot] if n >= RSI_PERIOD else 0.0)
+        self.gains[slot] = gain
+        self.losses[slot] = loss
+
+        slot = n % VOLUME_WINDOW
+        self.volume_sum += volume - (self.volumes[slot] if n >= VOLUME_WINDOW else 0.0)
+        self.volumes[slot] = volume
+
+        # Wilder smoothing, seeded with the simple mean of the first RSI_PERIOD real moves
+        if n == RSI_PERIOD:
+            self.wilder_gain = (self.gain_sum) / RSI_PERIOD
+            self.wilder_loss = (self.loss_sum) / RSI_PERIOD
+        elif n > RSI_PERIOD:
+            self.wilder_gain = (self.wilder_gain * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+            self.wilder_loss = (self.wilder_loss * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+
+        self.count = n + 1
+        self.last_time = open_time
+        self.last_close = close
+        self.last_volume = volume
+        if self.count % len(self.closes) == 0:
+            self._resum()
+        return True
+
+    def _resum(self):
+        n, size = self.count, len(self.closes)
+        for i, window in enumerate(MA_WINDOWS):
+            self.ma_sums[i] = sum(self.closes[(n - 1 - k) % size] for k in range(min(window, n)))
+        self.gain_sum = sum(self.gains[:min(n, RSI_PERIOD)])
+        self.loss_sum = sum(self.losses[:min(n, RSI_PERIOD)])
+        self.volume_sum = sum(self.volumes[:min(n, VOLUME_WINDOW)])
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+            return math.nan
+        if loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+    def values(self) -> Dict[str, float]:
+        """Current indicator values; NaN until enough candles have been seen."""
+        n = self.count
+        result = {
+            "RSI": self._rsi(self.gain_sum / RSI_PERIOD, self.loss_sum / RSI_PERIOD) if n >= RSI_PERIOD else math.nan,
+            "RSI_wilder": self._rsi(self.wilder_gain, self.wilder_loss),
+        }
+        for i, window in enumerate(MA_WINDOWS):
+            result[f"MA_{window}"] = self.ma_sums[i] / window if n >= window else math.nan
+        result["Volume"] = self.last_volume
+        result[f"Volume_MA_{VOLUME_WINDOW}"] = self.volume_sum / VOLUME_WINDOW if n >= VOLUME_WINDOW else math.nan
+        result["last_close"] = self.last_close
+        result["last_time"] = self.last_time
+        return result
+
+    def preview(self, close: float, volume: float) -> Dict[str, float]:
+        """
+        Values as if a candle closing at `close` were ingested now, without
+        changing the state: the live view of the still-open candle, in O(1).
+        """
+        n = self.count
+        move = 0.0 if n == 0 else close - self.last_close
+        gain, loss = max(move, 0.0), max(-move, 0.0)
+        size = len(self.closes)
+
+        slot = n % RSI_PERIOD
+        gain_sum = self.gain_sum + gain - (self.gains[slot] if n >= RSI_PERIOD else 0.0)
+        loss_sum = self.loss_sum + loss - (self.losses[slot] if n >= RSI_PERIOD else 0.0)
+        if n == RSI_PERIOD:
+            wilder_gain, wilder_loss = gain_sum / RSI_PERIOD, loss_sum / RSI_PERIOD
+        elif n > RSI_PERIOD:
+            wilder_gain = (self.wilder_gain * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+            wilder_loss = (self.wilder_loss * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+        else:
+            wilder_gain = wilder_loss = math.nan
+
+        result = {
+            "RSI": self._rsi(gain_sum / RSI_PERIOD, loss_sum / RSI_PERIOD) if n + 1 >= RSI_PERIOD else math.nan,
+            "RSI_wilder": self._rsi(wilder_gain, wilder_loss),
+        }
+        for i, window in enumerate(MA_WINDOWS):
+            leaving = self.closes[(n - window) % size] if n >= window else 0.0
+            result[f"MA_{window}"] = (self.ma_sums[i] + close - leaving) / window if n + 1 >= window else math.nan
+        slot = n % VOLUME_WINDOW
+        volume_sum = self.volume_sum + volume - (self.volumes[slot] if n >= VOLUME_WINDOW else 0.0)
+        result["Volume"] = volume
+        result[f"Volume_MA_{VOLUME_WINDOW}"] = volume_sum / VOLUME_WINDOW if n + 1 >= VOLUME_WINDOW else math.nan
+        return result
+
+    def follows(self, open_time: int) -> bool:
+        """True if a candle opening at `open_time` directly follows the last one (or the state is empty)."""
+        length = INTERVAL_MS.get(self.interval)
+        return self.count == 0 or (length is not None and open_time == self.last_time + length)
+
+    def reset(self):
+        """Forget every candle, e.g. before replaying a window the state is not contiguous with."""
+        self.__init__(self.symbol, self.interval)
+
+    def is_warm(self, window: int = max(MA_WINDOWS)) -> bool:
+        return self.count >= window
+
+    def is_current(self, now: Optional[float] = None) -> bool:
+        """True if the newest candle ingested is the latest one that could have closed."""
+        length = INTERVAL_MS.get(self.interval)
+        if length is None or self.last_time < 0:
+            return False
+        now_ms = (now if now is not None else time.time()) * 1000
+        return now_ms < self.last_time + 2 * length
+
+    def to_dict(self) -> dict:
+        return {
+            name: list(value) if isinstance(value, array) else value
+            for name, value in ((name, getattr(self, name)) for name in self.__slots__)
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        state = cls(data["symbol"], data["interval"])
+        for name in cls.__slots__:
+            value = data.get(name)
+            if value is None:
+                continue
+            if isinstance(getattr(state, name), array):
+                value = array("d", value)
+            setattr(state, name, value)
+        return state
+
+# --- Registry of live states ---
+_states: Dict[Tuple[str, str], IndicatorState] = {}
+_states_lock = threading.Lock()
+_load_lock = threading.Lock()
+_last_save = 0.0
+_loaded = False
+
+def _ensure_loaded():
+    # The state file is read on first use (or by the app's lifespan), not at import
+    if not _loaded:
+        load_states()
+
+def get_state(symbol: str, interval: str = "1d") -> IndicatorState:
+    _ensure_loaded()
+    with _states_lock:
+        state = _states.get((symbol, interval))
+        if state is None:
+            state = _states[(symbol, interval)] = IndicatorState(symbol, interval)
+        return state
+
+def peek_state(symbol: str, interval: str = "1d") -> Optional[IndicatorState]:
+    """Return the state if one exists, without creating it."""
+    _ensure_loaded()
+    return _states.get((symbol, interval))
+
+def closed_rows(open_times, interval: str, now: Optional[float] = None) -> int:
+    """How many of the candles (sorted by open_time) have closed; only the newest can still be open."""
+    length = INTERVAL_MS.get(interval, 0)
+    now_ms = (now if now is not None else time.time()) * 1000
+    rows = len(open_times)
+    while rows > 0 and open_times[rows - 1] + length > now_ms:
+        rows -= 1
+    return rows
+
+def update_from_candles(symbol: str, interval: str, candles: Dict[str, object], now: Optional[float] = None) -> IndicatorState:
+    """
+    Feed the closed candles newer than the state's last one, one at a time.
+    `candles` holds open_time / close / volume columns, as returned by the OHLCV store.
+
+    New candles are only appended if they continue the state: the state's last
+    candle is the one before them in `candles` (so sessions skipping weekends
+    still join) or directly precedes the first. Otherwise (a state persisted
+    long ago, or one that missed candles) it is reset and the whole window is
+    replayed, so candles from both sides of a gap never mix.
+    """
+    state = get_state(symbol, interval)
+    open_times = candles["open_time"]
+    end = closed_rows(open_times, interval, now)
+
+    with _states_lock:
+        # Walk back from the newest closed candle to the first one the state has not seen
+        start = end
+        while start > 0 and open_times[start - 1] > state.last_time:
+            start -= 1
+        joined = (start > 0 and open_times[start - 1] == state.last_time) or (start < end and state.follows(int(open_times[start])))
+        if start < end and not joined:
+            state.reset()
+            start = 0
+        for i in range(start, end):
+            state.update(int(open_times[i]), float(candles["close"][i]), float(candles["volume"][i]))
+
+    maybe_save_states()
+    return state
+
+def save_states(path: str = INDICATOR_STATE_FILE):
+    """Persist all states so they survive restarts."""
+    global _last_save
+    try:
+        with _states_lock:
+            data = [state.to_dict() for state in _states.values()]
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+        _last_save = time.time()
+    except Exception as e:
+        logging.error(f"Error saving indicator state: {e}")
+
+def maybe_save_states():
+    if time.time() - _last_save >= STATE_SAVE_INTERVAL:
+        save_states()
+
+def load_states(path: str = INDICATOR_STATE_FILE):
+    """
+    Load the persisted states (once) and save them again at exit. Until this
+    has run nothing is written, so a process that never used the states can't
+    overwrite the file.
+    """
+    global _loaded
+    with _load_lock:
+        if _loaded:
+            return
+        try:
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    for data in json.load(f):
+                        state = IndicatorState.from_dict(data)
+                        _states[(state.symbol, state.interval)] = state
+        except Exception as e:
+            logging.error(f"Error loading indicator state: {e}")
+        _loaded = True
+        atexit.register(save_states, path)
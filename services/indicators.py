@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Sequence
+
+# numpy is loaded on first use, so importing the app doesn't pay for it
+if TYPE_CHECKING:
+    import numpy as np
+
+from services.tracing import traced
+
+# Default indicator settings
+RSI_PERIOD = 14
+MA_WINDOWS = (20, 50, 120)
+VOLUME_WINDOW = 20
+
+def pad_histories(histories: Sequence[Iterable[float]], length: Optional[int] = None) -> np.ndarray:
+    """
+    Stack per-symbol series into a (symbols x time) matrix.
+
+    Series are right-aligned on their latest value, so column -1 is every symbol's
+    newest bar; shorter histories are NaN-padded on the left.
+    """
+    import numpy as np
+
+    arrays = [np.asarray(history, dtype=float) for history in histories]
+    width = length or max((len(array) for array in arrays), default=0)
+    matrix = np.full((len(arrays), width), np.nan)
+    for row, array in enumerate(arrays):
+        array = array[-width:] if width else array[:0]
+        if len(array):
+            matrix[row, width - len(array):] = array
+    return matrix
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling mean along the time axis using cumulative sums.
+
+    A window that contains any NaN yields NaN, which matches pandas'
+    rolling(window).mean() for the padded and not-yet-full windows.
+    """
+    import numpy as np
+
+    values = np.atleast_2d(values)
+    rows, width = values.shape
+    result = np.full((rows, width), np.nan)
+    if window > width:
+        return result
+
+    valid = ~np.isnan(values)
+    sums = np.zeros((rows, width + 1))
+    counts = np.zeros((rows, width + 1), dtype=np.int64)
+    np.cumsum(np.where(valid, values, 0.0), axis=1, out=sums[:, 1:])
+    np.cumsum(valid, axis=1, out=counts[:, 1:])
+
+    window_sums = sums[:, window:] - sums[:, :-window]
+    window_counts = counts[:, window:] - counts[:, :-window]
+    result[:, window - 1:] = np.where(window_counts == window, window_sums / window, np.nan)
+    return result
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """
+    RSI over simple rolling means of gains and losses, matching the pandas
+    formula used by the per-symbol endpoints (the first bar counts as a zero move).
+    """
+    import numpy as np
+
+    close = np.atleast_2d(close)
+    delta = np.full(close.shape, np.nan)
+    delta[:, 1:] = np.diff(close, axis=1)
+
+    present = ~np.isnan(close)
+    gain = np.where(present, np.where(delta > 0, delta, 0.0), np.nan)
+    loss = np.where(present, np.where(delta < 0, -delta, 0.0), np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+@traced("indicators")
+def compute_indicators(
+    close: np.ndarray,
+    volume: Optional[np.ndarray] = None,
+    ma_windows: Sequence[int] = MA_WINDOWS,
+    rsi_period: int = RSI_PERIOD,
+    volume_window: int = VOLUME_WINDOW,
+) -> Dict[str, np.ndarray]:
+    """
+    Compute indicator series for a whole universe in one pass.
+
+    Takes (symbols x time) close and volume matrices and returns (symbols x time)
+    arrays keyed "RSI", "MA_<n>", "Volume" and "Volume_MA_<n>" / "Volume_ratio".
+    """
+    import numpy as np
+
+    close = np.atleast_2d(np.asarray(close, dtype=float))
+    indicators = {"RSI": rsi(close, rsi_period)}
+    for window in ma_windows:
+        indicators[f"MA_{window}"] = rolling_mean(close, window)
+
+    if volume is not None:
+        volume = np.atleast_2d(np.asarray(volume, dtype=float))
+        volume_ma = rolling_mean(volume, volume_window)
+        indicators["Volume"] = volume
+        indicators[f"Volume_MA_{volume_window}"] = volume_ma
+        with np.errstate(divide="ignore", invalid="ignore"):
+            indicators["Volume_ratio"] = volume / volume_ma
+    return indicators
+
+def latest_indicators(close: np.ndarray, volume: Optional[np.ndarray] = None, **kwargs) -> Dict[str, np.ndarray]:
+    """Same as compute_indicators but only keeps the newest bar: one value per symbol."""
+    return {name: series[:, -1] for name, series in compute_indicators(close, volume, **kwargs).items()}
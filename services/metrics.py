@@ -0,0 +1,212 @@
+import os
+import time
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Metrics settings
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets (seconds), from cache hits up to slow GPT calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+class Histogram:
+    """
+    Observations counted into fixed buckets per label combination.
+
+    Each observation is one bisect and one increment under a lock; buckets are
+    only made cumulative when the metrics are scraped.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in series:
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                total += count
+                le = 'le="' + ("+Inf" if bound == float("inf") else _number(bound)) + '"'
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {total}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {values[-1]!r}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {total}"
+
+# --- Registry ---
+_metrics: List = []
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, help, labels)
+    _metrics.append(metric)
+    return metric
+
+def histogram(name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    metric = Histogram(name, help, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+def register_collector(collect: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+    """
+    Add a function that reads existing state at scrape time and yields
+    (name, kind, help, labels, value) samples, so nothing is paid per request.
+    """
+    _collectors.append(collect)
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+
+    # Samples of one metric must be contiguous, whatever order the collectors yield them in
+    collected: Dict[str, list] = {}
+    for collect in _collectors:
+        for name, kind, help, labels, value in collect():
+            family = collected.setdefault(name, [f"# HELP {name} {help}", f"# TYPE {name} {kind}"])
+            family.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+    for family in collected.values():
+        lines.extend(family)
+    return "\n".join(lines) + "\n"
+
+# --- Metrics of the shared services ---
+route_latency = histogram("http_request_duration_seconds", "Time to serve a request, by route template.",
+                          ("method", "route", "status"))
+upstream_latency = histogram("upstream_call_duration_seconds", "Duration of upstream calls, retries included.", ("upstream",))
+upstream_wait = histogram("upstream_slot_wait_seconds", "Time spent waiting for an upstream concurrency slot.", ("upstream",))
+upstream_errors = counter("upstream_call_errors_total", "Upstream calls that raised.", ("upstream",))
+http_responses = counter("upstream_http_responses_total", "Upstream HTTP responses by host and status class.", ("host", "status"))
+http_retries = counter("upstream_http_retries_total", "Upstream HTTP requests that were retried.", ("host",))
+rate_limited = counter("rate_limited_total", "Calls refused by the shared rate limiter.", ("upstream", "reason"))
+fallbacks = counter("fallbacks_total", "Degraded answers served instead of an upstream result.", ("service", "reason"))
+
+def _service_stats():
+    # Imported here: these modules are only read at scrape time
+    from services.cache import all_caches
+    from services.singleflight import all_groups
+    from services import scheduler
+
+    for name, cache in all_caches().items():
+        stats = cache.stats()
+        labels = {"cache": name}
+        yield "cache_hits_total", "counter", "Cache lookups answered by the local tier.", labels, stats["hits"]
+        yield "cache_shared_hits_total", "counter", "Cache lookups answered by the shared (Redis) tier.", labels, stats["shared_hits"]
+        yield "cache_misses_total", "counter", "Cache lookups that found nothing.", labels, stats["misses"]
+        yield "cache_evictions_total", "counter", "Entries evicted to stay within the size limits.", labels, stats["evictions"]
+        yield "cache_expirations_total", "counter", "Entries dropped after their TTL.", labels, stats["expirations"]
+        yield "cache_shared_errors_total", "counter", "Failed shared-tier calls (each skips the tier for a while).", labels, stats["shared_errors"]
+        yield "cache_items", "gauge", "Entries in the local tier.", labels, stats["items"]
+        yield "cache_bytes", "gauge", "Approximate size of the local tier.", labels, stats["bytes"]
+
+    for name, group in all_groups().items():
+        stats = group.stats()
+        labels = {"group": name}
+        yield "singleflight_calls_total", "counter", "Calls made through a single-flight group.", labels, stats["calls"]
+        yield "singleflight_executions_total", "counter", "Calls that actually ran.", labels, stats["executions"]
+        yield "singleflight_coalesced_total", "counter", "Calls that joined one already in flight.", labels, stats["coalesced"]
+        yield "singleflight_in_flight", "gauge", "Calls currently in flight.", labels, stats["in_flight"]
+
+    for name, job in scheduler.stats().items():
+        labels = {"job": name}
+        if job["age"] is not None:
+            yield "snapshot_age_seconds", "gauge", "Age of the served snapshot.", labels, job["age"]
+        yield "snapshot_refreshes_total", "counter", "Snapshot refreshes run.", labels, job["runs"]
+        yield "snapshot_refresh_failures_total", "counter", "Snapshot refreshes that failed.", labels, job["failures"]
+        if job["last_duration"] is not None:
+            yield "snapshot_refresh_duration_seconds", "gauge", "Duration of the last refresh.", labels, job["last_duration"]
+    yield "scheduler_leader", "gauge", "Whether this worker runs the snapshot refreshes.", {}, int(scheduler.is_leader())
+
+register_collector(_service_stats)
+
+# --- Route latency ---
+class MetricsMiddleware:
+    """
+    ASGI middleware observing every HTTP request in route_latency.
+
+    Requests are labelled with the route template (/strategy/stock/{symbol}),
+    not the raw path, so the number of series stays bounded. Streaming
+    responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            route_latency.observe(time.perf_counter() - start, scope["method"], template, status)
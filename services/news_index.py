@@ -0,0 +1,203 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from services import metrics, sentiment_store
+from services.singleflight import normalize_url
+
+# Index settings (overridable from the environment)
+NEWS_INDEX_MAX_ARTICLES = int(os.getenv("NEWS_INDEX_MAX_ARTICLES", 5000))
+NEWS_INDEX_MAX_AGE = float(os.getenv("NEWS_INDEX_MAX_AGE_HOURS", 48)) * 3600  # seconds since ingestion
+
+# Names that headlines use for a symbol besides its ticker
+ALIASES = {
+    # Stocks
+    "AAPL": ["Apple"],
+    "MSFT": ["Microsoft"],
+    "GOOG": ["Google", "Alphabet"],
+    "GOOGL": ["Google", "Alphabet"],
+    "AMZN": ["Amazon"],
+    "TSLA": ["Tesla"],
+    "NVDA": ["Nvidia"],
+    "META": ["Meta Platforms", "Facebook", "Meta"],
+    "NFLX": ["Netflix"],
+    "INTC": ["Intel"],
+    "AMD": ["Advanced Micro Devices"],
+    "SPY": ["S&P 500", "S&P500"],
+    "JPM": ["JPMorgan", "JP Morgan"],
+    "V": ["Visa"],
+    "WMT": ["Walmart"],
+    # Cryptos
+    "BTC": ["Bitcoin"],
+    "ETH": ["Ethereum", "Ether"],
+    "BNB": ["Binance Coin"],
+    "ADA": ["Cardano"],
+    "SOL": ["Solana"],
+    "XRP": ["Ripple"],
+    "DOGE": ["Dogecoin"],
+    "DOT": ["Polkadot"],
+    "LTC": ["Litecoin"],
+    "MATIC": ["Polygon"],
+    "AVAX": ["Avalanche"],
+    "TRX": ["Tron"],
+    "LINK": ["Chainlink"],
+    "SHIB": ["Shiba Inu"],
+}
+
+# Names that are also everyday words ("visa fees", "ripple effect", "avalanche of orders"):
+# matched only with this exact capitalization, every other name case-insensitively
+COMMON_WORD_ALIASES = {"Apple", "Meta", "Intel", "Visa", "Ether", "Ripple", "Polygon", "Avalanche", "Tron"}
+
+# Cashtags ($AAPL) are indexed as tickers, bare upper-case words only when they are a known symbol
+# (so "US", "AI" or "CEO" are not)
+_TICKER = re.compile(r"(?<![\w$])(\$?)([A-Z]{2,5})\b")
+
+def _alias_pattern(names: Iterable[str], flags: int = 0):
+    names = sorted(set(names), key=len, reverse=True)
+    return re.compile(r"(?<!\w)(" + "|".join(re.escape(name) for name in names) + r")(?!\w)", flags)
+
+def _alias_symbols(aliases: Dict[str, List[str]]) -> Dict[str, Set[str]]:
+    symbols: Dict[str, Set[str]] = {}
+    for symbol, names in aliases.items():
+        for name in names:
+            symbols.setdefault(name.lower(), set()).add(symbol)
+    return symbols
+
+def content_hash(article: dict) -> str:
+    """Hash of the normalized title and description, the same for syndicated copies of a story."""
+    text = " ".join(f"{article.get('title') or ''} {article.get('description') or ''}".lower().split())
+    return hashlib.md5(text.encode()).hexdigest()
+
+class NewsIndex:
+    """
+    Scored articles from every news pull, deduplicated and indexed by symbol.
+
+    Articles are keyed by URL and also dropped when their title and
+    description match an article already held (the same story syndicated
+    under another URL). Each one is indexed under the cashtags it mentions,
+    the known symbols (`symbols`, the ALIASES keys by default) it names in
+    upper case, and the symbols of the company and coin names it contains
+    (ALIASES), so the news of a symbol is a dictionary lookup. At most
+    NEWS_INDEX_MAX_ARTICLES are kept, each for NEWS_INDEX_MAX_AGE.
+    """
+
+    def __init__(self, aliases: Dict[str, List[str]] = ALIASES, symbols: Optional[Iterable[str]] = None,
+                 max_articles: int = NEWS_INDEX_MAX_ARTICLES, max_age: float = NEWS_INDEX_MAX_AGE):
+        self.max_articles = max_articles
+        self.max_age = max_age
+        self.known_symbols = set(symbols if symbols is not None else aliases)
+        names = {name for names in aliases.values() for name in names}
+        self._alias_patterns = [
+            _alias_pattern(group, flags)
+            for group, flags in ((names - COMMON_WORD_ALIASES, re.IGNORECASE), (names & COMMON_WORD_ALIASES, 0))
+            if group
+        ]
+        self._alias_symbols = _alias_symbols(aliases)
+        self._articles: "OrderedDict[str, dict]" = OrderedDict()  # id -> {"article", "hash", "symbols", "ingested_at"}
+        self._hashes: Dict[str, str] = {}  # content hash -> id
+        self._symbols: Dict[str, Set[str]] = {}  # symbol -> ids
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def symbols_of(self, article: dict) -> Set[str]:
+        text = f"{article.get('title') or ''} {article.get('description') or ''}"
+        symbols = {ticker for cashtag, ticker in _TICKER.findall(text) if cashtag or ticker in self.known_symbols}
+        for pattern in self._alias_patterns:
+            for name in pattern.findall(text):
+                symbols |= self._alias_symbols[name.lower()]
+        return symbols
+
+    def ingest(self, articles: Iterable[dict], now: Optional[float] = None) -> int:
+        """Add scored articles; returns how many were new. New articles also update the sentiment store."""
+        now = time.time() if now is None else now
+        added = []
+        with self._lock:
+            for article in articles:
+                if not article.get("title"):
+                    continue
+                article_id = normalize_url(article["url"]) if article.get("url") else content_hash(article)
+                digest = content_hash(article)
+                if article_id in self._articles or digest in self._hashes:
+                    self.duplicates += 1
+                    continue
+                symbols = self.symbols_of(article)
+                self._articles[article_id] = {"article": article, "hash": digest, "symbols": symbols, "ingested_at": now}
+                self._hashes[digest] = article_id
+                for symbol in symbols:
+                    self._symbols.setdefault(symbol, set()).add(article_id)
+                added.append((symbols, article))
+            self._prune(now)
+        for symbols, article in added:
+            sentiment_store.record_article(symbols, article, now)
+        return len(added)
+
+    def _prune(self, now: float):
+        # Articles are held in ingestion order, so the oldest are always first
+        while self._articles:
+            article_id, entry = next(iter(self._articles.items()))
+            if len(self._articles) <= self.max_articles and now - entry["ingested_at"] <= self.max_age:
+                break
+            self._remove(article_id)
+
+    def _remove(self, article_id: str):
+        entry = self._articles.pop(article_id)
+        self._hashes.pop(entry["hash"], None)
+        for symbol in entry["symbols"]:
+            ids = self._symbols.get(symbol)
+            if ids is not None:
+                ids.discard(article_id)
+                if not ids:
+                    del self._symbols[symbol]
+
+    def lookup(self, symbol: str, limit: Optional[int] = None) -> List[dict]:
+        """Articles mentioning a symbol, newest first."""
+        now = time.time()
+        with self._lock:
+            entries = [self._articles[article_id] for article_id in self._symbols.get(symbol.upper(), ())]
+        entries = [entry for entry in entries if now - entry["ingested_at"] <= self.max_age]
+        entries.sort(key=lambda entry: (entry["article"].get("publishedAt") or "", entry["ingested_at"]), reverse=True)
+        return [entry["article"] for entry in entries[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._articles.clear()
+            self._hashes.clear()
+            self._symbols.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"articles": len(self._articles), "symbols": len(self._symbols), "duplicates": self.duplicates}
+
+news_index = NewsIndex()
+
+def _ingest_snapshot(snapshot: Optional[dict]):
+    if snapshot is not None and isinstance(snapshot["value"], dict):
+        news_index.ingest(snapshot["value"].get("articles", []), now=snapshot["updated_at"])
+
+def ingest_snapshots(names: Iterable[str]):
+    """
+    Index the articles of persisted news snapshots, so lookups are warm right
+    after a restart, and of every newer one synced in from the refreshing worker.
+    """
+    from services import scheduler
+    names = set(names)
+    for name in names:
+        _ingest_snapshot(scheduler.get_snapshot(name))
+
+    def on_sync(name: str, snapshot: dict):
+        if name in names:
+            _ingest_snapshot(snapshot)
+
+    scheduler.on_sync(on_sync)
+
+def _index_metrics():
+    stats = news_index.stats()
+    yield "news_index_articles", "gauge", "Articles held in the news index.", {}, stats["articles"]
+    yield "news_index_symbols", "gauge", "Symbols with indexed articles.", {}, stats["symbols"]
+    yield "news_index_duplicates_total", "counter", "Ingested articles already indexed (same URL or same story).", {}, stats["duplicates"]
+
+metrics.register_collector(_index_metrics)
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import asyncio
+import logging
+import contextlib
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import httpx
+
+# numpy is loaded on first use, so importing the app doesn't pay for it
+if TYPE_CHECKING:
+    import numpy as np
+
+from services import http_client
+from services.price_history import fetch_history, symbol_history
+from services.rate_limiter import file_lock
+from services.scanner import loop_local, upstream_slot
+
+# Store settings
+OHLCV_STORE_DIR = os.getenv("OHLCV_STORE_DIR", "ohlcv_store")
+OHLCV_MIN_SYNC_SECONDS = int(os.getenv("OHLCV_MIN_SYNC_SECONDS", 60))  # skip the upstream entirely within this window
+BINANCE_KLINES_URL = "https://api.binance.com/api/v3/klines"
+BINANCE_PAGE_LIMIT = 1000  # max klines per Binance request
+
+# One little-endian column file per field; open_time is epoch milliseconds
+COLUMNS = {
+    "open_time": "<i8",
+    "open": "<f8",
+    "high": "<f8",
+    "low": "<f8",
+    "close": "<f8",
+    "volume": "<f8",
+}
+ITEMSIZE = 8  # bytes per value, the same for every column
+
+class OHLCVStore:
+    """
+    On-disk candle store keyed by (symbol, interval), shared by the workers of one host.
+
+    Every series is a directory of raw column files plus a small meta.json that
+    records the current file generation, its row count and the last sync time.
+    Reads memory-map the columns of the generation meta.json names, only up to
+    its row count, so only the rows that are actually used get paged in.
+
+    Writes replace candles from the first new open_time onwards, which lets the
+    newest (still open) candle be refreshed. They never touch live files: the
+    merged series is written as a new generation and published by replacing
+    meta.json, under a per-series file lock. A reader's mapping therefore never
+    sees a file shrink or a half-written row. The previous generation is kept
+    for readers that just loaded the old meta.json; older ones are removed.
+    """
+
+    def __init__(self, source: str, root: str = OHLCV_STORE_DIR):
+        self.path = os.path.join(root, source)
+
+    def lock(self, symbol: str, interval: str) -> asyncio.Lock:
+        """Per-series lock; hold it around a read-sync-write cycle."""
+        return loop_local(("ohlcv_lock", self.path, symbol, interval), asyncio.Lock)
+
+    def _series_dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.path, f"{symbol}_{interval}")
+
+    def _load_meta(self, symbol: str, interval: str) -> dict:
+        try:
+            with open(os.path.join(self._series_dir(symbol, interval), "meta.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"rows": 0, "synced_at": 0}
+
+    def _save_meta(self, symbol: str, interval: str, meta: dict):
+        path = os.path.join(self._series_dir(symbol, interval), "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _column_file(name: str, generation: int) -> str:
+        # Generation 0 is the layout of stores written before generations existed
+        return f"{name}.{generation}.bin" if generation else f"{name}.bin"
+
+    def _rows(self, symbol: str, interval: str, meta: dict) -> int:
+        # Never trust meta beyond what is physically on disk (e.g. files removed by hand)
+        rows = meta["rows"]
+        directory = self._series_dir(symbol, interval)
+        for name in COLUMNS:
+            path = os.path.join(directory, self._column_file(name, meta.get("generation", 0)))
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            rows = min(rows, size // ITEMSIZE)
+        return rows
+
+    def _map(self, symbol: str, interval: str, limit: Optional[int]) -> Dict[str, np.ndarray]:
+        import numpy as np
+
+        meta = self._load_meta(symbol, interval)
+        rows = self._rows(symbol, interval, meta)
+        start = max(rows - limit, 0) if limit else 0
+        directory = self._series_dir(symbol, interval)
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                path = os.path.join(directory, self._column_file(name, meta.get("generation", 0)))
+                columns[name] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))[start:]
+        return columns
+
+    def read(self, symbol: str, interval: str, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Return read-only memory-mapped columns, optionally only the newest `limit` rows."""
+        try:
+            return self._map(symbol, interval, limit)
+        except FileNotFoundError:
+            # Two writes in other workers retired the generation between loading meta.json and mapping it
+            return self._map(symbol, interval, limit)
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        times = self.read(symbol, interval, limit=1)["open_time"]
+        return int(times[-1]) if len(times) else None
+
+    def synced_at(self, symbol: str, interval: str) -> float:
+        return self._load_meta(symbol, interval).get("synced_at", 0)
+
+    def _retire(self, directory: str, generation: int):
+        """Remove column files older than the previous generation."""
+        for entry in os.listdir(directory):
+            parts = entry.split(".")
+            if entry.endswith(".bin") and parts[0] in COLUMNS:
+                old = int(parts[1]) if len(parts) == 3 and parts[1].isdigit() else 0
+                if old < generation - 1:
+                    with contextlib.suppress(OSError):  # e.g. still mapped on Windows; retried next write
+                        os.remove(os.path.join(directory, entry))
+
+    def write(self, symbol: str, interval: str, candles: Dict[str, np.ndarray]):
+        """
+        Merge candles (sorted by open_time) into the series and mark it as synced.
+        Blocks on the series lock, so async callers run it in a thread.
+        """
+        import numpy as np
+
+        directory = self._series_dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        new_times = np.asarray(candles["open_time"], dtype=COLUMNS["open_time"])
+
+        # One writer per series across every worker of this host
+        with file_lock(os.path.join(directory, "meta")):
+            stored = self.read(symbol, interval)
+            keep = len(stored["open_time"])
+            if keep and len(new_times):
+                keep = int(np.searchsorted(stored["open_time"], new_times[0], side="left"))
+
+            generation = self._load_meta(symbol, interval).get("generation", 0) + 1
+            for name, dtype in COLUMNS.items():
+                path = os.path.join(directory, self._column_file(name, generation))
+                with open(path, "wb") as f:
+                    f.write(np.asarray(stored[name][:keep], dtype=dtype).tobytes())
+                    f.write(np.asarray(candles[name], dtype=dtype).tobytes())
+
+            self._save_meta(symbol, interval, {"rows": keep + len(new_times), "synced_at": time.time(),
+                                               "generation": generation})
+            self._retire(directory, generation)
+
+    def touch(self, symbol: str, interval: str):
+        """Record a sync that brought no new candles."""
+        directory = self._series_dir(symbol, interval)
+        if os.path.isdir(directory):
+            with file_lock(os.path.join(directory, "meta")):
+                meta = self._load_meta(symbol, interval)
+                meta["rows"] = self._rows(symbol, interval, meta)
+                meta["synced_at"] = time.time()
+                self._save_meta(symbol, interval, meta)
+
+binance_store = OHLCVStore("binance")
+stock_store = OHLCVStore("yahoo")
+
+def _fresh(store: OHLCVStore, symbol: str, interval: str) -> bool:
+    return time.time() - store.synced_at(symbol, interval) < OHLCV_MIN_SYNC_SECONDS
+
+# --- Binance klines ---
+def _parse_klines(data: List[list]) -> Dict[str, np.ndarray]:
+    import numpy as np
+
+    return {
+        "open_time": np.array([kline[0] for kline in data], dtype=COLUMNS["open_time"]),
+        "open": np.array([float(kline[1]) for kline in data]),
+        "high": np.array([float(kline[2]) for kline in data]),
+        "low": np.array([float(kline[3]) for kline in data]),
+        "close": np.array([float(kline[4]) for kline in data]),
+        "volume": np.array([float(kline[5]) for kline in data]),
+    }
+
+async def _fetch_klines(binance_symbol: str, interval: str, limit: int, start_time: Optional[int] = None) -> list:
+    params = {"symbol": binance_symbol, "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    async with upstream_slot("binance"):
+        response = await http_client.get(BINANCE_KLINES_URL, params=params)
+    data = response.json()
+    if isinstance(data, dict) and data.get("code"):
+        raise ValueError(data.get("msg", f"Binance error {data.get('code')}"))
+    return data
+
+async def get_binance_klines(binance_symbol: str, interval: str = "1d", limit: int = 120) -> Dict[str, np.ndarray]:
+    """
+    Return the newest `limit` klines for a Binance symbol from the local store.
+
+    Only candles from the last stored open_time onwards are requested upstream
+    (the last stored candle is re-fetched because it may still have been open).
+    If the delta request fails, the stored candles are served as they are.
+    """
+    store = binance_store
+    async with store.lock(binance_symbol, interval):
+        if _fresh(store, binance_symbol, interval):
+            return store.read(binance_symbol, interval, limit)
+
+        last = store.last_open_time(binance_symbol, interval)
+        try:
+            if last is None:
+                data = await _fetch_klines(binance_symbol, interval, limit)
+            else:
+                data = []
+                while True:
+                    page = await _fetch_klines(binance_symbol, interval, BINANCE_PAGE_LIMIT, start_time=last)
+                    data.extend(page)
+                    if len(page) < BINANCE_PAGE_LIMIT:
+                        break
+                    last = page[-1][0] + 1
+        except (httpx.HTTPError, ValueError) as e:
+            logging.error(f"Error syncing klines for {binance_symbol}: {e}")
+            return store.read(binance_symbol, interval, limit)
+
+        # Off the event loop: the write waits for other workers' lock on the series
+        if data:
+            await asyncio.to_thread(store.write, binance_symbol, interval, _parse_klines(data))
+        else:
+            await asyncio.to_thread(store.touch, binance_symbol, interval)
+        return store.read(binance_symbol, interval, limit)
+
+# --- Stock candles (via the price-history provider) ---
+def _write_frame(store: OHLCVStore, symbol: str, interval: str, df, last: Optional[int]):
+    """Store a provider frame's rows from `last` (the last stored open_time) onwards."""
+    import numpy as np
+
+    open_times = df.index.as_unit("ms").asi8 if len(df) else np.empty(0, dtype=np.int64)
+    if last is not None:
+        df, open_times = df[open_times >= last], open_times[open_times >= last]
+    if len(df):
+        store.write(symbol, interval, {
+            "open_time": open_times,
+            "open": df["Open"].to_numpy(dtype=float),
+            "high": df["High"].to_numpy(dtype=float),
+            "low": df["Low"].to_numpy(dtype=float),
+            "close": df["Close"].to_numpy(dtype=float),
+            "volume": df["Volume"].to_numpy(dtype=float),
+        })
+    else:
+        store.touch(symbol, interval)
+
+async def get_stock_candles(symbol: str, interval: str = "1d", period: str = "6mo", limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Return stored candles for a stock symbol, fetching only sessions since the last stored one.
+    The first sync downloads `period` of history.
+    """
+    store = stock_store
+    symbol = symbol.upper()
+    async with store.lock(symbol, interval):
+        if _fresh(store, symbol, interval):
+            return store.read(symbol, interval, limit)
+
+        last = store.last_open_time(symbol, interval)
+        try:
+            if last is None:
+                frame = await fetch_history([symbol], period=period, interval=interval)
+            else:
+                start = time.strftime("%Y-%m-%d", time.gmtime(last / 1000))
+                frame = await fetch_history([symbol], interval=interval, start=start)
+            df = symbol_history(frame, symbol)
+        except Exception as e:
+            logging.error(f"Error syncing candles for {symbol}: {e}")
+            return store.read(symbol, interval, limit)
+
+        await asyncio.to_thread(_write_frame, store, symbol, interval, df, last)
+        return store.read(symbol, interval, limit)
+
+async def sync_stock_candles(symbols: List[str], interval: str = "1d", period: str = "6mo") -> List[str]:
+    """
+    Bring the stored candles of many stock symbols up to date with at most two
+    bulk downloads: one of `period` for symbols never synced, one from the
+    oldest last candle for the rest. Symbols synced within
+    OHLCV_MIN_SYNC_SECONDS are skipped. Returns the symbols that were fetched;
+    on failure their stored candles are left as they are.
+    """
+    store = stock_store
+    symbols = sorted({symbol.upper() for symbol in symbols})
+    async with contextlib.AsyncExitStack() as stack:
+        # Locks are taken in sorted order, so concurrent bulk syncs cannot deadlock
+        for symbol in symbols:
+            await stack.enter_async_context(store.lock(symbol, interval))
+
+        stale = [symbol for symbol in symbols if not _fresh(store, symbol, interval)]
+        last = {symbol: store.last_open_time(symbol, interval) for symbol in stale}
+        cold = [symbol for symbol in stale if last[symbol] is None]
+        warm = [symbol for symbol in stale if last[symbol] is not None]
+
+        downloads = []
+        if cold:
+            downloads.append(fetch_history(cold, period=period, interval=interval))
+        if warm:
+            start = time.strftime("%Y-%m-%d", time.gmtime(min(last[symbol] for symbol in warm) / 1000))
+            downloads.append(fetch_history(warm, interval=interval, start=start))
+        frames = await asyncio.gather(*downloads, return_exceptions=True)
+
+        for group, frame in zip([group for group in (cold, warm) if group], frames):
+            if isinstance(frame, Exception):
+                logging.error(f"Error syncing candles for {', '.join(group)}: {frame}")
+                continue
+            for symbol in group:
+                await asyncio.to_thread(_write_frame, store, symbol, interval, symbol_history(frame, symbol), last[symbol])
+    return stale
@@ -0,0 +1,112 @@
+import os
+import json
+import base64
+import binascii
+from typing import Any, List, Optional, Tuple
+
+from services.singleflight import normalize_url
+
+# Paging settings (overridable from the environment)
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", 100))
+MAX_FIELDS = 32  # fields one request may project
+
+# --- Field projection ---
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    The field paths of a `fields=` parameter ("title,source.name,azure_sentiment.label"),
+    deduplicated and sorted so equivalent requests share one cached view; None
+    when no projection was asked for. Raises ValueError for malformed paths.
+    """
+    if fields is None:
+        return None
+    paths = {path.strip() for path in fields.split(",") if path.strip()}
+    if not paths:
+        return None
+    if len(paths) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields can be requested.")
+    for path in paths:
+        if any(not part for part in path.split(".")):
+            raise ValueError(f"Invalid field: {path!r}")
+    # "source" already includes "source.name"
+    paths = {path for path in paths if not any(path.startswith(f"{other}.") for other in paths)}
+    return tuple(sorted(paths))
+
+def project(item: dict, fields: Tuple[str, ...]) -> dict:
+    """
+    The requested fields of `item`. Dotted paths select inside nested objects
+    and keep their nesting ("source.name" gives {"source": {"name": ...}});
+    fields the item doesn't have are left out.
+    """
+    result: dict = {}
+    for path in fields:
+        *parents, leaf = path.split(".")
+        value: Any = item
+        for part in parents:
+            value = value.get(part) if isinstance(value, dict) else None
+        if not isinstance(value, dict) or leaf not in value:
+            continue
+        target = result
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value[leaf]
+    return result
+
+# --- Cursors ---
+def _item_key(item: dict) -> str:
+    return normalize_url(item["url"]) if item.get("url") else item.get("title") or ""
+
+def encode_cursor(offset: int, last: dict) -> str:
+    """Opaque cursor for the items after `last`, found at `offset - 1`."""
+    payload = json.dumps({"o": offset, "k": _item_key(last)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, str]]:
+    """(offset, key of the last item seen) of a cursor; raises ValueError for a malformed one."""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset, key = int(payload["o"]), str(payload["k"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if offset < 0:
+        raise ValueError("Invalid cursor.")
+    return offset, key
+
+def _resume_at(items: List[dict], position: Tuple[int, str]) -> int:
+    # The snapshot may have been refreshed since the cursor was issued: resume
+    # right after the last item seen wherever it moved, or at the same offset
+    # when it has dropped out
+    offset, key = position
+    if 0 < offset <= len(items) and _item_key(items[offset - 1]) == key:
+        return offset
+    for index, item in enumerate(items):
+        if _item_key(item) == key:
+            return index + 1
+    return min(offset, len(items))
+
+def paginate(items: List[dict], limit: Optional[int], position: Optional[Tuple[int, str]] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of `items`: up to `limit` (capped at PAGE_MAX_LIMIT) after the
+    decoded cursor `position`, and the cursor of the next page (None on the last).
+    """
+    start = _resume_at(items, position) if position is not None else 0
+    limit = min(limit or PAGE_MAX_LIMIT, PAGE_MAX_LIMIT)
+    page = items[start:start + limit]
+    end = start + len(page)
+    next_cursor = encode_cursor(end, page[-1]) if page and end < len(items) else None
+    return page, next_cursor
+
+def article_page(value: dict, fields: Optional[Tuple[str, ...]], limit: Optional[int],
+                 position: Optional[Tuple[int, str]]) -> dict:
+    """
+    A news snapshot ({"articles": [...]}) cut down to the requested fields and
+    page. Paged responses carry `next_cursor`; without paging every article is
+    returned, as before.
+    """
+    articles = value.get("articles", [])
+    result = {key: item for key, item in value.items() if key != "articles"}
+    if limit is not None or position is not None:
+        articles, result["next_cursor"] = paginate(articles, limit, position)
+    result["articles"] = [project(article, fields) for article in articles] if fields else articles
+    return result
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+# pandas and yfinance take a few hundred ms to import, so they are loaded on first use
+if TYPE_CHECKING:
+    import pandas as pd
+
+from services.scanner import upstream_slot
+
+# Columns of every price-history frame, in order
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Directory of <SYMBOL>.csv files; when set, history is served from local fixtures
+PRICE_FIXTURE_DIR = os.getenv("PRICE_FIXTURE_DIR")
+
+class PriceHistoryProvider:
+    """
+    Source of OHLCV history for many symbols at once.
+
+    `get_history` returns one frame indexed by timestamp with (field, symbol)
+    column pairs, e.g. frame["Close"]["AAPL"]. Rows are the union of all symbols'
+    timestamps, so symbols with shorter histories are NaN-padded.
+    """
+
+    def get_history(self, symbols: List[str], period: str = "6mo", interval: str = "1d",
+                    start: Optional[str] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def get_name(self, symbol: str) -> str:
+        """Return a display name for a symbol."""
+        return symbol
+
+class YFinanceProvider(PriceHistoryProvider):
+    """Fetch history from Yahoo Finance with a single bulk download per call."""
+
+    def get_history(self, symbols: List[str], period: str = "6mo", interval: str = "1d",
+                    start: Optional[str] = None) -> pd.DataFrame:
+        import yfinance as yf
+        symbols = [symbol.upper() for symbol in symbols]
+        df = yf.download(
+            symbols,
+            period=None if start else period,
+            start=start,
+            interval=interval,
+            group_by="column",
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+        )
+        return normalize_frame(df, symbols)
+
+    def get_name(self, symbol: str) -> str:
+        import yfinance as yf
+        return yf.Ticker(symbol).info.get("shortName", symbol)
+
+class FixtureProvider(PriceHistoryProvider):
+    """
+    Serve history from local data, for offline tests and benchmarks.
+
+    Either pass a directory of <SYMBOL>.csv files (a date column followed by
+    Open/High/Low/Close/Volume) or a dict of per-symbol frames. `latency`
+    seconds are spent on every call, to mimic the download.
+    """
+
+    def __init__(self, directory: Optional[str] = None, frames: Optional[Dict[str, pd.DataFrame]] = None,
+                 latency: float = 0.0):
+        self.directory = directory
+        self.frames = {symbol.upper(): df for symbol, df in (frames or {}).items()}
+        self.latency = latency
+
+    def _load(self, symbol: str) -> Optional[pd.DataFrame]:
+        import pandas as pd
+        if symbol not in self.frames and self.directory:
+            path = os.path.join(self.directory, f"{symbol}.csv")
+            if os.path.exists(path):
+                self.frames[symbol] = pd.read_csv(path, index_col=0, parse_dates=True)
+        return self.frames.get(symbol)
+
+    def get_history(self, symbols: List[str], period: str = "6mo", interval: str = "1d",
+                    start: Optional[str] = None) -> pd.DataFrame:
+        import pandas as pd
+        if self.latency:
+            time.sleep(self.latency)
+        columns = {}
+        for symbol in (symbol.upper() for symbol in symbols):
+            df = self._load(symbol)
+            if df is None or df.empty:
+                continue
+            if start:
+                first = pd.Timestamp(start)
+                if df.index.tz is not None and first.tz is None:
+                    first = first.tz_localize(df.index.tz)
+            else:
+                first = period_start(df.index[-1], period)
+            if first is not None:
+                df = df[df.index >= first]
+            for field in FIELDS:
+                columns[(field, symbol)] = df[field]
+        return normalize_frame(pd.DataFrame(columns), [symbol.upper() for symbol in symbols])
+
+    def get_name(self, symbol: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return symbol
+
+class RecordingProvider(PriceHistoryProvider):
+    """
+    Pass calls through to another provider and save every symbol's rows as
+    <SYMBOL>.csv in `directory`, the format FixtureProvider replays.
+    """
+
+    def __init__(self, inner: PriceHistoryProvider, directory: str):
+        self.inner = inner
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_history(self, symbols: List[str], period: str = "6mo", interval: str = "1d",
+                    start: Optional[str] = None) -> pd.DataFrame:
+        import pandas as pd
+        frame = self.inner.get_history(symbols, period=period, interval=interval, start=start)
+        for symbol in (symbol.upper() for symbol in symbols):
+            rows = symbol_history(frame, symbol)
+            if rows.empty:
+                continue
+            path = os.path.join(self.directory, f"{symbol}.csv")
+            if os.path.exists(path):
+                saved = pd.read_csv(path, index_col=0, parse_dates=True)
+                rows = pd.concat([saved, rows])
+                rows = rows[~rows.index.duplicated(keep="last")].sort_index()
+            rows.to_csv(path)
+        return frame
+
+    def get_name(self, symbol: str) -> str:
+        return self.inner.get_name(symbol)
+
+def period_start(last: pd.Timestamp, period: str) -> Optional[pd.Timestamp]:
+    """Translate a yfinance period string ("5d", "3mo", "1y", "max") into a start timestamp."""
+    import pandas as pd
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=last.year, month=1, day=1, tz=last.tz)
+    units = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            count = int(period[:-len(suffix)])
+            if unit == "days":
+                # "1d" means the latest session, not the last 24 hours
+                return last.normalize() - pd.DateOffset(days=count - 1)
+            return last - pd.DateOffset(**{unit: count})
+    raise ValueError(f"Unsupported period: {period}")
+
+def normalize_frame(df: pd.DataFrame, symbols: List[str]) -> pd.DataFrame:
+    """Reshape a download into (field, symbol) columns covering every requested symbol."""
+    import pandas as pd
+    if df is None or df.empty:
+        return pd.DataFrame(columns=pd.MultiIndex.from_product([FIELDS, symbols]))
+    if not isinstance(df.columns, pd.MultiIndex):
+        df = pd.concat({symbols[0]: df}, axis=1).swaplevel(axis=1)
+    columns = pd.MultiIndex.from_product([FIELDS, symbols])
+    return df.reindex(columns=columns).sort_index()
+
+def symbol_history(frame: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """Extract one symbol's OHLCV rows from a multi-symbol frame, without padding rows."""
+    import pandas as pd
+    symbol = symbol.upper()
+    if frame.empty or symbol not in frame.columns.get_level_values(1):
+        return pd.DataFrame(columns=FIELDS)
+    df = frame.xs(symbol, axis=1, level=1)[FIELDS]
+    return df.dropna(subset=["Close"])
+
+# --- Active provider ---
+_provider: PriceHistoryProvider = FixtureProvider(PRICE_FIXTURE_DIR) if PRICE_FIXTURE_DIR else YFinanceProvider()
+
+def get_provider() -> PriceHistoryProvider:
+    return _provider
+
+def set_provider(provider: PriceHistoryProvider):
+    """Swap the provider used by every service (e.g. a FixtureProvider in tests)."""
+    global _provider
+    _provider = provider
+
+def get_history(symbols: List[str], period: str = "6mo", interval: str = "1d",
+                start: Optional[str] = None) -> pd.DataFrame:
+    """Fetch aligned OHLCV history for all symbols from the active provider."""
+    return _provider.get_history(symbols, period=period, interval=interval, start=start)
+
+async def fetch_history(symbols: List[str], period: str = "6mo", interval: str = "1d",
+                        start: Optional[str] = None) -> pd.DataFrame:
+    """Async form of get_history: runs the (blocking) provider in a worker thread under the yfinance slot."""
+    async with upstream_slot("yfinance"):
+        return await asyncio.to_thread(get_history, symbols, period, interval, start)
+
+async def fetch_name(symbol: str) -> str:
+    async with upstream_slot("yfinance"):
+        return await asyncio.to_thread(_provider.get_name, symbol)
@@ -0,0 +1,318 @@
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from services.indicator_state import INTERVAL_MS, get_state, update_from_candles
+from services.ohlcv_store import get_binance_klines, get_stock_candles
+from services.technical_analysis import get_crypto_technical_indicator, get_stock_technical_indicator
+
+# Stream settings (overridable from the environment)
+BINANCE_WS_URL = "wss://stream.binance.com:9443"
+STREAM_INTERVAL = "1d"  # candle the indicators are computed on, as in technical_analysis
+STOCK_POLL_SECONDS = float(os.getenv("STOCK_POLL_SECONDS", 15))
+FEED_RETRY_SECONDS = 5
+STREAM_MAX_SYMBOLS = int(os.getenv("STREAM_MAX_SYMBOLS", 50))  # per client
+
+def parse_kline(message: dict) -> dict:
+    """Normalize a Binance kline stream message into a tick."""
+    kline = message["k"]
+    return {
+        "symbol": kline["s"],
+        "time": message["E"],
+        "open_time": kline["t"],
+        "price": float(kline["c"]),
+        "volume": float(kline["v"]),
+        "closed": bool(kline["x"]),
+    }
+
+# --- Feeds ---
+class PriceFeed:
+    """Source of ticks; `ticks` yields tick dicts (see parse_kline) for one symbol."""
+
+    def ticks(self, symbol: str, is_crypto: bool) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+class LiveFeed(PriceFeed):
+    """
+    Binance kline websocket for crypto pairs; stocks have no free push feed, so
+    their latest daily candle is polled every STOCK_POLL_SECONDS instead.
+    """
+
+    async def ticks(self, symbol: str, is_crypto: bool) -> AsyncIterator[dict]:
+        if is_crypto:
+            import websockets
+            url = f"{BINANCE_WS_URL}/ws/{symbol.lower()}@kline_{STREAM_INTERVAL}"
+            async with websockets.connect(url, ping_interval=20) as ws:
+                async for raw in ws:
+                    yield parse_kline(json.loads(raw))
+            return
+
+        last = None
+        while True:
+            candles = await get_stock_candles(symbol, interval=STREAM_INTERVAL, limit=1)
+            if len(candles["close"]):
+                open_time = int(candles["open_time"][-1])
+                tick = {
+                    "symbol": symbol,
+                    "time": int(time.time() * 1000),
+                    "open_time": open_time,
+                    "price": float(candles["close"][-1]),
+                    "volume": float(candles["volume"][-1]),
+                    "closed": open_time + INTERVAL_MS[STREAM_INTERVAL] <= time.time() * 1000,
+                }
+                # The close of a session repeats its last price, but must still be yielded
+                if (tick["open_time"], tick["price"], tick["volume"], tick["closed"]) != last:
+                    last = (tick["open_time"], tick["price"], tick["volume"], tick["closed"])
+                    yield tick
+            await asyncio.sleep(STOCK_POLL_SECONDS)
+
+class ReplayFeed(PriceFeed):
+    """
+    Replay recorded Binance kline messages (see record_binance_ticks), for
+    offline tests and load tests.
+
+    Messages are replayed per symbol with their recorded spacing divided by
+    `speed`; speed=0 replays as fast as the consumers allow. With `loop` the
+    recording starts over at the end, shifted forward in time.
+    """
+
+    def __init__(self, path: Optional[str] = None, messages: Optional[List[dict]] = None,
+                 speed: float = 1.0, loop: bool = True):
+        if path is not None:
+            with open(path, "r") as f:
+                messages = [json.loads(line) for line in f if line.strip()]
+        self.by_symbol: Dict[str, List[dict]] = {}
+        for message in messages or []:
+            self.by_symbol.setdefault(message["k"]["s"], []).append(message)
+        self.speed = speed
+        self.loop = loop
+
+    async def ticks(self, symbol: str, is_crypto: bool) -> AsyncIterator[dict]:
+        messages = self.by_symbol.get(symbol.upper(), [])
+        if not messages:
+            return
+        span = messages[-1]["E"] - messages[0]["E"] + 1
+        shift = 0
+        while True:
+            previous = None
+            for message in messages:
+                tick = parse_kline(message)
+                tick["time"] += shift
+                if self.speed and previous is not None:
+                    await asyncio.sleep(max(0, message["E"] - previous) / 1000 / self.speed)
+                else:
+                    await asyncio.sleep(0)
+                previous = message["E"]
+                yield tick
+            if not self.loop:
+                return
+            shift += span
+
+async def record_binance_ticks(pairs: List[str], seconds: float, path: str) -> int:
+    """Record the live kline stream of some pairs to an NDJSON file for ReplayFeed."""
+    import websockets
+    streams = "/".join(f"{pair.lower()}@kline_{STREAM_INTERVAL}" for pair in pairs)
+    count = 0
+    end = time.monotonic() + seconds
+    async with websockets.connect(f"{BINANCE_WS_URL}/stream?streams={streams}") as ws:
+        with open(path, "w") as f:
+            while time.monotonic() < end:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), max(0.01, end - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                f.write(json.dumps(json.loads(raw)["data"]) + "\n")
+                count += 1
+    return count
+
+# --- Fan-out ---
+class Subscriber:
+    """
+    One connected client. Holds only the newest update per symbol: while the
+    client is busy receiving, newer ticks replace older ones (counted as
+    coalesced), so a slow client never builds up a backlog.
+    """
+
+    __slots__ = ("pending", "event", "channels", "coalesced", "delivered")
+
+    def __init__(self):
+        self.pending: Dict[Tuple[str, bool], dict] = {}
+        self.event = asyncio.Event()
+        self.channels: Set[Tuple[str, bool]] = set()
+        self.coalesced = 0
+        self.delivered = 0
+
+    def push(self, key: Tuple[str, bool], message: dict):
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = message
+        self.event.set()
+
+    async def next_batch(self) -> List[dict]:
+        """Wait for updates and take all of them, one per symbol."""
+        await self.event.wait()
+        self.event.clear()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        self.delivered += len(batch)
+        return batch
+
+class _Channel:
+    __slots__ = ("subscribers", "task", "last")
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.last: Optional[dict] = None
+
+def _round(value: float) -> Optional[float]:
+    return None if math.isnan(value) else round(value, 2)
+
+class PriceHub:
+    """
+    Shares one upstream feed per symbol between all of its subscribers.
+
+    The feed task starts with the first subscriber (after warming the symbol's
+    indicator state from the OHLCV store, unless `warm` is off) and stops with
+    the last one. Each tick updates the incremental indicator state once and is
+    pushed to every subscriber.
+    """
+
+    def __init__(self, feed: Optional[PriceFeed] = None, warm: bool = True):
+        self.feed = feed or LiveFeed()
+        self.warm = warm
+        self._channels: Dict[Tuple[str, bool], _Channel] = {}
+        self.ticks = 0
+        self.pushes = 0
+
+    @staticmethod
+    def key(symbol: str, is_crypto: bool) -> Tuple[str, bool]:
+        symbol = symbol.upper()
+        return (f"{symbol}USDT" if is_crypto else symbol, is_crypto)
+
+    def subscribe(self, subscriber: Subscriber, symbol: str, is_crypto: bool):
+        key = self.key(symbol, is_crypto)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = _Channel()
+            channel.task = asyncio.ensure_future(self._run(key, channel))
+        channel.subscribers.add(subscriber)
+        subscriber.channels.add(key)
+        if channel.last is not None:
+            subscriber.push(key, channel.last)
+
+    def unsubscribe(self, subscriber: Subscriber, symbol: str, is_crypto: bool):
+        self._leave(subscriber, self.key(symbol, is_crypto))
+
+    def unsubscribe_all(self, subscriber: Subscriber):
+        for key in list(subscriber.channels):
+            self._leave(subscriber, key)
+
+    def _leave(self, subscriber: Subscriber, key: Tuple[str, bool]):
+        subscriber.channels.discard(key)
+        subscriber.pending.pop(key, None)
+        channel = self._channels.get(key)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers:
+            channel.task.cancel()
+            del self._channels[key]
+
+    def _message(self, key: Tuple[str, bool], tick: dict) -> dict:
+        pair, is_crypto = key
+        state = get_state(pair, STREAM_INTERVAL)
+        if tick["open_time"] > state.last_time:
+            values = state.preview(tick["price"], tick["volume"])
+        else:
+            values = state.values()
+        return {
+            "symbol": pair[:-4] if is_crypto else pair,
+            "market": "crypto" if is_crypto else "stock",
+            "price": tick["price"],
+            "time": tick["time"],
+            "closed": tick["closed"],
+            "indicators": {
+                "RSI": _round(values["RSI"]),
+                "MA_20": _round(values["MA_20"]),
+                "MA_50": _round(values["MA_50"]),
+                "MA_120": _round(values["MA_120"]),
+                "Volume": _round(values["Volume"]),
+            },
+        }
+
+    async def _close(self, key: Tuple[str, bool], tick: dict):
+        """
+        Ingest a closed candle. One that doesn't directly follow the state (a
+        gap in the stream, or a stock session after a weekend) is taken from the
+        stored candles instead, which resets and replays the state on a gap.
+        """
+        pair, is_crypto = key
+        state = get_state(pair, STREAM_INTERVAL)
+        if tick["open_time"] <= state.last_time:
+            return
+        if not (is_crypto and state.follows(tick["open_time"])):
+            try:
+                if is_crypto:
+                    candles = await get_binance_klines(pair, interval=STREAM_INTERVAL, limit=121)
+                else:
+                    candles = await get_stock_candles(pair, interval=STREAM_INTERVAL)
+                update_from_candles(pair, STREAM_INTERVAL, candles)
+            except Exception as e:
+                logging.error(f"Error resyncing indicators for {pair}: {e}")
+        if is_crypto and state.follows(tick["open_time"]):
+            state.update(tick["open_time"], tick["price"], tick["volume"])
+
+    async def _run(self, key: Tuple[str, bool], channel: _Channel):
+        pair, is_crypto = key
+        # Load the closed candles first so the indicators are meaningful from the first tick
+        try:
+            if self.warm and is_crypto:
+                await get_crypto_technical_indicator(pair[:-4])
+            elif self.warm:
+                await get_stock_technical_indicator(pair)
+        except Exception as e:
+            logging.error(f"Error warming indicators for {pair}: {e}")
+
+        while True:
+            try:
+                async for tick in self.feed.ticks(pair, is_crypto):
+                    if tick["closed"]:
+                        await self._close(key, tick)
+                    message = channel.last = self._message(key, tick)
+                    self.ticks += 1
+                    for subscriber in channel.subscribers:
+                        subscriber.push(key, message)
+                    self.pushes += len(channel.subscribers)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Price feed for {pair} failed: {e}")
+                await asyncio.sleep(FEED_RETRY_SECONDS)
+
+    async def close(self):
+        tasks = [channel.task for channel in self._channels.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._channels.clear()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "subscriptions": sum(len(channel.subscribers) for channel in self._channels.values()),
+            "ticks": self.ticks,
+            "pushes": self.pushes,
+        }
+
+# --- Shared hub ---
+hub = PriceHub()
+
+def set_feed(feed: PriceFeed):
+    """Point the shared hub at another feed (e.g. ReplayFeed in tests and load tests)."""
+    hub.feed = feed
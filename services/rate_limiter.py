@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from services import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Limiter settings; every limit is overridable with RATE_LIMIT_<NAME>_PER_MINUTE / _BURST / _PER_DAY / _WAIT
+RATE_LIMIT_FILE = os.getenv("RATE_LIMIT_FILE", "rate_limits.json")  # shared state when there is no Redis
+RATE_LIMIT_PREFIX = "ratelimit:"
+SECONDS_PER_DAY = 86400
+
+class Limit:
+    """
+    A token bucket refilled at `per_minute` up to `burst` tokens, plus an
+    optional calendar-day quota. `wait` is how long callers wait for a token
+    by default before giving up.
+    """
+
+    __slots__ = ("per_minute", "burst", "per_day", "wait")
+
+    def __init__(self, per_minute: float, burst: float, per_day: Optional[int] = None, wait: float = 0.0):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.per_day = per_day
+        self.wait = wait
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60
+
+def _limit_from_env(name: str, per_minute: float, burst: float, per_day: Optional[int], wait: float) -> Limit:
+    def setting(suffix: str, default):
+        return os.getenv(f"RATE_LIMIT_{name.upper()}_{suffix}", default)
+    return Limit(
+        float(setting("PER_MINUTE", per_minute)),
+        float(setting("BURST", burst)),
+        int(setting("PER_DAY", per_day or 0)) or None,  # 0 means no daily quota
+        float(setting("WAIT", wait)),
+    )
+
+# Quotas shared by every worker process
+LIMITS: Dict[str, Limit] = {
+    # GitHub Models: 40 calls a day, a little under the real limit to leave margin
+    "gpt": _limit_from_env("gpt", per_minute=6, burst=2, per_day=40, wait=15.0),
+    # Azure Text Analytics: one token per batch request
+    "azure": _limit_from_env("azure", per_minute=60, burst=10, per_day=None, wait=10.0),
+    # NewsAPI developer plan: 100 requests a day; a burst covers one recommendation scan
+    "newsapi": _limit_from_env("newsapi", per_minute=60, burst=20, per_day=100, wait=10.0),
+}
+
+class RateLimited(Exception):
+    """No token could be taken before the deadline, or the daily quota is used up."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        super().__init__(f"{name} rate limited ({reason}), retry in {retry_after:.1f}s")
+        self.name = name
+        self.reason = reason  # "rate" or "daily"
+        self.retry_after = retry_after
+
+def _today(now: float) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(now))
+
+def _seconds_to_midnight(now: float) -> float:
+    local = time.localtime(now)
+    return 86400 - (local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec)
+
+def _take(state: dict, limit: Limit, cost: float, now: float, reserve: float = 0) -> Tuple[bool, float, str]:
+    """
+    Token bucket step on a {tokens, ts, day, used} state (mutated); returns
+    (allowed, retry_after, reason). `reserve` calls of the daily quota are left
+    to other callers.
+    """
+    # Callers read the clock before waiting for the lock: never move the refill time backwards
+    now = max(now, state.get("ts", now))
+    today = _today(now)
+    tokens = min(limit.burst, state.get("tokens", limit.burst) + (now - state.get("ts", now)) * limit.rate)
+    used = state.get("used", 0) if state.get("day") == today else 0
+    state.update(tokens=tokens, ts=now, day=today, used=used)
+    if limit.per_day and used + cost > limit.per_day - reserve:
+        return False, _seconds_to_midnight(now), "daily"
+    if tokens < cost:
+        return False, (cost - tokens) / limit.rate if limit.rate else float("inf"), "rate"
+    state.update(tokens=tokens - cost, used=used + cost)
+    return True, 0.0, ""
+
+# --- Backends ---
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock shared by every process on this host."""
+    with open(path + ".lock", "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ten seconds
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class FileBackend:
+    """Bucket states in one JSON file, updated under an exclusive file lock: shared by the workers of one host."""
+
+    def __init__(self, path: str = RATE_LIMIT_FILE):
+        self.path = path
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, states: dict):
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(states, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def take(self, name: str, limit: Limit, cost: float, now: float, reserve: float = 0) -> Tuple[bool, float, str]:
+        with file_lock(self.path):
+            states = self._read()
+            state = states.setdefault(name, {})
+            result = _take(state, limit, cost, now, reserve)
+            self._write(states)
+        return result
+
+    def refund(self, name: str, cost: float, now: float):
+        with file_lock(self.path):
+            states = self._read()
+            state = states.get(name)
+            if state and state.get("day") == _today(now):
+                state["used"] = max(0, state.get("used", 0) - cost)
+                self._write(states)
+
+    def used_today(self, name: str, now: float) -> float:
+        state = self._read().get(name, {})
+        return state.get("used", 0) if state.get("day") == _today(now) else 0
+
+# The same token bucket step as _take, run atomically inside Redis
+_TAKE_SCRIPT = """
+local rate, burst, per_day, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local today, to_midnight, reserve = ARGV[6], ARGV[7], tonumber(ARGV[8])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'day', 'used')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+now = math.max(now, ts)
+local used = 0
+if state[3] == today then used = tonumber(state[4]) or 0 end
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local allowed, retry, reason = 0, '0', ''
+if per_day > 0 and used + cost > per_day - reserve then
+  retry, reason = to_midnight, 'daily'
+elseif tokens < cost then
+  retry, reason = tostring((cost - tokens) / rate), 'rate'
+else
+  tokens, used, allowed = tokens - cost, used + cost, 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'day', today, 'used', tostring(used))
+redis.call('EXPIRE', KEYS[1], 172800)
+return {allowed, retry, reason}
+"""
+
+_REFUND_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'day') == ARGV[2] then
+  local used = tonumber(redis.call('HGET', KEYS[1], 'used')) or 0
+  redis.call('HSET', KEYS[1], 'used', tostring(math.max(0, used - tonumber(ARGV[1]))))
+end
+return 0
+"""
+
+class RedisBackend:
+    """Bucket states in Redis hashes, updated by Lua scripts: shared by every worker on every host."""
+
+    def __init__(self, client):
+        self.client = client
+        self._take = client.register_script(_TAKE_SCRIPT)
+        self._refund = client.register_script(_REFUND_SCRIPT)
+
+    def take(self, name: str, limit: Limit, cost: float, now: float, reserve: float = 0) -> Tuple[bool, float, str]:
+        allowed, retry, reason = self._take(keys=[RATE_LIMIT_PREFIX + name], args=[
+            limit.rate, limit.burst, limit.per_day or 0, cost, now, _today(now), _seconds_to_midnight(now), reserve])
+        reason = reason.decode() if isinstance(reason, bytes) else reason
+        return bool(allowed), float(retry), reason
+
+    def refund(self, name: str, cost: float, now: float):
+        self._refund(keys=[RATE_LIMIT_PREFIX + name], args=[cost, _today(now)])
+
+    def used_today(self, name: str, now: float) -> float:
+        day, used = self.client.hmget(RATE_LIMIT_PREFIX + name, "day", "used")
+        return float(used) if day is not None and day.decode() == _today(now) else 0
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Redis when the cache has a Redis tier, otherwise the lock-protected state file."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from services.cache import shared_backend
+                client = shared_backend()
+                _backend = RedisBackend(client) if hasattr(client, "register_script") else FileBackend()
+    return _backend
+
+def set_backend(backend):
+    """Replace the shared state (e.g. a FileBackend on a scratch path in tests and benchmarks)."""
+    global _backend
+    _backend = backend
+
+def set_limit(name: str, limit: Limit):
+    LIMITS[name] = limit
+
+# --- Budgeting ---
+def quota_interval(name: str, share: float, calls: float = 1, minimum: float = 60) -> float:
+    """
+    Refresh interval (seconds) of a job making `calls` requests to `name` per
+    run, so that it spends at most `share` of the daily quota; `minimum` when
+    the upstream has no daily quota.
+    """
+    limit = LIMITS.get(name)
+    if limit is None or not limit.per_day:
+        return minimum
+    return max(minimum, SECONDS_PER_DAY * calls / (limit.per_day * share))
+
+def reserve_for(name: str, share: float, now: Optional[float] = None) -> float:
+    """
+    Calls of today's quota still due to work entitled to `share` of it, spread
+    evenly over the day (e.g. scheduled refreshes): the `reserve` that other
+    callers leave untouched.
+    """
+    limit = LIMITS.get(name)
+    if limit is None or not limit.per_day:
+        return 0.0
+    now = time.time() if now is None else now
+    return limit.per_day * share * _seconds_to_midnight(now) / SECONDS_PER_DAY
+
+# --- Acquiring ---
+async def acquire(name: str, timeout: Optional[float] = None, cost: float = 1, reserve: float = 0):
+    """
+    Take `cost` tokens of an upstream's quota, waiting up to `timeout` seconds
+    (the limit's `wait` by default; 0 fails fast) for the bucket to refill.
+
+    Raises RateLimited when the wait would pass the deadline or the daily
+    quota is used up (waiting for tomorrow is never worth it); with a
+    `reserve`, once no more than that would be left of it. Upstreams without
+    a limit are not throttled.
+    """
+    limit = LIMITS.get(name)
+    if limit is None:
+        return
+    timeout = limit.wait if timeout is None else timeout
+    deadline = time.time() + timeout
+    backend = get_backend()
+    while True:
+        now = time.time()
+        try:
+            allowed, retry_after, reason = await asyncio.to_thread(backend.take, name, limit, cost, now, reserve)
+        except Exception as e:
+            # A broken limiter store must not take the upstream down with it
+            logging.error(f"Rate limiter unavailable for {name}, not throttling: {e}")
+            return
+        if allowed:
+            return
+        if reason == "daily" or now + retry_after > deadline:
+            metrics.rate_limited.inc(name, reason)
+            raise RateLimited(name, reason, retry_after)
+        # A little jitter so processes that wake up together don't collide again
+        await asyncio.sleep(retry_after * random.uniform(1.0, 1.2))
+
+async def refund(name: str, cost: float = 1):
+    """Give back daily quota for a call the upstream rejected (e.g. a 429)."""
+    if name in LIMITS:
+        try:
+            await asyncio.to_thread(get_backend().refund, name, cost, time.time())
+        except Exception as e:
+            logging.error(f"Rate limiter refund failed for {name}: {e}")
+
+def _quota_metrics():
+    now = time.time()
+    backend = get_backend()
+    for name, limit in LIMITS.items():
+        if not limit.per_day:
+            continue
+        labels = {"upstream": name}
+        try:
+            used = backend.used_today(name, now)
+        except Exception:
+            continue
+        yield "rate_limit_used_today", "gauge", "Calls counted against today's quota.", labels, used
+        yield "rate_limit_per_day", "gauge", "Daily quota.", labels, limit.per_day
+
+metrics.register_collector(_quota_metrics)
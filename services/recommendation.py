@@ -1,16 +1,53 @@
+import asyncio
+
 from .strategy_analyzer import analyze_stock_strategy, analyze_crypto_strategy
-import requests
+from .scanner import scan_symbols, upstream_slot
+from . import http_client, ticker_snapshot
 
 STOCK_LIST = ["AAPL", "MSFT", "TSLA", "NVDA", "AMZN", "GOOG", "META", "NFLX", "INTC", "AMD"]
 
-def get_stock_price(symbol: str):
+# Scoring: the strategy's signal dominates, news sentiment and RSI order the symbols within a signal
+SIGNAL_SCORES = {"Buy": 6.0, "Hold": 3.0, "Sell": 0.0}
+TREND_BONUS = 0.5  # crypto only: MA_20 above MA_120
+
+
+def rsi_score(rsi) -> float:
+    """1 when oversold (RSI <= 30), 0 when overbought (RSI >= 70), linear in between; 0.5 without an RSI."""
+    if not isinstance(rsi, (int, float)):
+        return 0.5
+    return min(1.0, max(0.0, (70 - rsi) / 40))
+
+
+def calculate_stock_score(analysis: dict) -> float:
+    """
+    Rank a stock by its generate_strategy_signal result: the signal (Sell 0,
+    Hold 3, Buy 6) plus the share of positive news and the RSI score (0-1 each).
+    """
+    indicators = analysis.get("technical_indicators", {})
+    score = (SIGNAL_SCORES.get(analysis.get("final_signal"), SIGNAL_SCORES["Hold"])
+             + analysis.get("positive_sentiment", 0.5)
+             + rsi_score(indicators.get("RSI")))
+    return round(score, 3)
+
+
+def calculate_crypto_score(analysis: dict) -> float:
+    """calculate_stock_score, plus TREND_BONUS when the 20-day MA is above the 120-day MA."""
+    indicators = analysis.get("technical_indicators", {})
+    score = calculate_stock_score(analysis)
+    ma_20, ma_120 = indicators.get("MA_20"), indicators.get("MA_120")
+    if isinstance(ma_20, (int, float)) and isinstance(ma_120, (int, float)) and ma_20 > ma_120:
+        score += TREND_BONUS
+    return round(score, 3)
+
+async def get_stock_price(symbol: str):
     """
     Get current stock price and price change from Yahoo Finance API via RapidAPI or other.
     (Here we simulate with dummy data or use real API if available)
     """
     url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
     try:
-        res = requests.get(url)
+        async with upstream_slot("yahoo"):
+            res = await http_client.get(url)
         data = res.json()
         price = data["chart"]["result"][0]["meta"]["regularMarketPrice"]
         previous_close = data["chart"]["result"][0]["meta"]["previousClose"]
@@ -19,80 +56,52 @@ def get_stock_price(symbol: str):
             "price": round(price, 2),
             "change_percent": round(change_percent, 2)
         }
-    except:
+    except Exception:
         return {"price": None, "change_percent": None}
 
 
-def recommend_top_stocks(count: int = 10):
-    result = []
-    for symbol in STOCK_LIST:
-        analysis = analyze_stock_strategy(symbol)  # should include news + technical
-        if "error" not in analysis:
-            score = calculate_stock_score(analysis)
-            price_data = get_stock_price(symbol)
+async def rank(scan: dict, score, get_price, count: int) -> list:
+    """
+    Score the analyses of a scan and return the best `count` with their prices.
+    Prices are only looked up for those, all at once (bounded by the upstream limits).
+    """
+    scored = sorted(((score(analysis), symbol, analysis) for symbol, analysis in scan["results"].items()
+                     if "error" not in analysis), key=lambda item: item[0], reverse=True)[:count]
+    prices = await asyncio.gather(*(get_price(symbol) for _, symbol, _ in scored))
+    return [{
+        "symbol": symbol,
+        "score": value,
+        "price": price_data["price"],
+        "change_percent": price_data["change_percent"],
+        "news_sentiment": analysis.get("news_sentiment", ""),
+        "technical_summary": analysis.get("technical_summary", "")
+    } for (value, symbol, analysis), price_data in zip(scored, prices)]
 
-            result.append({
-                "symbol": symbol,
-                "score": score,
-                "price": price_data["price"],
-                "change_percent": price_data["change_percent"],
-                "news_sentiment": analysis.get("news_sentiment", ""),
-                "technical_summary": analysis.get("technical_summary", "")
-            })
 
-    sorted_result = sorted(result, key=lambda x: x["score"], reverse=True)
-    return sorted_result[:count]
+async def recommend_top_stocks(count: int = 10):
+    scan = await scan_symbols(STOCK_LIST, analyze_stock_strategy)  # should include news + technical
+    return await rank(scan, calculate_stock_score, get_stock_price, count)
 
 
-def get_crypto_price(symbol: str):
+async def get_crypto_price(symbol: str):
     """
-    Get current crypto price and 24h change from Binance API.
+    Get current crypto price and 24h change from the shared Binance ticker snapshot.
     """
-    url = f"https://api.binance.com/api/v3/ticker/24hr?symbol={symbol}USDT"
-    try:
-        res = requests.get(url)
-        data = res.json()
-        price = float(data["lastPrice"])
-        change_percent = float(data["priceChangePercent"])
-        return {
-            "price": round(price, 4),
-            "change_percent": round(change_percent, 2)
-        }
-    except:
+    ticker = await ticker_snapshot.get_price(symbol)
+    if ticker is None:
         return {"price": None, "change_percent": None}
+    return {
+        "price": round(ticker["price"], 4),
+        "change_percent": round(ticker["change_percent"], 2)
+    }
 
 
-def get_top_binance_symbols(limit=20):
-    url = "https://api.binance.com/api/v3/ticker/24hr"
-    try:
-        res = requests.get(url)
-        data = res.json()
-        usdt_pairs = [item for item in data if item["symbol"].endswith("USDT")]
-        sorted_by_volume = sorted(usdt_pairs, key=lambda x: float(x["quoteVolume"]), reverse=True)
-        top_symbols = [item["symbol"].replace("USDT", "") for item in sorted_by_volume[:limit]]
-        return top_symbols
-    except:
-        return []
-
-
-def recommend_top_cryptos(count: int = 10):
-    result = []
-    crypto_symbols = get_top_binance_symbols(limit=30)
-
-    for symbol in crypto_symbols:
-        analysis = analyze_crypto_strategy(symbol)  # should include news + technical
-        if "error" not in analysis:
-            score = calculate_crypto_score(analysis)
-            price_data = get_crypto_price(symbol)
-
-            result.append({
-                "symbol": symbol,
-                "score": score,
-                "price": price_data["price"],
-                "change_percent": price_data["change_percent"],
-                "news_sentiment": analysis.get("news_sentiment", ""),
-                "technical_summary": analysis.get("technical_summary", "")
-            })
-
-    sorted_result = sorted(result, key=lambda x: x["score"], reverse=True)
-    return sorted_result[:count]
+async def get_top_binance_symbols(limit=20):
+    # Served from the ticker snapshot, which get_crypto_price reuses for every symbol
+    return await ticker_snapshot.top_by_volume(limit, quote="USDT")
+
+
+async def recommend_top_cryptos(count: int = 10):
+    crypto_symbols = await get_top_binance_symbols(limit=30)
+    scan = await scan_symbols(crypto_symbols, analyze_crypto_strategy)  # should include news + technical
+    return await rank(scan, calculate_crypto_score, get_crypto_price, count)
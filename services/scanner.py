@@ -0,0 +1,164 @@
+import os
+import time
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Hashable, List, Optional, Tuple
+from services import metrics
+
+# Scan settings (overridable from the environment)
+SCAN_MAX_WORKERS = int(os.getenv("SCAN_MAX_WORKERS", 8))
+SCAN_SYMBOL_TIMEOUT = float(os.getenv("SCAN_SYMBOL_TIMEOUT", 20))  # seconds per symbol
+
+# Maximum number of concurrent calls per upstream service, shared by every scan
+# (each one overridable with UPSTREAM_LIMIT_<NAME>)
+UPSTREAM_LIMITS = {
+    name: int(os.getenv(f"UPSTREAM_LIMIT_{name.upper()}", limit))
+    for name, limit in {
+        "binance": 8,
+        "yfinance": 4,
+        "yahoo": 4,
+        "coingecko": 2,
+        "newsapi": 2,
+        "azure": 4,
+        "gpt": 1,
+    }.items()
+}
+
+# --- Per-event-loop objects ---
+# asyncio primitives and connection pools belong to one event loop, so they are
+# created lazily for the running loop and dropped together with it.
+_loop_locals: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+def loop_local(key: Hashable, factory: Callable):
+    """Return the object stored under `key` for the running loop, creating it with `factory()`."""
+    values = _loop_locals.setdefault(asyncio.get_running_loop(), {})
+    value = values.get(key)
+    if value is None:
+        value = values[key] = factory()
+    return value
+
+def loop_local_values(kind: str) -> list:
+    """Remove and return the running loop's objects whose key is a tuple starting with `kind`."""
+    values = _loop_locals.get(asyncio.get_running_loop(), {})
+    keys = [key for key in values if isinstance(key, tuple) and key[0] == kind]
+    return [values.pop(key) for key in keys]
+
+@asynccontextmanager
+async def upstream_slot(name: str):
+    """
+    Hold one of the concurrency slots of an upstream service while calling it.
+    The wait for the slot and the call itself are recorded in the metrics.
+    """
+    limit = UPSTREAM_LIMITS.get(name)
+    start = time.perf_counter()
+    if limit is None:
+        async with _observe_call(name, start):
+            yield
+        return
+    async with loop_local(("upstream", name), lambda: asyncio.Semaphore(limit)):
+        acquired = time.perf_counter()
+        metrics.upstream_wait.observe(acquired - start, name)
+        async with _observe_call(name, acquired):
+            yield
+
+@asynccontextmanager
+async def _observe_call(name: str, start: float):
+    try:
+        yield
+    except Exception:
+        metrics.upstream_errors.inc(name)
+        raise
+    finally:
+        metrics.upstream_latency.observe(time.perf_counter() - start, name)
+
+async def iter_scan(
+    symbols: List[str],
+    analyze: Callable[[str], Awaitable[dict]],
+    max_workers: int = SCAN_MAX_WORKERS,
+    symbol_timeout: float = SCAN_SYMBOL_TIMEOUT,
+    deadline: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, str, object]]:
+    """
+    Run `await analyze(symbol)` for every symbol with bounded parallelism.
+
+    Yields (symbol, status, value) tuples as soon as each symbol finishes, where
+    status is "ok" (value is the analysis), "error" (value is the error message)
+    or "timeout" (value is None). A symbol is cancelled once it has been running
+    for longer than `symbol_timeout` seconds; `deadline` optionally bounds the
+    whole scan, cancelling whatever is still queued or running.
+    """
+    workers = asyncio.Semaphore(max(1, max_workers))
+    stopped = set()  # tasks cancelled by the scan itself (deadline or shutdown)
+
+    def stop(task: asyncio.Task):
+        stopped.add(task)
+        task.cancel()
+
+    async def run(symbol: str):
+        async with workers:
+            try:
+                return symbol, "ok", await asyncio.wait_for(analyze(symbol), symbol_timeout)
+            except asyncio.TimeoutError:
+                return symbol, "timeout", None
+            except asyncio.CancelledError:
+                # Only a cancellation of this symbol's own task by the scan (the
+                # deadline, or the scan itself being cancelled) stops it; one
+                # raised from inside the analysis is that symbol's failure
+                if asyncio.current_task() in stopped:
+                    raise
+                return symbol, "error", "cancelled"
+            except Exception as e:
+                return symbol, "error", str(e)
+
+    tasks = {asyncio.ensure_future(run(symbol)): symbol for symbol in symbols}
+    pending = set(tasks)
+    scan_end = time.monotonic() + deadline if deadline is not None else None
+
+    try:
+        while pending:
+            timeout = max(scan_end - time.monotonic(), 0) if scan_end is not None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield (tasks[task], "timeout", None) if task.cancelled() else task.result()
+            if scan_end is not None and time.monotonic() >= scan_end:
+                for task in pending:
+                    stop(task)
+                    yield tasks[task], "timeout", None
+                pending = set()
+    finally:
+        for task in pending:
+            stop(task)
+
+async def scan_symbols(
+    symbols: List[str],
+    analyze: Callable[[str], Awaitable[dict]],
+    max_workers: int = SCAN_MAX_WORKERS,
+    symbol_timeout: float = SCAN_SYMBOL_TIMEOUT,
+    deadline: Optional[float] = None,
+) -> dict:
+    """
+    Analyze symbols concurrently and collect the partial results.
+
+    Returns a dict with the finished analyses keyed by symbol (in input order),
+    the symbols that timed out, the symbols that failed and the elapsed time.
+    """
+    start = time.monotonic()
+    finished = {}
+    timed_out = []
+    failed = {}
+
+    async for symbol, status, value in iter_scan(symbols, analyze, max_workers, symbol_timeout, deadline):
+        if status == "ok":
+            finished[symbol] = value
+        elif status == "timeout":
+            timed_out.append(symbol)
+        else:
+            failed[symbol] = value
+
+    return {
+        "results": {symbol: finished[symbol] for symbol in symbols if symbol in finished},
+        "timed_out": [symbol for symbol in symbols if symbol in timed_out],
+        "failed": failed,
+        "elapsed": round(time.monotonic() - start, 3),
+    }
@@ -0,0 +1,408 @@
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.cache import CACHE_KEY_PREFIX, encode
+from services.singleflight import get_group
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Scheduler settings (overridable from the environment)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", "snapshots.json")
+LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", 30))  # seconds a Redis lease outlives a leader that died
+SYNC_INTERVAL = float(os.getenv("SCHEDULER_SYNC_SECONDS", 5))  # lease renewal and follower sync period
+LEASE_KEY = f"{CACHE_KEY_PREFIX}:scheduler:leader"
+SNAPSHOTS_KEY = f"{CACHE_KEY_PREFIX}:snapshots"  # hash: name -> encoded snapshot
+SNAPSHOT_TIMES_KEY = f"{CACHE_KEY_PREFIX}:snapshot_times"  # hash: name -> updated_at
+SCHEDULER_STAGGER = float(os.getenv("SCHEDULER_STAGGER", 5))  # seconds between the first runs of jobs
+SCHEDULER_JITTER = 0.1  # +/- fraction applied to every interval
+STALE_AFTER = 2  # intervals after which a request triggers a refresh itself
+
+class Job:
+    """A dataset refreshed in the background every `interval` seconds."""
+
+    __slots__ = ("name", "interval", "refresh", "runs", "failures", "last_error", "last_duration")
+
+    def __init__(self, name: str, interval: float, refresh: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.interval = interval
+        self.refresh = refresh
+        self.runs = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_duration: Optional[float] = None
+
+def _interval(name: str, default: float) -> float:
+    """Interval for a job, overridable with REFRESH_<NAME>_SECONDS."""
+    return float(os.getenv(f"REFRESH_{name.upper()}_SECONDS", default))
+
+# --- Registry ---
+_jobs: Dict[str, Job] = {}
+_snapshots: Dict[str, dict] = {}  # name -> {"value", "updated_at"}
+_tasks: List[asyncio.Task] = []
+_job_tasks: List[asyncio.Task] = []
+_background: set = set()
+_refreshes = get_group("snapshot")
+_sync_listeners: List[Callable[[str, dict], Any]] = []
+_lease = None
+_leading = False
+_synced_mtime: Optional[float] = None
+
+def register_job(name: str, interval: float, refresh: Callable[[], Awaitable[Any]]) -> Job:
+    """
+    Register a dataset; `interval` can be overridden with REFRESH_<NAME>_SECONDS.
+    Registering a name again returns the existing job, so routers can share datasets.
+    """
+    job = _jobs.get(name)
+    if job is None:
+        job = _jobs[name] = Job(name, _interval(name, interval), refresh)
+    return job
+
+def all_jobs() -> Dict[str, Job]:
+    return dict(_jobs)
+
+def _is_error(value: Any) -> bool:
+    return isinstance(value, dict) and "error" in value
+
+async def _run_refresh(job: Job) -> Any:
+    start = time.monotonic()
+    job.runs += 1
+    try:
+        value = await job.refresh()
+    except Exception as e:
+        job.failures += 1
+        job.last_error = str(e)
+        logging.error(f"Refresh of {job.name} failed: {e}")
+        raise
+    finally:
+        job.last_duration = round(time.monotonic() - start, 3)
+
+    # Error results are returned to the caller but never replace a good snapshot
+    if _is_error(value):
+        job.failures += 1
+        job.last_error = value["error"]
+        logging.error(f"Refresh of {job.name} returned an error: {value['error']}")
+        return value
+
+    job.last_error = None
+    _snapshots[job.name] = {"value": value, "updated_at": time.time()}
+    # A follower's own cold-start value stays local: the leader's snapshots are the shared ones
+    if refreshes_here():
+        await asyncio.to_thread(publish, job.name)
+    return value
+
+async def refresh(name: str) -> Any:
+    """Recompute a dataset now; concurrent refreshes of the same dataset are coalesced."""
+    job = _jobs[name]
+    return await _refreshes.do_async(name, _run_refresh, job)
+
+def get_snapshot(name: str) -> Optional[dict]:
+    return _snapshots.get(name)
+
+def snapshot_age(name: str) -> Optional[float]:
+    snapshot = _snapshots.get(name)
+    if snapshot is None:
+        return None
+    return max(0.0, time.time() - snapshot["updated_at"])
+
+def _refresh_in_background(name: str):
+    task = asyncio.ensure_future(refresh(name))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    # Failures are already logged by _run_refresh
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+async def serve(name: str) -> Any:
+    """
+    Return the latest snapshot of a dataset (stale-while-revalidate).
+
+    A snapshot is served as is. When it is older than STALE_AFTER intervals
+    the refreshing worker starts a background refresh, and the stale copy is
+    still served; the other workers wait for it to sync in. Only the very
+    first request for a dataset without any snapshot waits for the computation.
+    """
+    snapshot = _snapshots.get(name)
+    if snapshot is None:
+        value = await refresh(name)
+        snapshot = _snapshots.get(name)
+        if snapshot is None:
+            return value
+    elif refreshes_here() and time.time() - snapshot["updated_at"] > STALE_AFTER * _jobs[name].interval:
+        _refresh_in_background(name)
+    return snapshot["value"]
+
+# --- Persistence ---
+def save_snapshots(path: str = SNAPSHOT_FILE):
+    """Persist the snapshots so a restart serves warm data right away."""
+    try:
+        with open(path + ".tmp", "wb") as f:
+            f.write(encode(_snapshots))
+        os.replace(path + ".tmp", path)
+    except Exception as e:
+        logging.error(f"Error saving snapshots: {e}")
+
+def load_snapshots(path: str = SNAPSHOT_FILE):
+    try:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                _snapshots.update(json.load(f))
+    except Exception as e:
+        logging.error(f"Error loading snapshots: {e}")
+
+def _shared_client():
+    """The Redis client of the cache's shared tier, or None (snapshots are then shared through the file)."""
+    from services.cache import shared_backend
+    client = shared_backend()
+    return client if hasattr(client, "register_script") else None
+
+def publish(name: str, path: Optional[str] = None):
+    """Persist a refreshed snapshot and hand it to the other workers."""
+    save_snapshots(path or SNAPSHOT_FILE)
+    client = _shared_client()
+    if client is None:
+        return
+    snapshot = _snapshots[name]
+    try:
+        client.hset(SNAPSHOTS_KEY, name, encode(snapshot))
+        client.hset(SNAPSHOT_TIMES_KEY, name, snapshot["updated_at"])
+    except Exception as e:
+        logging.error(f"Error publishing snapshot {name}: {e}")
+
+def _merge(name: str, snapshot: dict):
+    current = _snapshots.get(name)
+    if current is not None and current["updated_at"] >= snapshot["updated_at"]:
+        return
+    _snapshots[name] = snapshot
+    for listener in _sync_listeners:
+        try:
+            listener(name, snapshot)
+        except Exception as e:
+            logging.error(f"Snapshot sync listener failed for {name}: {e}")
+
+def sync_snapshots(path: Optional[str] = None) -> int:
+    """
+    Take in the snapshots the leader published that are newer than ours: from
+    Redis when the cache has a Redis tier, otherwise from the snapshot file
+    (re-read only when it changed). Returns how many were updated.
+    """
+    global _synced_mtime
+    before = {name: snapshot["updated_at"] for name, snapshot in _snapshots.items()}
+    client = _shared_client()
+    if client is not None:
+        times = client.hgetall(SNAPSHOT_TIMES_KEY)
+        newer = [name.decode() for name, updated_at in times.items()
+                 if float(updated_at) > before.get(name.decode(), 0)]
+        if newer:
+            for name, raw in zip(newer, client.hmget(SNAPSHOTS_KEY, newer)):
+                if raw is not None:
+                    _merge(name, json.loads(raw))
+    else:
+        path = path or SNAPSHOT_FILE
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return 0
+        if mtime == _synced_mtime:
+            return 0
+        with open(path, "r") as f:
+            snapshots = json.load(f)
+        _synced_mtime = mtime
+        for name, snapshot in snapshots.items():
+            _merge(name, snapshot)
+    return sum(1 for name, snapshot in _snapshots.items() if before.get(name) != snapshot["updated_at"])
+
+def on_sync(listener: Callable[[str, dict], Any]):
+    """Call `listener(name, snapshot)` for every snapshot a follower takes in from the leader."""
+    _sync_listeners.append(listener)
+
+# --- Leadership ---
+class FileLease:
+    """
+    Leadership as a non-blocking exclusive lock on a file, held for as long as
+    the process lives: one refreshing worker per host.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or SNAPSHOT_FILE + ".lock"
+        self._file = None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        f = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()  # closing drops the lock
+            self._file = None
+
+# Renew or release the lease only while this worker still holds it
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('EXPIRE', KEYS[1], ARGV[2]) end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+class RedisLease:
+    """
+    Leadership as a Redis key set with NX and a LEASE_TTL expiry, renewed
+    every SYNC_INTERVAL: one refreshing worker across every host. A leader
+    that dies hands over once its lease expires.
+    """
+
+    def __init__(self, client, key: str = LEASE_KEY, ttl: int = LEASE_TTL):
+        self.client = client
+        self.key = key
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._renew = client.register_script(_RENEW_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self) -> bool:
+        if self._renew(keys=[self.key], args=[self.owner, self.ttl]):
+            return True
+        return bool(self.client.set(self.key, self.owner, nx=True, ex=self.ttl))
+
+    def release(self):
+        self._release(keys=[self.key], args=[self.owner])
+
+def _default_lease():
+    client = _shared_client()
+    return RedisLease(client) if client is not None else FileLease()
+
+def set_lease(lease):
+    """Replace how leadership is decided (e.g. a FileLease on a scratch path in tests)."""
+    global _lease
+    _lease = lease
+
+def is_leader() -> bool:
+    return _leading
+
+def refreshes_here() -> bool:
+    """Whether this worker refreshes datasets: the leader, or every worker when the scheduler is disabled."""
+    return _leading or not SCHEDULER_ENABLED
+
+# --- Background loop ---
+async def _run_job(job: Job, delay: float):
+    await asyncio.sleep(delay)
+    while True:
+        try:
+            await refresh(job.name)
+        except Exception:
+            pass  # logged in _run_refresh; try again next interval
+        await asyncio.sleep(job.interval * random.uniform(1 - SCHEDULER_JITTER, 1 + SCHEDULER_JITTER))
+
+def _start_jobs():
+    """
+    Start one refresh loop per job. First runs are staggered SCHEDULER_STAGGER
+    seconds apart so the upstreams aren't hit all at once, and a job whose
+    snapshot is still fresh waits until it is due.
+    """
+    for i, job in enumerate(_jobs.values()):
+        delay = i * SCHEDULER_STAGGER
+        age = snapshot_age(job.name)
+        if age is not None:
+            delay = max(delay, job.interval - age)
+        _job_tasks.append(asyncio.ensure_future(_run_job(job, delay)))
+
+async def _stop_jobs():
+    tasks = _job_tasks + list(_background)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _job_tasks.clear()
+
+async def _coordinate():
+    """
+    Every SYNC_INTERVAL: take or renew the lease; the leader runs the refresh
+    loops, every other worker syncs the snapshots the leader publishes.
+    """
+    global _leading
+    while True:
+        try:
+            leading = await asyncio.to_thread(_lease.acquire)
+        except Exception as e:
+            # Keep the current role; a lost lease shows on the next successful renewal
+            logging.error(f"Scheduler lease unavailable: {e}")
+            leading = _leading
+        if leading and not _leading:
+            logging.info("Scheduler: this worker refreshes the snapshots")
+            _leading = True
+            _start_jobs()
+        elif not leading and _leading:
+            logging.info("Scheduler: lease lost, following")
+            _leading = False
+            await _stop_jobs()
+        if not leading:
+            try:
+                await asyncio.to_thread(sync_snapshots)
+            except Exception as e:
+                logging.error(f"Error syncing snapshots: {e}")
+        await asyncio.sleep(SYNC_INTERVAL)
+
+def start():
+    """
+    Load persisted snapshots and start coordinating with the other workers:
+    only the worker holding the lease (Redis when the cache has a Redis tier,
+    a file lock otherwise) runs the refresh loops, so N workers make the
+    upstream calls of one.
+    """
+    global _lease
+    load_snapshots()
+    if not SCHEDULER_ENABLED:
+        return
+    if _lease is None:
+        _lease = _default_lease()
+    _tasks.append(asyncio.ensure_future(_coordinate()))
+
+async def stop():
+    global _leading
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    await _stop_jobs()
+    if _leading and _lease is not None:
+        try:
+            await asyncio.to_thread(_lease.release)
+        except Exception as e:
+            logging.error(f"Error releasing the scheduler lease: {e}")
+    _leading = False
+
+def stats() -> dict:
+    return {
+        name: {
+            "interval": job.interval,
+            "age": snapshot_age(name),
+            "runs": job.runs,
+            "failures": job.failures,
+            "last_error": job.last_error,
+            "last_duration": job.last_duration,
+        }
+        for name, job in _jobs.items()
+    }
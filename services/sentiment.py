@@ -0,0 +1,155 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+from dotenv import load_dotenv
+from typing import List, Optional
+from services import metrics, rate_limiter
+from services.cache import get_cache
+from services.rate_limiter import RateLimited
+from services.scanner import upstream_slot
+from services.tracing import traced
+
+# Load environment variables
+load_dotenv()
+
+AZURE_KEY = os.getenv("AZURE_KEY")
+AZURE_ENDPOINT = os.getenv("AZURE_ENDPOINT")
+
+# Sentiment settings
+AZURE_BATCH_SIZE = 10  # documents per request (Azure's limit for sentiment analysis)
+SENTIMENT_CACHE_TTL = 7 * 24 * 3600  # a document's sentiment doesn't change
+
+# Scored documents, keyed by content hash and shared by every news query
+sentiment_cache = get_cache("sentiment", ttl=SENTIMENT_CACHE_TTL)
+
+class LocalSentimentClient:
+    """
+    Offline stand-in for TextAnalyticsClient, for tests and benchmarks.
+
+    Scores documents with a tiny word list and sleeps `latency` seconds per
+    call to mimic the round trip. Returns objects shaped like Azure's results.
+    """
+
+    POSITIVE = {"up", "gain", "gains", "rise", "rises", "surge", "surges", "beat", "beats", "record", "growth", "strong", "bullish", "rally"}
+    NEGATIVE = {"down", "loss", "losses", "fall", "falls", "drop", "drops", "miss", "misses", "weak", "bearish", "crash", "plunge", "cut"}
+
+    class _Scores:
+        __slots__ = ("positive", "neutral", "negative")
+
+        def __init__(self, positive: float, neutral: float, negative: float):
+            self.positive = positive
+            self.neutral = neutral
+            self.negative = negative
+
+    class _Document:
+        __slots__ = ("id", "sentiment", "confidence_scores", "is_error")
+
+        def __init__(self, id: str, sentiment: str, confidence_scores):
+            self.id = id
+            self.sentiment = sentiment
+            self.confidence_scores = confidence_scores
+            self.is_error = False
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.documents = 0
+
+    def analyze_sentiment(self, documents: List[str], language: str = "en") -> list:
+        self.calls += 1
+        self.documents += len(documents)
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        for i, text in enumerate(documents):
+            words = re.findall(r"[a-z]+", text.lower())
+            positive = sum(word in self.POSITIVE for word in words)
+            negative = sum(word in self.NEGATIVE for word in words)
+            total = positive + negative + 1
+            scores = self._Scores(positive / total, 1 / total, negative / total)
+            label = "positive" if positive > negative else "negative" if negative > positive else "neutral"
+            results.append(self._Document(str(i), label, scores))
+        return results
+
+# --- Client ---
+_client = None
+
+def get_client():
+    """The Azure Text Analytics client, created on first use."""
+    global _client
+    if _client is None:
+        from azure.ai.textanalytics import TextAnalyticsClient
+        from azure.core.credentials import AzureKeyCredential
+        _client = TextAnalyticsClient(endpoint=AZURE_ENDPOINT, credential=AzureKeyCredential(AZURE_KEY))
+    return _client
+
+def is_configured() -> bool:
+    """Whether documents can be scored: Azure credentials are set or a client was installed."""
+    return _client is not None or bool(AZURE_KEY and AZURE_ENDPOINT)
+
+def set_client(client):
+    """Replace the sentiment client (e.g. LocalSentimentClient() in tests and benchmarks)."""
+    global _client
+    _client = client
+
+def document_key(text: str) -> str:
+    """Content-addressed cache key of a document."""
+    return hashlib.sha256(text.strip().encode()).hexdigest()
+
+def _to_result(doc) -> Optional[dict]:
+    if getattr(doc, "is_error", False):
+        return None
+    return {"label": doc.sentiment, "confidence_scores": {
+        "positive": doc.confidence_scores.positive,
+        "neutral": doc.confidence_scores.neutral,
+        "negative": doc.confidence_scores.negative
+    }}
+
+@traced("azure")
+async def analyze_sentiment(documents: list) -> list:
+    """
+    Score documents with Azure Text Analytics, in input order.
+
+    Duplicate documents are scored once and already-scored ones come from the
+    cache. The rest are sent in batches of AZURE_BATCH_SIZE, concurrently up to
+    the "azure" upstream limit. Documents Azure rejects get an empty result, as do
+    all uncached ones while Azure is not configured.
+    """
+    keys = [document_key(doc) for doc in documents]
+    scored = {}
+    pending = {}
+    for key, doc in zip(keys, documents):
+        if key in scored or key in pending:
+            continue
+        cached = await sentiment_cache.aget(key)
+        if cached is not None:
+            scored[key] = cached
+        else:
+            pending[key] = doc
+
+    async def score(batch: list):
+        try:
+            await rate_limiter.acquire("azure")
+        except RateLimited as e:
+            # Left unscored (an empty result): such articles are neither cached nor
+            # indexed by the news analyzer, so a later pull scores them
+            logging.warning(f"{e}, skipping {len(batch)} documents")
+            return
+        async with upstream_slot("azure"):
+            response = await asyncio.to_thread(get_client().analyze_sentiment, [doc for _, doc in batch], language="en")
+        for (key, _), doc in zip(batch, response):
+            result = _to_result(doc)
+            if result is not None:
+                await sentiment_cache.aset(key, result)
+                scored[key] = result
+
+    items = list(pending.items())
+    if items and not is_configured():
+        # Without credentials the app still serves news, just unscored
+        metrics.fallbacks.inc("azure", "unconfigured")
+        items = []
+    await asyncio.gather(*(score(items[i:i + AZURE_BATCH_SIZE]) for i in range(0, len(items), AZURE_BATCH_SIZE)))
+    return [scored.get(key, {}) for key in keys]
@@ -0,0 +1,175 @@
+import os
+import math
+import time
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from services import metrics
+
+# Store settings (overridable from the environment)
+SENTIMENT_HALF_LIFE = float(os.getenv("SENTIMENT_HALF_LIFE_HOURS", 12)) * 3600  # an article's weight halves every half-life
+SENTIMENT_MIN_WEIGHT = float(os.getenv("SENTIMENT_MIN_WEIGHT", 1.0))  # decayed articles needed before the value is used
+SENTIMENT_HISTORY_SIZE = 24  # points kept per symbol
+SENTIMENT_HISTORY_STEP = 3600  # seconds between history points
+
+_DECAY = math.log(2) / SENTIMENT_HALF_LIFE
+
+def is_scored(article: dict) -> bool:
+    """Whether Azure scored the article (throttled or rejected documents are left without a label)."""
+    return bool(article.get("azure_sentiment") and article["azure_sentiment"].get("label"))
+
+def article_label(article: dict) -> Optional[str]:
+    """Positive / Negative label of a scored article, from its Azure sentiment (None when unscored)."""
+    if not is_scored(article):
+        return None
+    sentiment = "Positive"
+    azure_label = article["azure_sentiment"]["label"].lower()
+    if azure_label == "negative":
+        sentiment = "Negative"
+    elif azure_label == "neutral":
+        # For neutral, look at confidence scores to decide
+        if article["azure_sentiment"].get("confidence_scores"):
+            scores = article["azure_sentiment"]["confidence_scores"]
+            if scores.get("negative", 0) > scores.get("positive", 0):
+                sentiment = "Negative"
+    return sentiment
+
+def published_at(article: dict, default: float) -> float:
+    """Publication time of an article (epoch seconds), `default` if missing or in the future."""
+    try:
+        published = datetime.fromisoformat(article["publishedAt"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        return default
+    return min(published, default)
+
+def _share(value: float) -> Optional[float]:
+    # Articles too old to carry any weight leave no share at all
+    return None if math.isnan(value) else value
+
+class SymbolSentiment:
+    """
+    Exponentially time-decayed news sentiment of one symbol.
+
+    Each article adds a weight of 1 at its publication time, decaying with
+    SENTIMENT_HALF_LIFE; `positive` and `total` hold the decayed weights as of
+    `updated_at`. Both decay alike, so the positive share only moves when
+    articles arrive, while the weight (how much recent news backs it) fades.
+    A ring buffer keeps one point per SENTIMENT_HISTORY_STEP. Memory is
+    constant per symbol.
+    """
+
+    __slots__ = ("symbol", "positive", "total", "count", "updated_at", "history_times", "history_values", "history_count")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.positive = 0.0
+        self.total = 0.0
+        self.count = 0
+        self.updated_at = 0.0
+        self.history_times = array("d", [0.0] * SENTIMENT_HISTORY_SIZE)
+        self.history_values = array("d", [0.0] * SENTIMENT_HISTORY_SIZE)
+        self.history_count = 0
+
+    def add(self, positive: bool, at: float, now: float):
+        """Ingest one article published at `at`, as of `now`."""
+        now = max(now, self.updated_at)
+        # Bring the sums forward to now, then add the article already decayed for its age
+        if self.updated_at:
+            factor = math.exp(-_DECAY * max(0.0, now - self.updated_at))
+            self.positive *= factor
+            self.total *= factor
+        weight = math.exp(-_DECAY * max(0.0, now - at))
+        self.total += weight
+        if positive:
+            self.positive += weight
+        self.count += 1
+        self.updated_at = now
+        self._record(now)
+
+    def _record(self, now: float):
+        size = SENTIMENT_HISTORY_SIZE
+        last = (self.history_count - 1) % size
+        if self.history_count and now - self.history_times[last] < SENTIMENT_HISTORY_STEP:
+            self.history_values[last] = self.positive_share()
+            return
+        slot = self.history_count % size
+        self.history_times[slot] = now
+        self.history_values[slot] = self.positive_share()
+        self.history_count += 1
+
+    def positive_share(self) -> float:
+        return self.positive / self.total if self.total else math.nan
+
+    def weight(self, now: Optional[float] = None) -> float:
+        """Decayed number of articles behind the value, as of `now`."""
+        now = time.time() if now is None else now
+        return self.total * math.exp(-_DECAY * max(0.0, now - self.updated_at))
+
+    def history(self) -> List[dict]:
+        size = SENTIMENT_HISTORY_SIZE
+        first = max(0, self.history_count - size)
+        return [{"time": self.history_times[i % size], "positive": _share(self.history_values[i % size])}
+                for i in range(first, self.history_count)]
+
+    def to_dict(self, now: Optional[float] = None, history: bool = True) -> dict:
+        positive = _share(self.positive_share())
+        result = {
+            "symbol": self.symbol,
+            "positive_sentiment": positive,
+            "negative_sentiment": None if positive is None else 1 - positive,
+            "weight": self.weight(now),
+            "articles": self.count,
+            "updated_at": self.updated_at,
+        }
+        if history:
+            result["history"] = self.history()
+        return result
+
+# --- Registry ---
+_sentiments: Dict[str, SymbolSentiment] = {}
+_lock = threading.Lock()
+
+def record_article(symbols, article: dict, now: Optional[float] = None):
+    """Add a scored article to the sentiment of every symbol it mentions. Unscored articles cast no vote."""
+    label = article_label(article)
+    if label is None:
+        return
+    now = time.time() if now is None else now
+    positive = label == "Positive"
+    at = published_at(article, now)
+    with _lock:
+        for symbol in symbols:
+            sentiment = _sentiments.get(symbol)
+            if sentiment is None:
+                sentiment = _sentiments[symbol] = SymbolSentiment(symbol)
+            sentiment.add(positive, at, now)
+
+def current(symbol: str, now: Optional[float] = None) -> Optional[dict]:
+    """
+    The decayed sentiment of a symbol, or None while fewer than
+    SENTIMENT_MIN_WEIGHT recent articles back it.
+    """
+    with _lock:
+        sentiment = _sentiments.get(symbol.upper())
+        if sentiment is None or sentiment.weight(now) < SENTIMENT_MIN_WEIGHT:
+            return None
+        return sentiment.to_dict(now, history=False)
+
+def get_sentiment(symbol: str) -> Optional[dict]:
+    """The sentiment of a symbol with its history, however little news backs it."""
+    with _lock:
+        sentiment = _sentiments.get(symbol.upper())
+        return sentiment.to_dict() if sentiment is not None else None
+
+def clear():
+    with _lock:
+        _sentiments.clear()
+
+def _store_metrics():
+    with _lock:
+        count = len(_sentiments)
+    yield "sentiment_symbols", "gauge", "Symbols with a rolling news sentiment.", {}, count
+
+metrics.register_collector(_store_metrics)
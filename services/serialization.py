@@ -0,0 +1,199 @@
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+# Optional encoders: without them responses fall back to the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Serialization settings
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESS_MIN_BYTES = 1024  # smaller bodies aren't worth compressing
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ENCODED_CACHE_SIZE = 64  # encoded snapshot views kept
+
+def _default(value):
+    # numpy scalars and similar expose .item()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON; orjson when installed (NaN becomes null), the json module otherwise."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+def packb(value: Any) -> bytes:
+    return msgpack.packb(value, default=_default)
+
+class FastJSONResponse(JSONResponse):
+    """The app's default response class: JSON rendered with dumps()."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+# --- Negotiation ---
+def _accepted(header: str) -> Dict[str, float]:
+    """Tokens of an Accept / Accept-Encoding header with their q-values."""
+    accepted = {}
+    for part in header.split(","):
+        token, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if token:
+            accepted[token.lower()] = quality
+    return accepted
+
+def negotiate_type(request: Request) -> str:
+    """MessagePack when the client asks for it (and msgpack is installed), JSON otherwise."""
+    if msgpack is not None:
+        accepted = _accepted(request.headers.get("accept", ""))
+        for media_type in MSGPACK_TYPES:
+            if accepted.get(media_type, 0) > 0:
+                return media_type
+    return JSON_TYPE
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """br or gzip, whichever the client accepts (br first), or None."""
+    accepted = _accepted(request.headers.get("accept-encoding", ""))
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+# --- Encoded responses ---
+class Encoded:
+    """
+    One value with its representations, each encoded and compressed once.
+
+    The ETag is a hash of the JSON form, so it changes only with the content;
+    each representation adds its suffix, since their bytes differ.
+    """
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.json = dumps(value)
+        self.etag = hashlib.blake2b(self.json, digest_size=12).hexdigest()
+        self._bodies: Dict[tuple, bytes] = {(JSON_TYPE, None): self.json}
+        self._lock = threading.Lock()
+
+    def body(self, media_type: str, encoding: Optional[str]) -> bytes:
+        key = (media_type, encoding)
+        body = self._bodies.get(key)
+        if body is None:
+            if encoding is None:
+                body = packb(self.value)  # plain JSON is always present
+            elif encoding == "br":
+                body = brotli.compress(self.body(media_type, None), quality=BROTLI_QUALITY)
+            else:
+                body = gzip.compress(self.body(media_type, None), compresslevel=GZIP_LEVEL, mtime=0)
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+    def tag(self, media_type: str, encoding: Optional[str]) -> str:
+        suffix = "".join(f"-{part}" for part in ("msgpack" if media_type != JSON_TYPE else None, encoding) if part)
+        return f'"{self.etag}{suffix}"'
+
+_encoded: "OrderedDict[Hashable, Encoded]" = OrderedDict()
+_encoded_lock = threading.Lock()
+
+def _encode(make: Callable[[], Any], key: Optional[Hashable]) -> Encoded:
+    """The Encoded form of `make()`, reused for the same `key`."""
+    if key is None:
+        return Encoded(make())
+    with _encoded_lock:
+        encoded = _encoded.get(key)
+        if encoded is not None:
+            _encoded.move_to_end(key)
+            return encoded
+    encoded = Encoded(make())
+    with _encoded_lock:
+        _encoded[key] = encoded
+        while len(_encoded) > ENCODED_CACHE_SIZE:
+            _encoded.popitem(last=False)
+    return encoded
+
+def _matches(request: Request, encoded: Encoded) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Any representation of the same content is still valid for the client
+    tags = [tag.strip().removeprefix("W/").strip('"') for tag in header.split(",")]
+    return any(tag.split("-")[0] == encoded.etag for tag in tags)
+
+def _respond(request: Request, encoded: Encoded, headers: Optional[Dict[str, str]]) -> Response:
+    media_type = negotiate_type(request)
+    encoding = negotiate_encoding(request) if len(encoded.json) >= COMPRESS_MIN_BYTES else None
+    headers = dict(headers or {})
+    headers.update({
+        "ETag": encoded.tag(media_type, encoding),
+        "Vary": "Accept, Accept-Encoding",
+        "Cache-Control": "no-cache",  # cached by the client, revalidated with the ETag every time
+    })
+    if _matches(request, encoded):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(encoded.body(media_type, encoding), media_type=media_type, headers=headers)
+
+def encoded_response(request: Request, value: Any, key: Optional[Hashable] = None,
+                     headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Respond with `value` in the representation the client negotiated: JSON or
+    MessagePack, br/gzip-compressed when large enough, with an ETag, or a 304
+    when If-None-Match already holds it.
+
+    Values given a `key` (e.g. a snapshot's name and version) are encoded once
+    and served from memory until ENCODED_CACHE_SIZE newer ones push them out.
+    """
+    return _respond(request, _encode(lambda: value, key), headers)
+
+async def snapshot_response(request: Request, name: str, view: Optional[Callable[[Any], Any]] = None,
+                            view_key: Hashable = None) -> Response:
+    """
+    Serve a scheduler dataset (see scheduler.serve) through encoded_response.
+
+    `view` derives the response from the snapshot (e.g. the first `count`
+    items); `view_key` must identify the view's parameters, since the view is
+    only computed and encoded once per snapshot version and view_key.
+    """
+    from services import scheduler
+
+    value = await scheduler.serve(name)
+    if isinstance(value, dict) and "error" in value:
+        return encoded_response(request, value)
+
+    make = (lambda: view(value)) if view is not None else (lambda: value)
+    snapshot = scheduler.get_snapshot(name)
+    if snapshot is None:
+        return _respond(request, _encode(make, None), None)
+    headers = {"X-Snapshot-Age": str(int(scheduler.snapshot_age(name)))}
+    return _respond(request, _encode(make, (name, snapshot["updated_at"], view_key)), headers)
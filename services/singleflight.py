@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight computations.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is running wait and receive the same result (or exception); cancelling one
+    waiting coroutine leaves the call running for the others. Nothing is kept
+    once the call finishes, so this complements the caches rather than replacing
+    them. Works for threads (`do`) and for coroutines (`do_async`).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[tuple, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            self.calls += 1
+            task = self._async_calls.get(loop_key)
+            if task is None:
+                task = self._async_calls[loop_key] = loop.create_task(fn(*args, **kwargs))
+                task.add_done_callback(functools.partial(self._async_done, loop_key))
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        # The call runs in its own task: a caller that is cancelled (a scan
+        # timeout, a client going away) stops waiting without cancelling the
+        # call for everyone else, the caller that started it included
+        return await asyncio.shield(task)
+
+    def _async_done(self, loop_key: tuple, task: asyncio.Task):
+        with self._lock:
+            if self._async_calls.get(loop_key) is task:
+                del self._async_calls[loop_key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every caller has stopped waiting
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._async_calls),
+            }
+
+# --- Named groups ---
+_groups: Dict[str, SingleFlight] = {}
+
+def get_group(name: str) -> SingleFlight:
+    group = _groups.get(name)
+    if group is None:
+        group = _groups.setdefault(name, SingleFlight(name))
+    return group
+
+def all_groups() -> Dict[str, SingleFlight]:
+    return dict(_groups)
+
+def singleflight(name: str, key: Callable[..., Hashable]):
+    """
+    Decorator: coalesce concurrent calls whose `key(*args, **kwargs)` is equal.
+    Plain functions and coroutine functions are both supported.
+    """
+    group = get_group(name)
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return await group.do_async(key(*args, **kwargs), fn, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return group.do(key(*args, **kwargs), fn, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a request URL: lower-case scheme/host, sorted query parameters."""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
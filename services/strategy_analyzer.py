@@ -1,115 +1,167 @@
-import requests
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import yfinance as yf  # for stock data
-from services.technical_analysis import get_crypto_technical_indicator, get_stock_technical_indicator
+import os
+import asyncio
+import hashlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from services.indicators import latest_indicators, pad_histories
+from services import rate_limiter, sentiment_store
+from services.cache import get_cache
+from services.news_index import ALIASES, news_index
+from services.sentiment_store import article_label, is_scored
+from services.price_history import fetch_history, fetch_name, symbol_history
+from services.technical_analysis import get_crypto_technical_indicator, get_stock_technical_indicator, get_stock_technical_indicators, get_live_indicators
+from services.scanner import iter_scan, scan_symbols
+from services.singleflight import normalize_url, singleflight
+from services.tracing import span, traced
 
-# --- Sentiment Analysis (Real Implementation) ---
-def analyze_crypto_news_sentiment(symbol: str):
+# News search settings
+NEWS_SEARCH_URL = "https://newsapi.org/v2/everything"
+NEWS_QUERY_MAX_LENGTH = 500  # NewsAPI rejects longer q parameters
+NEWS_BATCH_PAGE_SIZE = 100  # articles per shared pull (NewsAPI's maximum)
+BATCH_MAX_SYMBOLS = int(os.getenv("BATCH_MAX_SYMBOLS", 100))
+NEWS_SEARCH_TTL = float(os.getenv("NEWS_SEARCH_TTL_HOURS", 6)) * 3600  # a symbol's search is repeated at most this often
+
+# On-demand symbol searches, empty ones included, so a symbol without news isn't searched on every scan
+news_searches = get_cache("news_search", ttl=NEWS_SEARCH_TTL)
+
+def news_search_url(query: str, page_size: Optional[int] = None) -> str:
+    url = f"{NEWS_SEARCH_URL}?q={query}&language=en&sortBy=publishedAt"
+    if page_size:
+        url += f"&pageSize={page_size}"
+    return url + f"&apiKey={os.getenv('NEWS_API_KEY')}"
+
+async def search_news(url: str) -> dict:
     """
-    Analyze the sentiment of the latest news articles for a given cryptocurrency symbol.
-    Returns sentiment analysis results from real news API.
+    On-demand news search for symbols the index has nothing on: scored with
+    Azure only, remembered for NEWS_SEARCH_TTL, and never spending the share
+    of the NewsAPI quota the scheduled news jobs are budgeted.
     """
-    import os
-    from services.news_analyzer import fetch_and_analyze_news_by_url
-    
-    NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-    # Get news specific to the crypto symbol
-    url = f"https://newsapi.org/v2/everything?q={symbol} crypto&language=en&sortBy=publishedAt&apiKey={NEWS_API_KEY}"
-    
-    results = fetch_and_analyze_news_by_url(url)
-    
-    if "error" in results:
-        # Fallback to default data if API call fails
-        articles = [
+    from services.news_analyzer import SCHEDULED_NEWSAPI_SHARE, fetch_and_score_news_by_url
+
+    # Hashed: the URL carries the NewsAPI key and the key ends up in Redis
+    key = hashlib.md5(normalize_url(url).encode()).hexdigest()
+    cached = await news_searches.aget(key)
+    if cached is not None:
+        return cached
+    results = await fetch_and_score_news_by_url(url, reserve=rate_limiter.reserve_for("newsapi", SCHEDULED_NEWSAPI_SHARE))
+    if "error" not in results:
+        # Only what the signal rules read is kept
+        results = {"articles": [{"title": article.get("title", ""), "azure_sentiment": article.get("azure_sentiment")}
+                                for article in results["articles"]]}
+        # Remembered only once every article is scored, so a throttled search is retried
+        if all(is_scored(article) for article in results["articles"]):
+            await news_searches.aset(key, results)
+    return results
+
+# --- Sentiment Analysis (Real Implementation) ---
+def fallback_articles(symbol: str, is_crypto: bool) -> list:
+    """Default data used when no news could be fetched for a symbol."""
+    if is_crypto:
+        return [
             {"title": f"{symbol} market analysis", "gpt_analysis": "Positive"},
             {"title": f"{symbol} price prediction", "gpt_analysis": "Neutral"},
             {"title": f"{symbol} trading volume increases", "gpt_analysis": "Positive"},
         ]
-        return {"symbol": symbol, "articles": articles}
-    
-    # Transform API results to match expected format
-    simplified_articles = []
-    for article in results.get("articles", [])[:5]:  # Limit to 5 articles
-        sentiment = "Positive"
-        if article.get("azure_sentiment") and article["azure_sentiment"].get("label"):
-            azure_label = article["azure_sentiment"]["label"].lower()
-            if azure_label == "negative":
-                sentiment = "Negative"
-            elif azure_label == "neutral":
-                # For neutral, look at confidence scores to decide
-                if article["azure_sentiment"].get("confidence_scores"):
-                    scores = article["azure_sentiment"]["confidence_scores"]
-                    if scores.get("negative", 0) > scores.get("positive", 0):
-                        sentiment = "Negative"
-        
-        simplified_articles.append({
-            "title": article.get("title", ""),
-            "gpt_analysis": sentiment
-        })
-    
-    return {"symbol": symbol, "articles": simplified_articles}
+    return [
+        {"title": f"{symbol} earnings report", "gpt_analysis": "Positive"},
+        {"title": f"{symbol} market outlook", "gpt_analysis": "Neutral"},
+        {"title": f"{symbol} company news", "gpt_analysis": "Positive"},
+    ]
+
+def simplify_articles(articles: list) -> list:
+    """Reduce analyzed articles to title + Positive/Negative label (Neutral when unscored), as the signal rules expect."""
+    # Limit to 5 articles
+    return [{"title": article.get("title", ""), "gpt_analysis": article_label(article) or "Neutral"} for article in articles[:5]]
 
-def analyze_stock_news_sentiment(symbol: str):
+async def analyze_news_sentiment(symbol: str, is_crypto: bool):
     """
-    Analyze the sentiment of the latest news articles for a given stock symbol.
-    Returns sentiment analysis results from real news API.
+    Analyze the sentiment of the latest news articles for a given symbol.
+    Articles already pulled by any news feed are read from the shared index;
+    only symbols it has nothing on are searched on the news API.
     """
-    import os
-    from services.news_analyzer import fetch_and_analyze_news_by_url
-    
-    NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-    # Get news specific to the stock symbol
-    url = f"https://newsapi.org/v2/everything?q={symbol} stock&language=en&sortBy=publishedAt&apiKey={NEWS_API_KEY}"
-    
-    results = fetch_and_analyze_news_by_url(url)
-    
-    if "error" in results:
-        # Fallback to default data if API call fails
-        articles = [
-            {"title": f"{symbol} earnings report", "gpt_analysis": "Positive"},
-            {"title": f"{symbol} market outlook", "gpt_analysis": "Neutral"},
-            {"title": f"{symbol} company news", "gpt_analysis": "Positive"},
-        ]
-        return {"symbol": symbol, "articles": articles}
-    
+    indexed = news_index.lookup(symbol, limit=5)
+    if indexed:
+        return {"symbol": symbol, "articles": simplify_articles(indexed)}
+
+    # Get news specific to the symbol
+    results = await search_news(news_search_url(f"{symbol} {'crypto' if is_crypto else 'stock'}"))
+
+    if "error" in results or not results.get("articles"):
+        # Fallback to default data if API call fails or finds nothing
+        return {"symbol": symbol, "articles": fallback_articles(symbol, is_crypto)}
+
     # Transform API results to match expected format
-    simplified_articles = []
-    for article in results.get("articles", [])[:5]:  # Limit to 5 articles
-        sentiment = "Positive"
-        if article.get("azure_sentiment") and article["azure_sentiment"].get("label"):
-            azure_label = article["azure_sentiment"]["label"].lower()
-            if azure_label == "negative":
-                sentiment = "Negative"
-            elif azure_label == "neutral":
-                # For neutral, look at confidence scores to decide
-                if article["azure_sentiment"].get("confidence_scores"):
-                    scores = article["azure_sentiment"]["confidence_scores"]
-                    if scores.get("negative", 0) > scores.get("positive", 0):
-                        sentiment = "Negative"
-        
-        simplified_articles.append({
-            "title": article.get("title", ""),
-            "gpt_analysis": sentiment
-        })
-    
-    return {"symbol": symbol, "articles": simplified_articles}
+    return {"symbol": symbol, "articles": simplify_articles(results.get("articles", []))}
 
-# --- Strategy Analysis ---
-def generate_strategy_signal(symbol: str, is_crypto: bool):
+async def analyze_crypto_news_sentiment(symbol: str):
+    """Analyze the sentiment of the latest news articles for a given cryptocurrency symbol."""
+    return await analyze_news_sentiment(symbol, is_crypto=True)
+
+async def analyze_stock_news_sentiment(symbol: str):
+    """Analyze the sentiment of the latest news articles for a given stock symbol."""
+    return await analyze_news_sentiment(symbol, is_crypto=False)
+
+def news_queries(symbols: List[str], topic: str) -> List[str]:
+    """OR-queries covering all symbols, split to stay within NewsAPI's query length."""
+    queries, chunk = [], []
+    for symbol in symbols:
+        if chunk and len(f"({' OR '.join(chunk + [symbol])}) AND {topic}") > NEWS_QUERY_MAX_LENGTH:
+            queries.append(f"({' OR '.join(chunk)}) AND {topic}")
+            chunk = []
+        chunk.append(symbol)
+    if chunk:
+        queries.append(f"({' OR '.join(chunk)}) AND {topic}")
+    return queries
+
+async def analyze_batch_news_sentiment(symbols: List[str], is_crypto: bool) -> Dict[str, dict]:
     """
-    Generate a strategy signal based on technical indicators and sentiment analysis.
+    News sentiment for many symbols. Symbols the news index has nothing on
+    share one pull: a single OR-query (more if it would be too long) whose
+    articles are scored once and indexed under every symbol they mention.
+    Symbols still without articles get the same default data as a failed fetch.
     """
-    # Fetch technical indicators
-    if is_crypto:
-        tech_indicators = get_crypto_technical_indicator(symbol)
-    else:
-        tech_indicators = get_stock_technical_indicator(symbol)
+    missing = [symbol for symbol in symbols if not news_index.lookup(symbol, limit=1)]
+    if missing:
+        with span("batch_news"):
+            await asyncio.gather(*(search_news(news_search_url(query, NEWS_BATCH_PAGE_SIZE))
+                                   for query in news_queries(missing, "crypto" if is_crypto else "stock")))
 
-    if "error" in tech_indicators:
-        return tech_indicators
+    results = {}
+    for symbol in symbols:
+        articles = news_index.lookup(symbol, limit=5)
+        results[symbol] = {"symbol": symbol, "articles": simplify_articles(articles) if articles else fallback_articles(symbol, is_crypto)}
+    return results
 
+def watchlist_queries() -> List[str]:
+    """The news queries covering the scanned symbols, by company and coin name."""
+    queries = []
+    for symbols, topic in ((STOCK_SCAN_SYMBOLS, "stock"), (CRYPTO_SCAN_SYMBOLS, "crypto")):
+        names = [ALIASES.get(symbol, [symbol])[0] for symbol in symbols]
+        queries += news_queries(list(dict.fromkeys(names)), topic)
+    return queries
+
+async def ingest_watchlist_news() -> dict:
+    """
+    Pull the news of the scanned symbols into the index: one query per asset
+    class, by company and coin name. Refreshed in the background, so strategy
+    calls for these symbols find their news without a request. Only scored
+    with Azure: the strategies don't read GPT's analysis.
+    """
+    from services.news_analyzer import fetch_and_score_news_by_url
+
+    pulls = await asyncio.gather(*(fetch_and_score_news_by_url(news_search_url(query, NEWS_BATCH_PAGE_SIZE))
+                                   for query in watchlist_queries()))
+    errors = [pull["error"] for pull in pulls if "error" in pull]
+    if len(errors) == len(pulls):
+        return {"error": errors[0]}
+    return {"articles": [article for pull in pulls for article in pull.get("articles", [])]}
+
+# --- Strategy Analysis ---
+def positive_share(sentiment_data: dict) -> float:
+    """Share of Positive articles in a news sentiment result."""
+    return sum(1 for article in sentiment_data["articles"] if article["gpt_analysis"] == "Positive") / len(sentiment_data["articles"])
+
+def combine_signals(symbol: str, tech_indicators: dict, positive_sentiment: float, is_crypto: bool) -> dict:
+    """Combine technical indicators and the share of positive news into a Buy / Sell / Hold signal."""
     rsi = tech_indicators.get("RSI")
     ma_20 = tech_indicators.get("MA_20" if is_crypto else "MA_50")
     ma_120 = tech_indicators.get("MA_120" if is_crypto else "MA_50")
@@ -137,16 +189,6 @@ def generate_strategy_signal(symbol: str, is_crypto: bool):
         if not sell_signal:  # Avoid double sell signal if RSI and MA are not confirming
             sell_signal = True
 
-    # Fetch news sentiment
-    if is_crypto:
-        sentiment_data = analyze_crypto_news_sentiment(symbol)
-    else:
-        sentiment_data = analyze_stock_news_sentiment(symbol)
-
-    if "articles" not in sentiment_data:
-        return {"error": "No news articles found."}
-
-    positive_sentiment = sum(1 for article in sentiment_data["articles"] if article["gpt_analysis"] == "Positive") / len(sentiment_data["articles"])
     negative_sentiment = 1 - positive_sentiment
 
     # Combine sentiment and technical signals
@@ -175,133 +217,280 @@ def generate_strategy_signal(symbol: str, is_crypto: bool):
         "negative_sentiment": negative_sentiment
     }
 
+@singleflight("strategy", key=lambda symbol, is_crypto: (symbol.upper(), bool(is_crypto)))
+@traced("strategy")
+async def generate_strategy_signal(symbol: str, is_crypto: bool):
+    """
+    Generate a strategy signal based on technical indicators and sentiment analysis.
+    """
+    # The rolling sentiment store answers without any request once enough recent news backs it;
+    # otherwise news sentiment is fetched alongside the indicators, which it doesn't depend on
+    sentiment = sentiment_store.current(symbol)
+    sentiment_task = None if sentiment else asyncio.ensure_future(analyze_news_sentiment(symbol, is_crypto))
+
+    try:
+        # Read technical indicators from the live state, fetching only when it is cold or behind
+        tech_indicators = get_live_indicators(symbol, is_crypto)
+        if tech_indicators is None:
+            if is_crypto:
+                tech_indicators = await get_crypto_technical_indicator(symbol)
+            else:
+                tech_indicators = await get_stock_technical_indicator(symbol)
+    except BaseException:
+        if sentiment_task is not None:
+            sentiment_task.cancel()
+        raise
+
+    if "error" in tech_indicators:
+        if sentiment_task is not None:
+            sentiment_task.cancel()
+        return tech_indicators
+
+    if sentiment is not None:
+        return combine_signals(symbol, tech_indicators, sentiment["positive_sentiment"], is_crypto)
+
+    # Fetch news sentiment
+    with span("sentiment_wait"):
+        sentiment_data = await sentiment_task
+
+    if "articles" not in sentiment_data:
+        return {"error": "No news articles found."}
+
+    return combine_signals(symbol, tech_indicators, positive_share(sentiment_data), is_crypto)
+
+@traced("strategy_batch")
+async def generate_strategy_signals(items: List[Tuple[str, bool]]) -> Dict[str, dict]:
+    """
+    Strategy signals for many (symbol, is_crypto) pairs, keyed by symbol.
+
+    The upstream work is planned across the whole batch instead of per symbol:
+    stock candles that are not live or cached come from one bulk download,
+    symbols without a rolling sentiment share one news pull per asset class,
+    fanned out to them, and every headline is scored once. Crypto klines have no bulk endpoint, so they
+    are synced concurrently as in a scan. A symbol's failure is returned as
+    its {"error": ...} entry without failing the batch.
+    """
+    stocks = list(dict.fromkeys(symbol.upper() for symbol, is_crypto in items if not is_crypto))
+    cryptos = list(dict.fromkeys(symbol.upper() for symbol, is_crypto in items if is_crypto))
+
+    # News doesn't depend on the prices, so both classes are pulled alongside them
+    stored = {symbol: sentiment_store.current(symbol) for symbol in stocks + cryptos}
+    news_task = asyncio.ensure_future(asyncio.gather(
+        analyze_batch_news_sentiment([symbol for symbol in stocks if stored[symbol] is None], is_crypto=False),
+        analyze_batch_news_sentiment([symbol for symbol in cryptos if stored[symbol] is None], is_crypto=True),
+    ))
+
+    try:
+        technicals: Dict[Tuple[str, bool], dict] = {}
+        for symbol in stocks:
+            live = get_live_indicators(symbol, False)
+            if live is not None:
+                technicals[(symbol, False)] = live
+        for symbol in cryptos:
+            live = get_live_indicators(symbol, True)
+            if live is not None:
+                technicals[(symbol, True)] = live
+
+        cold_stocks = [symbol for symbol in stocks if (symbol, False) not in technicals]
+        cold_cryptos = [symbol for symbol in cryptos if (symbol, True) not in technicals]
+        stock_results, *crypto_results = await asyncio.gather(
+            get_stock_technical_indicators(cold_stocks),
+            *(get_crypto_technical_indicator(symbol) for symbol in cold_cryptos),
+            return_exceptions=True,
+        )
+        if isinstance(stock_results, Exception):
+            stock_results = {symbol: {"error": str(stock_results)} for symbol in cold_stocks}
+        for symbol in cold_stocks:
+            technicals[(symbol, False)] = stock_results[symbol]
+        for symbol, result in zip(cold_cryptos, crypto_results):
+            technicals[(symbol, True)] = {"error": str(result)} if isinstance(result, Exception) else result
+    except BaseException:
+        news_task.cancel()
+        raise
+
+    with span("sentiment_wait"):
+        stock_news, crypto_news = await news_task
+
+    results = {}
+    for (symbol, is_crypto), tech_indicators in technicals.items():
+        if "error" in tech_indicators:
+            results[symbol] = tech_indicators
+        elif stored[symbol] is not None:
+            results[symbol] = combine_signals(symbol, tech_indicators, stored[symbol]["positive_sentiment"], is_crypto)
+        else:
+            sentiment_data = (crypto_news if is_crypto else stock_news)[symbol]
+            results[symbol] = combine_signals(symbol, tech_indicators, positive_share(sentiment_data), is_crypto)
+    return results
+
 # --- Main endpoints that will be called by routes ---
-def analyze_stock_strategy(symbol: str):
+async def analyze_stock_strategy(symbol: str):
     """
     Analyze a stock symbol and generate a trading strategy recommendation.
     This function is used by the API endpoints.
     """
-    return generate_strategy_signal(symbol, is_crypto=False)
+    return await generate_strategy_signal(symbol, is_crypto=False)
 
-def analyze_crypto_strategy(symbol: str):
+async def analyze_crypto_strategy(symbol: str):
     """
     Analyze a cryptocurrency symbol and generate a trading strategy recommendation.
     This function is used by the API endpoints.
     """
-    return generate_strategy_signal(symbol, is_crypto=True)
+    return await generate_strategy_signal(symbol, is_crypto=True)
 
-# --- Strategy Recommendations for Multiple Assets ---
-def get_top_stock_symbols():
+async def analyze_strategy_batch(items: List[Tuple[str, bool]]) -> dict:
     """
-    Fetch the top 10 stock symbols that have the highest potential based on technical and sentiment analysis.
+    Analyze a mixed list of (symbol, is_crypto) pairs with shared upstream fetches.
+    This function is used by the API endpoints.
     """
-    stock_symbols = ["AAPL", "MSFT", "GOOG", "AMZN", "TSLA", "NVDA", "META", "SPY", "AMD", "NFLX"]  # Sample list
-    stock_recommendations = []
+    if len(items) > BATCH_MAX_SYMBOLS:
+        return {"error": f"At most {BATCH_MAX_SYMBOLS} symbols per batch."}
+    items = [(symbol.strip().upper(), bool(is_crypto)) for symbol, is_crypto in items if symbol.strip()]
+    both = {symbol for symbol, is_crypto in items if is_crypto} & {symbol for symbol, is_crypto in items if not is_crypto}
+    if both:
+        return {"error": f"Symbols requested as both stock and crypto: {', '.join(sorted(both))}"}
+    results = await generate_strategy_signals(items)
+    return {"results": {symbol: results[symbol] for symbol, _ in items}}
 
-    for symbol in stock_symbols:
-        strategy = generate_strategy_signal(symbol, is_crypto=False)
-        if strategy.get("final_signal") == "Buy":
-            stock_recommendations.append(strategy)
+# --- Strategy Recommendations for Multiple Assets ---
+STOCK_SCAN_SYMBOLS = ["AAPL", "MSFT", "GOOG", "AMZN", "TSLA", "NVDA", "META", "SPY", "AMD", "NFLX"]  # Sample list
+CRYPTO_SCAN_SYMBOLS = ["BTC", "ETH", "BNB", "ADA", "SOL", "XRP", "DOGE", "DOT", "LTC", "MATIC"]  # Sample list
 
-    return stock_recommendations[:10]  # Return top 10 recommendations
+def buy_recommendations(results: dict) -> list:
+    """The top 10 Buy signals of a scan, in scan order."""
+    return [strategy for strategy in results.values() if strategy.get("final_signal") == "Buy"][:10]
 
-def get_top_crypto_symbols():
+async def get_top_stock_symbols():
+    """
+    Fetch the top 10 stock symbols that have the highest potential based on technical and sentiment analysis.
+    """
+    # Analyze all symbols concurrently; slow symbols are left out instead of blocking the list
+    scan = await scan_symbols(STOCK_SCAN_SYMBOLS, analyze_stock_strategy)
+    return buy_recommendations(scan["results"])
+
+async def get_top_crypto_symbols():
     """
     Fetch the top 10 cryptocurrency symbols that have the highest potential based on technical and sentiment analysis.
     """
-    crypto_symbols = ["BTC", "ETH", "BNB", "ADA", "SOL", "XRP", "DOGE", "DOT", "LTC", "MATIC"]  # Sample list
-    crypto_recommendations = []
+    # Analyze all symbols concurrently; slow symbols are left out instead of blocking the list
+    scan = await scan_symbols(CRYPTO_SCAN_SYMBOLS, analyze_crypto_strategy)
+    return buy_recommendations(scan["results"])
+
+async def get_default_stock_recommendations():
+    """
+    Signals for a fixed list of well-known stocks from price data alone, shown
+    when the scan finds no Buy recommendations.
+    """
+    # Default stocks to show when no recommendations are available (10个知名股票)
+    default_symbols = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "META", "JPM", "V", "WMT"]
+    default_recommendations = []
+
+    # Get 3 months of history for all default symbols in one bulk request
+    try:
+        history = await fetch_history(default_symbols, period="3mo")
+        histories = [symbol_history(history, symbol) for symbol in default_symbols]
+        # RSI (14-day), 50-day MA and volume for all symbols in one vectorized pass
+        latest = latest_indicators(
+            pad_histories([hist['Close'] for hist in histories]),
+            pad_histories([hist['Volume'] for hist in histories]),
+            ma_windows=(50,)
+        )
+    except Exception as e:
+        print(f"Error fetching data for default stocks: {e}")
+        histories = None
+
+    # Company names are looked up concurrently; a failed lookup falls back to the symbol
+    names = await asyncio.gather(*(fetch_name(symbol) for symbol in default_symbols), return_exceptions=True)
 
-    for symbol in crypto_symbols:
-        strategy = generate_strategy_signal(symbol, is_crypto=True)
-        if strategy.get("final_signal") == "Buy":
-            crypto_recommendations.append(strategy)
+    for row, symbol in enumerate(default_symbols):
+        try:
+            if histories is None:
+                raise ValueError("no price history")
+            hist = histories[row]
 
-    return crypto_recommendations[:10]  # Return top 10 recommendations
+            if len(hist) > 0:
+                rsi = latest["RSI"][row]
+                ma_50 = latest["MA_50"][row]
+                latest_volume = latest["Volume"][row]
+
+                # Determine signal based on actual indicators
+                signal = "Hold"  # Default signal
+                if rsi < 30:
+                    signal = "Buy"  # Oversold condition
+                elif rsi > 70:
+                    signal = "Sell"  # Overbought condition
+                else:
+                    # Check if price is above MA
+                    latest_price = hist['Close'].iloc[-1]
+                    if latest_price > ma_50:
+                        signal = "Buy"
+
+                # Add to recommendations
+                default_recommendations.append({
+                    "symbol": symbol,
+                    "name": names[row] if isinstance(names[row], str) else symbol,
+                    "final_signal": signal,
+                    "technical_indicators": {
+                        "RSI": round(rsi, 2),
+                        "MA_50": round(ma_50, 2),
+                        "Volume": int(latest_volume)
+                    }
+                })
+        except Exception as e:
+            print(f"Error fetching data for {symbol}: {e}")
+            # Fallback in case of API error
+            default_recommendations.append({
+                "symbol": symbol,
+                "name": symbol,
+                "final_signal": "Hold",
+                "technical_indicators": {
+                    "RSI": "N/A",
+                    "MA_50": "N/A",
+                    "Volume": "N/A"
+                }
+            })
+
+    return default_recommendations
 
 # --- Main endpoints to display recommendations ---
-def get_recommended_stocks():
+async def get_recommended_stocks():
     """
     Return a list of recommended stocks based on technical and sentiment analysis.
     """
-    recommendations = get_top_stock_symbols()
+    recommendations = await get_top_stock_symbols()
     
     # If no recommendations found, return some default stocks with real-time data
     if not recommendations:
-        # Default stocks to show when no recommendations are available (10个知名股票)
-        default_symbols = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "META", "JPM", "V", "WMT"]
-        default_recommendations = []
-        
-        for symbol in default_symbols:
-            try:
-                # Get real-time data using yfinance
-                stock = yf.Ticker(symbol)
-                hist = stock.history(period="3mo")  # Get 3 months of history
-                
-                if len(hist) > 0:
-                    # Calculate technical indicators
-                    close_prices = hist['Close']
-                    volume = hist['Volume']
-                    
-                    # Calculate RSI (14-day)
-                    delta = close_prices.diff()
-                    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-                    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
-                    rs = gain / loss
-                    rsi = 100 - (100 / (1 + rs)).iloc[-1]  # Get latest RSI
-                    
-                    # Calculate 50-day Moving Average
-                    ma_50 = close_prices.rolling(window=50).mean().iloc[-1]
-                    
-                    # Get latest volume
-                    latest_volume = volume.iloc[-1]
-                    
-                    # Determine signal based on actual indicators
-                    signal = "Hold"  # Default signal
-                    if rsi < 30:
-                        signal = "Buy"  # Oversold condition
-                    elif rsi > 70:
-                        signal = "Sell"  # Overbought condition
-                    else:
-                        # Check if price is above MA
-                        latest_price = close_prices.iloc[-1]
-                        if latest_price > ma_50:
-                            signal = "Buy"
-                    
-                    # Add to recommendations
-                    default_recommendations.append({
-                        "symbol": symbol,
-                        "name": stock.info.get("shortName", symbol),
-                        "final_signal": signal,
-                        "technical_indicators": {
-                            "RSI": round(rsi, 2),
-                            "MA_50": round(ma_50, 2),
-                            "Volume": int(latest_volume)
-                        }
-                    })
-            except Exception as e:
-                print(f"Error fetching data for {symbol}: {e}")
-                # Fallback in case of API error
-                default_recommendations.append({
-                    "symbol": symbol,
-                    "name": symbol,
-                    "final_signal": "Hold",
-                    "technical_indicators": {
-                        "RSI": "N/A",
-                        "MA_50": "N/A",
-                        "Volume": "N/A"
-                    }
-                })
-        
-        return default_recommendations
+        return await get_default_stock_recommendations()
     
     return recommendations
 
-def get_recommended_cryptos():
+async def get_recommended_cryptos():
     """
     Return a list of recommended cryptocurrencies based on technical and sentiment analysis.
     """
-    return get_top_crypto_symbols()
+    return await get_top_crypto_symbols()
+
+async def stream_recommendations(is_crypto: bool, count: Optional[int] = None) -> AsyncIterator[dict]:
+    """
+    Streaming form of get_recommended_stocks / get_recommended_cryptos.
+
+    Yields {"event": "result", "symbol", "status", "data"} for every scanned
+    symbol as soon as its analysis finishes (status "ok", "error" or "timeout"),
+    then {"event": "summary", "recommendations": [...]} holding the same list
+    as the plain endpoint, cut to `count` when given.
+    """
+    symbols = CRYPTO_SCAN_SYMBOLS if is_crypto else STOCK_SCAN_SYMBOLS
+    analyze = analyze_crypto_strategy if is_crypto else analyze_stock_strategy
+    results = {}
+    async for symbol, status, value in iter_scan(symbols, analyze):
+        if status == "ok":
+            results[symbol] = value
+        yield {"event": "result", "symbol": symbol, "status": status, "data": value}
+
+    recommendations = buy_recommendations({symbol: results[symbol] for symbol in symbols if symbol in results})
+    if not recommendations and not is_crypto:
+        recommendations = await get_default_stock_recommendations()
+    yield {"event": "summary", "recommendations": recommendations[:count] if count else recommendations}
 
 # You can call the above functions to get the list of top 10 stocks or cryptos for recommendations
 
@@ -0,0 +1,38 @@
+from typing import AsyncIterator, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from services.cache import encode
+
+# Streaming formats, by query value and by Accept header
+NDJSON = "ndjson"
+SSE = "sse"
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", SSE: "text/event-stream"}
+
+def stream_format(request: Request, stream: Optional[str] = None) -> Optional[str]:
+    """
+    The streaming format a request asks for (`?stream=ndjson|sse`, or an Accept
+    header of application/x-ndjson / text/event-stream), or None for a plain response.
+    """
+    if stream:
+        stream = stream.lower()
+        return stream if stream in MEDIA_TYPES else None
+    accept = request.headers.get("accept", "")
+    for fmt, media_type in MEDIA_TYPES.items():
+        if media_type in accept:
+            return fmt
+    return None
+
+async def _encode_events(events: AsyncIterator[dict], fmt: str) -> AsyncIterator[bytes]:
+    async for event in events:
+        if fmt == SSE:
+            yield b"event: " + event.get("event", "message").encode() + b"\ndata: " + encode(event) + b"\n\n"
+        else:
+            yield encode(event) + b"\n"
+
+def event_stream(events: AsyncIterator[dict], fmt: str) -> StreamingResponse:
+    """Send each event as soon as it is produced, one JSON object per NDJSON line or SSE event."""
+    return StreamingResponse(
+        _encode_events(events, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,18 @@
-import requests
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import yfinance as yf  # for stock data
+import asyncio
+from typing import Dict, List
+from services.indicators import latest_indicators
+from services.indicator_state import closed_rows, peek_state, update_from_candles
+from services.ohlcv_store import get_binance_klines, get_stock_candles, sync_stock_candles
+from services.cache import get_cache
+from services.tracing import traced
+
+INDICATOR_CACHE_TTL = 60  # seconds; indicators move at most once per candle update
+
+indicator_cache = get_cache("indicators", ttl=INDICATOR_CACHE_TTL)
 
 # --- Crypto Technical Indicators using Binance API ---
-def get_crypto_technical_indicator(symbol: str):
+@traced("technicals")
+async def get_crypto_technical_indicator(symbol: str):
     """
     Get technical indicators for a given crypto symbol from Binance.
     Includes RSI, MA_20, MA_120 and Volume.
@@ -13,82 +20,102 @@ def get_crypto_technical_indicator(symbol: str):
     symbol = symbol.upper()
     binance_symbol = f"{symbol}USDT"
 
-    # Fetch historical klines (candlestick) data for 120 days
-    url = "https://api.binance.com/api/v3/klines"
-    params = {
-        "symbol": binance_symbol,
-        "interval": "1d",
-        "limit": 120
-    }
-    response = requests.get(url, params=params)
-    data = response.json()
+    cached = await indicator_cache.aget(f"crypto:{binance_symbol}")
+    if cached is not None:
+        return cached
+
+    # Historical klines (candlestick) data for 120 days, synced incrementally from Binance.
+    # One extra kline keeps 120 closed candles while today's is still open.
+    candles = await get_binance_klines(binance_symbol, interval="1d", limit=121)
 
-    if not data or isinstance(data, dict) and data.get("code"):
+    closed = closed_rows(candles["open_time"], "1d")
+    if not closed:
         return {"error": f"Failed to fetch data for {binance_symbol}"}
+    update_from_candles(binance_symbol, "1d", candles)
 
-    # Parse close prices and volumes
-    closes = [float(kline[4]) for kline in data]
-    volumes = [float(kline[5]) for kline in data]
-    df = pd.DataFrame({
-        "close": closes,
-        "volume": volumes
-    })
-
-    # Calculate RSI
-    delta = df['close'].diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(window=14).mean()
-    avg_loss = loss.rolling(window=14).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    latest_rsi = rsi.iloc[-1]
-
-    # Moving Averages
-    ma_20 = df['close'].rolling(window=20).mean().iloc[-1]
-    ma_120 = df['close'].rolling(window=120).mean().iloc[-1]
-    latest_volume = df['volume'].iloc[-1]
+    # RSI and moving averages of the closed candles, like the live state (get_live_indicators),
+    # from the vectorized engine (a single-row universe)
+    start = max(closed - 120, 0)
+    latest = latest_indicators(candles["close"][start:closed], candles["volume"][start:closed], ma_windows=(20, 120))
 
-    return {
+    result = {
         "symbol": binance_symbol,
-        "RSI": round(latest_rsi, 2),
-        "MA_20": round(ma_20, 2),
-        "MA_120": round(ma_120, 2),
-        "Volume": int(latest_volume)
+        "RSI": round(latest["RSI"][0], 2),
+        "MA_20": round(latest["MA_20"][0], 2),
+        "MA_120": round(latest["MA_120"][0], 2),
+        "Volume": int(latest["Volume"][0])
     }
+    await indicator_cache.aset(f"crypto:{binance_symbol}", result)
+    return result
 
 # --- Stock Technical Indicators using Yahoo Finance ---
-def get_stock_technical_indicator(symbol: str):
+@traced("technicals")
+async def get_stock_technical_indicator(symbol: str):
     """
     Get technical indicators for a given stock symbol using Yahoo Finance.
     Includes RSI, MA_50 and Volume.
     """
-    stock = yf.Ticker(symbol)
-    df = stock.history(period="6mo", interval="1d")
-
-    if df.empty:
-        return {"error": f"No data found for stock symbol: {symbol}"}
+    cached = await indicator_cache.aget(f"stock:{symbol.upper()}")
+    if cached is not None:
+        return cached
 
-    df['close'] = df['Close']
+    candles = await get_stock_candles(symbol, interval="1d", period="6mo")
 
-    # Calculate RSI
-    delta = df['close'].diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(window=14).mean()
-    avg_loss = loss.rolling(window=14).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    latest_rsi = rsi.iloc[-1]
+    closed = closed_rows(candles["open_time"], "1d")
+    if not closed:
+        return {"error": f"No data found for stock symbol: {symbol}"}
+    update_from_candles(symbol.upper(), "1d", candles)
 
-    ma_50 = df['close'].rolling(window=50).mean().iloc[-1]
-    latest_volume = df['Volume'].iloc[-1]
+    # Closed sessions only, like the live state (get_live_indicators)
+    latest = latest_indicators(candles["close"][:closed], candles["volume"][:closed], ma_windows=(50,))
 
-    return {
+    result = {
         "symbol": symbol.upper(),
-        "RSI": round(latest_rsi, 2),
-        "MA_50": round(ma_50, 2),
-        "Volume": int(latest_volume)
+        "RSI": round(latest["RSI"][0], 2),
+        "MA_50": round(latest["MA_50"][0], 2),
+        "Volume": int(latest["Volume"][0])
     }
+    await indicator_cache.aset(f"stock:{symbol.upper()}", result)
+    return result
 
+async def get_stock_technical_indicators(symbols: List[str]) -> Dict[str, dict]:
+    """
+    get_stock_technical_indicator for many symbols, keyed by symbol: the
+    candles of every uncached symbol are synced in one bulk download first.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    uncached = [symbol for symbol in symbols if await indicator_cache.aget(f"stock:{symbol}") is None]
+    if uncached:
+        await sync_stock_candles(uncached, interval="1d", period="6mo")
+    results = await asyncio.gather(*(get_stock_technical_indicator(symbol) for symbol in symbols))
+    return dict(zip(symbols, results))
 
+# --- Live indicators from the streaming state (no network) ---
+def get_live_indicators(symbol: str, is_crypto: bool):
+    """
+    Return the latest indicators from the incremental per-symbol state, in the
+    same shape as the functions above, or None if the state is missing, not yet
+    warm or behind the latest closed candle. Values cover closed candles only,
+    as the functions above do, so both paths give the same answer.
+    """
+    symbol = symbol.upper()
+    key = f"{symbol}USDT" if is_crypto else symbol
+    state = peek_state(key, "1d")
+    if state is None or not state.is_warm(120 if is_crypto else 50) or not state.is_current():
+        return None
+
+    values = state.values()
+    if is_crypto:
+        return {
+            "symbol": key,
+            "RSI": round(values["RSI"], 2),
+            "MA_20": round(values["MA_20"], 2),
+            "MA_120": round(values["MA_120"], 2),
+            "Volume": int(values["Volume"])
+        }
+    return {
+        "symbol": key,
+        "RSI": round(values["RSI"], 2),
+        "MA_50": round(values["MA_50"], 2),
+        "Volume": int(values["Volume"])
+    }
@@ -0,0 +1,98 @@
+import os
+import time
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+
+from services import http_client
+from services.scanner import upstream_slot
+from services.singleflight import get_group
+
+BINANCE_TICKER_URL = "https://api.binance.com/api/v3/ticker/24hr"
+TICKER_REFRESH_SECONDS = float(os.getenv("TICKER_REFRESH_SECONDS", 30))
+
+class TickerSnapshot:
+    """
+    The full Binance 24h ticker table at one point in time.
+
+    Rows are indexed by symbol; prices, changes and volumes are kept in float
+    arrays, and the rows are pre-sorted by quote volume so that price lookups
+    and top-N queries never touch the network or re-sort.
+    """
+
+    __slots__ = ("symbols", "index", "last_price", "change_percent", "volume", "quote_volume",
+                 "by_quote_volume", "fetched_at", "_top")
+
+    def __init__(self, tickers: List[dict], fetched_at: Optional[float] = None):
+        # numpy is loaded with the first table, so importing the app doesn't pay for it
+        import numpy as np
+
+        self.symbols = [ticker["symbol"] for ticker in tickers]
+        self.index: Dict[str, int] = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.last_price = np.array([float(ticker["lastPrice"]) for ticker in tickers])
+        self.change_percent = np.array([float(ticker["priceChangePercent"]) for ticker in tickers])
+        self.volume = np.array([float(ticker.get("volume", "nan")) for ticker in tickers])
+        self.quote_volume = np.array([float(ticker.get("quoteVolume", "nan")) for ticker in tickers])
+        self.by_quote_volume = np.argsort(-np.nan_to_num(self.quote_volume, nan=-np.inf), kind="stable")
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self._top: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """Ticker of a pair such as BTCUSDT, or None if Binance doesn't list it."""
+        row = self.index.get(symbol.upper())
+        if row is None:
+            return None
+        return {
+            "symbol": self.symbols[row],
+            "price": float(self.last_price[row]),
+            "change_percent": float(self.change_percent[row]),
+            "volume": float(self.volume[row]),
+            "quote_volume": float(self.quote_volume[row]),
+        }
+
+    def top_by_volume(self, limit: int, quote: str = "USDT") -> List[str]:
+        """Base assets of the `quote` pairs with the highest quote volume, highest first."""
+        ranked = self._top.get(quote)
+        if ranked is None:
+            ranked = self._top[quote] = [
+                self.symbols[row][:-len(quote)] for row in self.by_quote_volume
+                if self.symbols[row].endswith(quote)
+            ]
+        return ranked[:limit]
+
+# --- Shared snapshot ---
+_snapshot: Optional[TickerSnapshot] = None
+_refreshes = get_group("ticker")
+
+async def _refresh() -> Optional[TickerSnapshot]:
+    global _snapshot
+    try:
+        async with upstream_slot("binance"):
+            response = await http_client.get(BINANCE_TICKER_URL)
+        response.raise_for_status()
+        _snapshot = TickerSnapshot(response.json())
+    except (httpx.HTTPError, ValueError, KeyError) as e:
+        # Keep serving the previous table; it is retried on the next lookup
+        logging.error(f"Error refreshing Binance tickers: {e}")
+    return _snapshot
+
+async def get_snapshot(max_age: float = TICKER_REFRESH_SECONDS) -> Optional[TickerSnapshot]:
+    """The current ticker table, pulled again (once, for all callers) when older than `max_age`."""
+    if _snapshot is not None and _snapshot.age() < max_age:
+        return _snapshot
+    return await _refreshes.do_async("24hr", _refresh)
+
+async def get_price(symbol: str, quote: str = "USDT") -> Optional[dict]:
+    snapshot = await get_snapshot()
+    return snapshot.get(symbol.upper() + quote) if snapshot is not None else None
+
+async def top_by_volume(limit: int = 20, quote: str = "USDT") -> List[str]:
+    snapshot = await get_snapshot()
+    return snapshot.top_by_volume(limit, quote) if snapshot is not None else []
@@ -0,0 +1,261 @@
+import os
+import sys
+import glob
+import hmac
+import time
+import asyncio
+import logging
+import functools
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+# Tracing settings
+TRACE_HEADER = "x-debug-timing"  # send "X-Debug-Timing: 1" to get a Server-Timing breakdown back
+PROFILE_HEADER = "x-debug-profile"  # send "X-Debug-Profile: 1" to profile a request and always save it
+# The debug headers are ignored unless DEBUG_TRACING=1 (any value but 0 turns them on) or DEBUG_TOKEN
+# is set (they must carry the token)
+DEBUG_TRACING = os.getenv("DEBUG_TRACING", "0") != "0"
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 0))  # when set, every request is profiled and kept if slower
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 50))  # oldest profiles are removed beyond this
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))  # seconds between samples
+PROFILE_MAX_DEPTH = 128
+
+class Span:
+    __slots__ = ("name", "parent", "start", "duration")
+
+    def __init__(self, name: str, parent: Optional["Span"]):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+class Trace:
+    """The spans recorded while serving one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def breakdown(self) -> Dict[str, dict]:
+        """Total time and count of the finished spans, by name."""
+        totals: Dict[str, dict] = {}
+        for span in self.spans:
+            if span.duration is None:
+                continue
+            entry = totals.setdefault(span.name, {"ms": 0.0, "count": 0})
+            entry["ms"] += span.duration * 1000
+            entry["count"] += 1
+        return totals
+
+    def server_timing(self) -> str:
+        """The breakdown as a Server-Timing header value (shown by browser dev tools)."""
+        parts = [f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}"]
+        for name, entry in self.breakdown().items():
+            part = f"{name};dur={entry['ms']:.1f}"
+            if entry["count"] > 1:
+                part += f';desc="x{entry["count"]}"'
+            parts.append(part)
+        return ", ".join(parts)
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+class span:
+    """
+    Time a stage of the current request: `with span("indicators"): ...`.
+
+    Spans nest through the context, including across tasks started inside
+    them. Without a trace (no debug header) entering a span costs one context
+    variable lookup.
+    """
+
+    __slots__ = ("name", "_span", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._span = None
+
+    def __enter__(self):
+        trace = _trace.get()
+        if trace is not None:
+            self._span = Span(self.name, _span.get())
+            trace.spans.append(self._span)
+            self._token = _span.set(self._span)
+        return self
+
+    def __exit__(self, *exc):
+        if self._span is not None:
+            self._span.duration = time.perf_counter() - self._span.start
+            _span.reset(self._token)
+
+def traced(name: str):
+    """Decorator recording every call of a function (sync or async) as a span."""
+    def decorator(fn: Callable):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+# --- Sampling profiler ---
+def _idle(frame) -> bool:
+    # Pool workers waiting for work sit in their loop (the queue wait itself is C code) or in threading/queue
+    filename = os.path.basename(frame.f_code.co_filename)
+    return filename in ("threading.py", "queue.py") or (filename == "thread.py" and frame.f_code.co_name == "_worker")
+
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+class Profile:
+    """Folded stacks sampled while one request was in flight."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.start = time.perf_counter()
+        self.samples: Counter = Counter()
+
+    def folded(self) -> str:
+        """Brendan Gregg's folded format, readable by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def save(self, directory: str = PROFILE_DIR, keep: int = PROFILE_MAX_FILES) -> str:
+        """Write the profile to `directory`, removing the oldest ones beyond `keep`."""
+        os.makedirs(directory, exist_ok=True)
+        name = "".join(c if c.isalnum() else "_" for c in self.label).strip("_") or "request"
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{name}.folded")
+        with open(path, "w") as f:
+            f.write(self.folded())
+        profiles = sorted(glob.glob(os.path.join(directory, "*.folded")), key=os.path.getmtime)
+        for old in profiles[:max(0, len(profiles) - keep)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # removed by another worker
+        return path
+
+class Sampler:
+    """
+    One background thread sampling the stacks of every thread (the event loop
+    and the to_thread workers) while at least one profile is active.
+
+    Requests share the event loop, so a profile also holds samples of requests
+    that ran concurrently with it; profile under light load for clean graphs.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._profiles: List[Profile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, label: str) -> Profile:
+        profile = Profile(label)
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                # The event loop's idle time (select) is kept: it is time spent waiting on upstreams
+                if ident == own or _idle(frame):
+                    continue
+                stack = f"{names.get(ident, ident)};{_fold(frame)}"
+                for profile in profiles:
+                    profile.samples[stack] += 1
+
+sampler = Sampler()
+
+def debug_allowed(value: bytes) -> bool:
+    """Whether a debug header's value turns its feature on (see DEBUG_TRACING and DEBUG_TOKEN)."""
+    value = value.strip()
+    if DEBUG_TOKEN:
+        return hmac.compare_digest(value, DEBUG_TOKEN.encode())
+    return DEBUG_TRACING and value not in (b"", b"0")
+
+# --- Middleware ---
+class TracingMiddleware:
+    """
+    ASGI middleware that traces requests carrying X-Debug-Timing and profiles
+    requests when asked to.
+
+    Traced responses get a Server-Timing header with the time spent in each
+    span. Requests are profiled when they carry X-Debug-Profile, or all of them
+    when PROFILE_SLOW_MS is set; a profile is written to PROFILE_DIR as folded
+    stacks if it was asked for or the request took longer than PROFILE_SLOW_MS.
+    Both headers are honoured only when the operator allows it (debug_allowed),
+    so anonymous clients can't make the API profile and write files.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        wants_trace = debug_allowed(headers.get(TRACE_HEADER.encode(), b""))
+        wants_profile = debug_allowed(headers.get(PROFILE_HEADER.encode(), b""))
+        if not (wants_trace or wants_profile or PROFILE_SLOW_MS):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace() if wants_trace else None
+        token = _trace.set(trace)
+        profile = sampler.start(f"{scope['method']} {scope['path']}") if wants_profile or PROFILE_SLOW_MS else None
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and wants_trace:
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"server-timing", trace.server_timing().encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _trace.reset(token)
+            if profile is not None:
+                sampler.stop(profile)
+                elapsed_ms = (time.perf_counter() - profile.start) * 1000
+                if wants_profile or elapsed_ms > PROFILE_SLOW_MS:
+                    path = await asyncio.to_thread(profile.save)
+                    logging.info(f"Profiled {profile.label} ({elapsed_ms:.0f} ms): {path}")
@@ -1,7 +1,27 @@
-import requests
-import yfinance as yf
+import asyncio
+from services import http_client
+from services.cache import get_cache
+from services.price_history import fetch_history, symbol_history
+from services.scanner import upstream_slot
+
+MARKET_CACHE_TTL = 60  # seconds
+
+market_cache = get_cache("market", ttl=MARKET_CACHE_TTL)
+
+async def fetch_coin_markets(crypto_ids: str) -> list:
+    async with upstream_slot("coingecko"):
+        response = await http_client.get("https://api.coingecko.com/api/v3/coins/markets", params={
+            "vs_currency": "usd",
+            "ids": crypto_ids,
+            "price_change_percentage": "24h"
+        })
+    return response.json()
+
+async def analyze_market_trend():
+    cached = await market_cache.aget("overview")
+    if cached is not None:
+        return cached
 
-def analyze_market_trend():
     # stock（yfinance）
     index_symbols = {
         "S&P500": "^GSPC",
@@ -9,11 +29,19 @@ def analyze_market_trend():
         "Dow Jones": "^DJI"
     }
 
+    crypto_ids = "bitcoin,ethereum,binancecoin,solana,dogecoin"
+
+    # One bulk request for all indices, concurrently with the CoinGecko request
+    history, crypto_data = await asyncio.gather(
+        fetch_history(list(index_symbols.values()), period="1d"),
+        fetch_coin_markets(crypto_ids)
+    )
+
     stock_changes = {}
     for name, symbol in index_symbols.items():
-        data = yf.Ticker(symbol).history(period="1d")
-        open_price = data["Open"][-1]
-        close_price = data["Close"][-1]
+        data = symbol_history(history, symbol)
+        open_price = data["Open"].iloc[-1]
+        close_price = data["Close"].iloc[-1]
         pct_change = (close_price - open_price) / open_price * 100
         stock_changes[name] = {
             "current_price": f"${round(close_price, 2)}",
@@ -25,14 +53,6 @@ def analyze_market_trend():
     )
 
     # crpto
-    crypto_ids = "bitcoin,ethereum,binancecoin,solana,dogecoin"
-    response = requests.get("https://api.coingecko.com/api/v3/coins/markets", params={
-        "vs_currency": "usd",
-        "ids": crypto_ids,
-        "price_change_percentage": "24h"
-    })
-    crypto_data = response.json()
-
     crypto_info = {
         coin["id"]: {
             "current_price": f"${round(coin['current_price'], 2)}",
@@ -45,7 +65,7 @@ def analyze_market_trend():
         sum(v["percentage_change"] for v in crypto_info.values()) / len(crypto_info), 2
     )
 
-    return {
+    result = {
         "stock_market": {
             "indices": stock_changes,
             "avg_trend": stock_avg_trend
@@ -55,4 +75,5 @@ def analyze_market_trend():
             "avg_trend": crypto_avg_trend
         }
     }
-
+    await market_cache.aset("overview", result)
+    return result
@@ -0,0 +1,52 @@
+import asyncio
+
+from services import cache
+from services.cache import LocalBackend, TieredCache
+
+
+class BrokenBackend:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise TimeoutError("redis timed out")
+
+    def set(self, key, value, ex=None):
+        self.calls += 1
+        raise TimeoutError("redis timed out")
+
+
+def test_async_lookups_fill_the_local_tier_from_the_shared_one():
+    shared = LocalBackend()
+    writer = TieredCache("test", ttl=60, backend=shared)
+    reader = TieredCache("test", ttl=60, backend=shared)
+
+    async def run():
+        await writer.aset("key", {"value": 1})
+        return await reader.aget("key"), await reader.aget("key"), await reader.aget("missing", "default")
+
+    assert asyncio.run(run()) == ({"value": 1}, {"value": 1}, "default")
+    stats = reader.stats()
+    assert (stats["shared_hits"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_shared_tier_is_skipped_after_a_failure(monkeypatch):
+    backend = BrokenBackend()
+    tiered = TieredCache("test", ttl=60, backend=backend)
+
+    async def run():
+        await tiered.aset("key", "value")  # written locally, the shared write fails
+        assert await tiered.aget("key") == "value"
+        assert await tiered.aget("other") is None
+        await tiered.aset("other", "value")
+
+    asyncio.run(run())
+    assert backend.calls == 1
+    assert tiered.stats()["shared_errors"] == 1
+
+    # Tried again once the breaker closes
+    monkeypatch.setattr(cache, "CACHE_BREAKER_SECONDS", 0)
+    tiered._shared_down_until = 0
+    assert tiered.get("missing") is None
+    assert backend.calls == 2
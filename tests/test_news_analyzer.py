@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from services import news_analyzer, sentiment_store
+from services.cache import TieredCache
+from services.news_index import NewsIndex
+from services.sentiment_store import article_label
+
+URL = "https://newsapi.org/v2/everything?q=tesla"
+ARTICLES = [
+    {"title": "Tesla shares surge", "url": "https://example.com/1"},
+    {"title": "Tesla recalls cars", "url": "https://example.com/2"},
+]
+
+
+def test_unscored_articles_have_no_label_and_cast_no_vote():
+    sentiment_store.clear()
+    assert article_label({"title": "Tesla", "azure_sentiment": {}}) is None
+    assert article_label({"azure_sentiment": {"label": "negative"}}) == "Negative"
+
+    sentiment_store.record_article({"TSLA"}, {"title": "Tesla", "azure_sentiment": {}})
+    assert sentiment_store.get_sentiment("TSLA") is None
+
+
+def test_a_throttled_pull_is_neither_cached_nor_indexed(monkeypatch):
+    index = NewsIndex()
+    monkeypatch.setattr(news_analyzer, "news_index", index)
+    monkeypatch.setattr(news_analyzer, "news_cache", TieredCache("news", ttl=60, backend=None))
+
+    async def fetch(url, reserve=0):
+        return {"articles": [dict(article) for article in ARTICLES]}
+
+    async def gpt(titles, contents):
+        return "", ["analysis"] * len(titles)
+
+    # Azure scored the first article and was rate-limited on the second
+    async def throttled(documents):
+        return [{"label": "positive", "confidence_scores": {}}, {}]
+
+    monkeypatch.setattr(news_analyzer, "fetch_articles", fetch)
+    monkeypatch.setattr(news_analyzer, "get_gpt_analysis", gpt)
+    monkeypatch.setattr(news_analyzer, "analyze_sentiment", throttled)
+
+    result = asyncio.run(news_analyzer.fetch_and_analyze_news_by_url(URL))
+    assert len(result["articles"]) == 2
+    assert [article["title"] for article in index.lookup("TSLA")] == ["Tesla shares surge"]
+    assert news_analyzer.news_cache.stats()["items"] == 0
+
+    # The next pull scores the second article; now it is cached and indexed
+    async def scored(documents):
+        return [{"label": "positive", "confidence_scores": {}}, {"label": "negative", "confidence_scores": {}}]
+
+    monkeypatch.setattr(news_analyzer, "analyze_sentiment", scored)
+    asyncio.run(news_analyzer.fetch_and_analyze_news_by_url(URL))
+    assert len(index.lookup("TSLA")) == 2
+    assert news_analyzer.news_cache.stats()["items"] == 1
+
+
+def test_news_is_served_unscored_without_azure_credentials(monkeypatch):
+    from services import metrics, sentiment
+
+    index = NewsIndex()
+    monkeypatch.setattr(news_analyzer, "news_index", index)
+    monkeypatch.setattr(sentiment, "AZURE_KEY", None)
+    monkeypatch.setattr(sentiment, "AZURE_ENDPOINT", None)
+    monkeypatch.setattr(sentiment, "_client", None)
+    monkeypatch.setattr(sentiment, "sentiment_cache", TieredCache("sentiment", ttl=60, backend=None))
+
+    async def fetch(url, reserve=0):
+        return {"articles": [dict(article) for article in ARTICLES]}
+
+    monkeypatch.setattr(news_analyzer, "fetch_articles", fetch)
+    before = metrics.fallbacks._values.get(("azure", "unconfigured"), 0)
+
+    result = asyncio.run(news_analyzer.fetch_and_score_news_by_url(URL))
+    assert [article["azure_sentiment"] for article in result["articles"]] == [{}, {}]
+    assert index.lookup("TSLA") == []
+    assert metrics.fallbacks._values[("azure", "unconfigured")] == before + 1
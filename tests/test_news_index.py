@@ -0,0 +1,22 @@
+from services.news_index import NewsIndex
+
+
+def symbols(title, **kwargs):
+    return NewsIndex(**kwargs).symbols_of({"title": title})
+
+
+def test_names_are_matched_case_insensitively():
+    assert symbols("Why BITCOIN and tesla rallied") == {"BTC", "TSLA"}
+
+
+def test_common_word_names_need_their_capitalization():
+    assert symbols("Visa fees rise as Ripple settles") == {"V", "XRP"}
+    assert symbols("The ripple effect of visa fees and an avalanche of orders") == set()
+    assert symbols("Meta and Intel report earnings") == {"META", "INTC"}
+
+
+def test_bare_tickers_only_count_for_known_symbols():
+    assert symbols("US CEO says AI demand lifts NVDA and AMD") == {"NVDA", "AMD"}
+    # Cashtags always count
+    assert symbols("$PLTR jumps after the US deal") == {"PLTR"}
+    assert symbols("PLTR jumps", symbols=["PLTR"]) == {"PLTR"}
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from services import ohlcv_store
+from services.ohlcv_store import OHLCVStore
+from services.rate_limiter import file_lock
+
+
+def candles(times, close):
+    times = np.asarray(times, dtype=np.int64)
+    values = np.full(len(times), float(close))
+    return {"open_time": times, "open": values, "high": values, "low": values, "close": values, "volume": values}
+
+
+def test_write_replaces_from_the_first_new_candle(tmp_path):
+    store = OHLCVStore("test", root=str(tmp_path))
+    store.write("BTCUSDT", "1d", candles([1, 2, 3], close=10))
+    # The last (still open) candle comes again, with the next one
+    store.write("BTCUSDT", "1d", candles([3, 4], close=20))
+
+    stored = store.read("BTCUSDT", "1d")
+    assert stored["open_time"].tolist() == [1, 2, 3, 4]
+    assert stored["close"].tolist() == [10, 10, 20, 20]
+    assert store.read("BTCUSDT", "1d", limit=2)["open_time"].tolist() == [3, 4]
+
+
+def test_writes_never_change_a_mapping_in_use(tmp_path):
+    store = OHLCVStore("test", root=str(tmp_path))
+    store.write("BTCUSDT", "1d", candles([1, 2, 3], close=10))
+    reader = store.read("BTCUSDT", "1d")
+
+    # Shorter than what the reader mapped, then longer again
+    store.write("BTCUSDT", "1d", candles([2], close=30))
+    store.write("BTCUSDT", "1d", candles([3, 4, 5], close=40))
+
+    assert reader["open_time"].tolist() == [1, 2, 3]
+    assert reader["close"].tolist() == [10, 10, 10]
+    assert store.read("BTCUSDT", "1d")["close"].tolist() == [10, 30, 40, 40, 40]
+
+
+def test_only_the_current_and_previous_generations_are_kept(tmp_path):
+    store = OHLCVStore("test", root=str(tmp_path))
+    for day in range(1, 5):
+        store.write("BTCUSDT", "1d", candles([day], close=day))
+
+    files = sorted(name for name in os.listdir(tmp_path / "test" / "BTCUSDT_1d") if name.startswith("close"))
+    assert files == ["close.3.bin", "close.4.bin"]
+    assert store.read("BTCUSDT", "1d")["close"].tolist() == [1, 2, 3, 4]
+
+
+def test_a_sync_waiting_for_another_workers_lock_leaves_the_loop_free(tmp_path, monkeypatch):
+    store = OHLCVStore("test", root=str(tmp_path))
+    monkeypatch.setattr(ohlcv_store, "binance_store", store)
+
+    async def fetch_klines(symbol, interval, limit, start_time=None):
+        return [[1, "1", "1", "1", "1", "1"], [2, "2", "2", "2", "2", "2"]]
+
+    monkeypatch.setattr(ohlcv_store, "_fetch_klines", fetch_klines)
+    directory = tmp_path / "test" / "BTCUSDT_1d"
+    directory.mkdir(parents=True)
+    locked, release = threading.Event(), threading.Event()
+
+    # Another worker holds the series lock for a while
+    def other_worker():
+        with file_lock(str(directory / "meta")):
+            locked.set()
+            release.wait(5)
+
+    threading.Thread(target=other_worker).start()
+    locked.wait(5)
+
+    async def run():
+        sync = asyncio.ensure_future(ohlcv_store.get_binance_klines("BTCUSDT", "1d", limit=5))
+        ticks = 0
+        end = time.monotonic() + 0.2
+        while time.monotonic() < end:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        return ticks, await sync
+
+    ticks, candles = asyncio.run(run())
+    assert ticks >= 5
+    assert candles["open_time"].tolist() == [1, 2]
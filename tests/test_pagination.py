@@ -0,0 +1,63 @@
+import base64
+
+import pytest
+
+from services.pagination import article_page, decode_cursor, encode_cursor, paginate, parse_fields, project
+
+
+def articles(*names):
+    return [{"title": name, "url": f"https://example.com/{name}", "source": {"id": None, "name": "Wire"}} for name in names]
+
+
+def test_fields_are_deduplicated_and_nested_paths_kept():
+    assert parse_fields(None) is None and parse_fields(" , ") is None
+    assert parse_fields("url,title,source.name,title") == ("source.name", "title", "url")
+    assert parse_fields("source.name,source") == ("source",)
+    for bad in ("title,.name", "source..name", ",".join(f"f{i}" for i in range(40))):
+        with pytest.raises(ValueError):
+            parse_fields(bad)
+
+    article = articles("a")[0]
+    assert project(article, ("source.name", "title", "missing.path")) == {"source": {"name": "Wire"}, "title": "a"}
+
+
+@pytest.mark.parametrize("cursor", ["%%%", "bm90IGpzb24", base64.urlsafe_b64encode(b'{"o":-1,"k":""}').decode(),
+                                    base64.urlsafe_b64encode(b'{"o":"x","k":""}').decode(),
+                                    base64.urlsafe_b64encode(b'[1,2]').decode()])
+def test_garbage_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_follow_each_other():
+    items = articles("a", "b", "c", "d", "e")
+    page, cursor = paginate(items, 2)
+    assert [item["title"] for item in page] == ["a", "b"]
+    page, cursor = paginate(items, 2, decode_cursor(cursor))
+    assert [item["title"] for item in page] == ["c", "d"]
+    page, cursor = paginate(items, 2, decode_cursor(cursor))
+    assert [item["title"] for item in page] == ["e"] and cursor is None
+
+
+def test_a_refreshed_snapshot_resumes_after_the_last_item_seen():
+    _, cursor = paginate(articles("a", "b", "c", "d"), 2)
+    position = decode_cursor(cursor)
+
+    # Two new articles arrived at the top: "b" moved down
+    page, _ = paginate(articles("x", "y", "a", "b", "c", "d"), 2, position)
+    assert [item["title"] for item in page] == ["c", "d"]
+
+    # "b" dropped out: resume at the same offset, clamped to the list
+    page, _ = paginate(articles("a", "c", "d"), 2, position)
+    assert [item["title"] for item in page] == ["d"]
+    page, cursor = paginate(articles("a"), 2, position)
+    assert page == [] and cursor is None
+
+
+def test_article_page_projects_and_pages():
+    value = {"status": "ok", "articles": articles("a", "b", "c")}
+    page = article_page(value, ("title",), 2, None)
+    assert page["articles"] == [{"title": "a"}, {"title": "b"}]
+    assert page["status"] == "ok" and decode_cursor(page["next_cursor"]) == (2, "https://example.com/b")
+    assert article_page(value, None, None, None) == value
+    assert encode_cursor(2, value["articles"][1]) == page["next_cursor"]
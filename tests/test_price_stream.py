@@ -0,0 +1,143 @@
+import asyncio
+import types
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from services import indicator_state, price_stream
+from services.indicator_state import INTERVAL_MS
+from services.price_stream import LiveFeed, PriceHub, ReplayFeed, Subscriber
+
+DAY = INTERVAL_MS["1d"]
+START = 1_700_000_000_000 // DAY * DAY
+
+
+@pytest.fixture(autouse=True)
+def states(monkeypatch):
+    monkeypatch.setattr(indicator_state, "_states", {})
+    monkeypatch.setattr(indicator_state, "_loaded", True)
+    monkeypatch.setattr(indicator_state, "maybe_save_states", lambda: None)
+
+
+def kline(pair, day, price, closed=False, second=0):
+    open_time = START + day * DAY
+    return {"E": open_time + second * 1000, "k": {"s": pair, "t": open_time, "c": str(price), "v": "10", "x": closed}}
+
+
+def ticks(pair, count):
+    return [kline(pair, 0, 100 + i, second=i) for i in range(count)]
+
+
+def test_subscribers_of_a_symbol_share_one_feed():
+    hub = PriceHub(ReplayFeed(messages=ticks("BTCUSDT", 3), speed=0, loop=False), warm=False)
+    first, second = Subscriber(), Subscriber()
+
+    async def run():
+        hub.subscribe(first, "btc", is_crypto=True)
+        hub.subscribe(second, "BTC", is_crypto=True)
+        assert hub.stats()["channels"] == 1
+        await asyncio.sleep(0.05)
+        return await first.next_batch(), await second.next_batch()
+
+    batches = asyncio.run(run())
+    assert [[message["price"] for message in batch] for batch in batches] == [[102.0], [102.0]]
+    assert hub.ticks == 3 and hub.pushes == 6
+
+
+def test_a_slow_subscriber_only_gets_the_newest_tick():
+    hub = PriceHub(ReplayFeed(messages=ticks("ETHUSDT", 5), speed=0, loop=False), warm=False)
+    subscriber = Subscriber()
+
+    async def run():
+        hub.subscribe(subscriber, "ETH", is_crypto=True)
+        await asyncio.sleep(0.05)
+        return await subscriber.next_batch()
+
+    batch = asyncio.run(run())
+    assert [message["price"] for message in batch] == [104.0]
+    assert subscriber.coalesced == 4 and subscriber.delivered == 1
+
+
+def test_the_last_unsubscribe_cancels_the_feed():
+    hub = PriceHub(ReplayFeed(messages=ticks("SOLUSDT", 2), speed=0, loop=True), warm=False)
+    first, second = Subscriber(), Subscriber()
+
+    async def run():
+        hub.subscribe(first, "SOL", is_crypto=True)
+        hub.subscribe(second, "SOL", is_crypto=True)
+        task = hub._channels[hub.key("SOL", True)].task
+        await asyncio.sleep(0.01)
+        hub.unsubscribe(first, "SOL", is_crypto=True)
+        assert not task.done()
+        hub.unsubscribe_all(second)
+        await asyncio.sleep(0)
+        return task
+
+    task = asyncio.run(run())
+    assert task.cancelled()
+    assert hub.stats()["channels"] == 0
+
+
+def test_closed_ticks_update_the_state_and_open_ones_preview_it():
+    messages = [kline("BNBUSDT", 0, 100, closed=True), kline("BNBUSDT", 1, 110), kline("BNBUSDT", 1, 120)]
+    hub = PriceHub(ReplayFeed(messages=messages, speed=0, loop=False), warm=False)
+    subscriber = Subscriber()
+
+    async def run():
+        hub.subscribe(subscriber, "BNB", is_crypto=True)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    state = indicator_state.get_state("BNBUSDT", "1d")
+    # Only the closed candle was ingested; the open one stays a preview
+    assert state.count == 1 and state.last_time == START and state.last_close == 100
+    assert hub._message(hub.key("BNB", True), price_stream.parse_kline(messages[2]))["closed"] is False
+
+
+def test_stock_poll_yields_the_session_close_even_if_the_price_is_unchanged(monkeypatch):
+    clock = [(START + DAY // 2) / 1000]
+    monkeypatch.setattr(price_stream, "time", types.SimpleNamespace(time=lambda: clock[0]))
+    monkeypatch.setattr(price_stream, "STOCK_POLL_SECONDS", 0)
+
+    async def get_stock_candles(symbol, interval="1d", limit=1):
+        return {"open_time": [START], "close": [100.0], "volume": [10.0]}
+
+    monkeypatch.setattr(price_stream, "get_stock_candles", get_stock_candles)
+
+    async def run():
+        feed = LiveFeed().ticks("AAPL", is_crypto=False)
+        first = await feed.__anext__()
+        # The session ends; the last candle no longer changes
+        clock[0] += DAY / 1000
+        second = await asyncio.wait_for(feed.__anext__(), 1)
+        await feed.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert not first["closed"]
+    assert second["closed"] and second["price"] == first["price"]
+
+
+def test_a_closed_tick_after_a_gap_rebuilds_the_state_from_the_store(monkeypatch):
+    # The stream missed day 1: day 2 closes right after day 0
+    messages = [kline("XRPUSDT", 0, 100, closed=True), kline("XRPUSDT", 2, 120, closed=True)]
+    hub = PriceHub(ReplayFeed(messages=messages, speed=0, loop=False), warm=False)
+    stored = {"open_time": [START + day * DAY for day in range(3)], "close": [100.0, 110.0, 120.0], "volume": [10.0] * 3}
+    fetched = []
+
+    async def get_binance_klines(pair, interval="1d", limit=120):
+        fetched.append(pair)
+        return stored
+
+    monkeypatch.setattr(price_stream, "get_binance_klines", get_binance_klines)
+
+    async def run():
+        hub.subscribe(Subscriber(), "XRP", is_crypto=True)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    state = indicator_state.get_state("XRPUSDT", "1d")
+    assert fetched == ["XRPUSDT"]
+    assert state.count == 3 and state.last_close == 120
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import FileBackend, Limit, RateLimited, _take
+
+NOON = time.mktime((2024, 1, 15, 12, 0, 0, 0, 0, -1))
+
+
+def test_bucket_refills_at_its_rate():
+    limit = Limit(per_minute=60, burst=2)
+    state = {}
+    assert _take(state, limit, 1, NOON)[0]
+    assert _take(state, limit, 1, NOON)[0]
+
+    allowed, retry_after, reason = _take(state, limit, 1, NOON)
+    assert not allowed and reason == "rate"
+    assert retry_after == pytest.approx(1.0)
+
+    assert _take(state, limit, 1, NOON + 1)[0]
+
+
+def test_refill_is_capped_at_the_burst():
+    limit = Limit(per_minute=60, burst=2)
+    state = {}
+    _take(state, limit, 2, NOON)
+    results = [_take(state, limit, 1, NOON + 3600)[0] for _ in range(3)]
+    assert results == [True, True, False]
+
+
+def test_stale_clock_never_moves_the_refill_backwards():
+    limit = Limit(per_minute=60, burst=1)
+    state = {}
+    assert _take(state, limit, 1, NOON + 10)[0]
+    # A caller that read the clock before waiting for the lock
+    assert not _take(state, limit, 1, NOON + 5)[0]
+    assert state["ts"] == NOON + 10
+
+
+def test_daily_quota_refuses_until_the_next_day():
+    limit = Limit(per_minute=600, burst=100, per_day=3)
+    state = {}
+    assert all(_take(state, limit, 1, NOON)[0] for _ in range(3))
+
+    allowed, retry_after, reason = _take(state, limit, 1, NOON + 1)
+    assert not allowed and reason == "daily"
+    assert retry_after == pytest.approx(12 * 3600 - 1)
+
+    assert _take(state, limit, 1, NOON + 86400)[0]
+
+
+def test_reserve_leaves_quota_to_other_callers():
+    limit = Limit(per_minute=600, burst=100, per_day=10)
+    state = {}
+    assert [_take(state, limit, 1, NOON, reserve=8)[0] for _ in range(3)] == [True, True, False]
+    assert _take(state, limit, 1, NOON)[0]
+
+
+def test_quota_interval_spends_the_share(monkeypatch):
+    monkeypatch.setitem(rate_limiter.LIMITS, "test", Limit(per_minute=60, burst=1, per_day=100))
+    assert rate_limiter.quota_interval("test", 0.25) == 86400 / 25
+    assert rate_limiter.quota_interval("test", 0.1, calls=2) == 86400 / 5
+    assert rate_limiter.quota_interval("test", 1.0, minimum=3600) == 3600
+    assert rate_limiter.quota_interval("unlimited", 0.5, minimum=120) == 120
+
+
+def test_reserve_shrinks_over_the_day(monkeypatch):
+    monkeypatch.setitem(rate_limiter.LIMITS, "test", Limit(per_minute=60, burst=1, per_day=100))
+    assert rate_limiter.reserve_for("test", 0.5, now=NOON) == pytest.approx(25)
+    assert rate_limiter.reserve_for("unlimited", 0.5, now=NOON) == 0
+
+
+def test_acquire_shares_state_through_the_file_backend(tmp_path, monkeypatch):
+    monkeypatch.setitem(rate_limiter.LIMITS, "test", Limit(per_minute=600, burst=100, per_day=2))
+    monkeypatch.setattr(rate_limiter, "_backend", FileBackend(str(tmp_path / "limits.json")))
+
+    async def run():
+        await rate_limiter.acquire("test")
+        # A second worker process sees the same state file
+        rate_limiter.set_backend(FileBackend(str(tmp_path / "limits.json")))
+        await rate_limiter.acquire("test")
+        with pytest.raises(RateLimited) as refused:
+            await rate_limiter.acquire("test")
+        return refused.value
+
+    refused = asyncio.run(run())
+    assert refused.reason == "daily"
+    assert rate_limiter.get_backend().used_today("test", time.time()) == 2
+
+
+def test_a_throttled_gpt_call_is_sent_once_and_refunded(tmp_path, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    from services import gpt_client, http_client
+
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0"}, text="Too Many Requests")
+
+    monkeypatch.setitem(rate_limiter.LIMITS, "gpt", Limit(per_minute=600, burst=100, per_day=10))
+    monkeypatch.setattr(rate_limiter, "_backend", FileBackend(str(tmp_path / "limits.json")))
+    monkeypatch.setattr(gpt_client, "GITHUB_TOKEN", "test-token")
+    http_client.set_transport(httpx.MockTransport(handler))
+    try:
+        with pytest.raises(Exception, match="429"):
+            asyncio.run(gpt_client.request_gpt_analysis(["Stocks rally"]))
+    finally:
+        http_client.set_transport(None)
+
+    # The limiter charged one call; the client must not have spent more upstream
+    assert len(sent) == 1
+    assert rate_limiter.get_backend().used_today("gpt", time.time()) == 0
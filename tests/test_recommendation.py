@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+# The strategy pipeline needs the full requirements
+pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from services import recommendation
+from services.recommendation import calculate_crypto_score, calculate_stock_score
+
+
+def analysis(symbol, signal, sentiment, rsi, **indicators):
+    return {"symbol": symbol, "final_signal": signal, "positive_sentiment": sentiment,
+            "technical_indicators": {"RSI": rsi, **indicators}}
+
+
+def test_signal_outranks_sentiment_and_rsi():
+    assert calculate_stock_score(analysis("A", "Buy", 0.0, 70)) > calculate_stock_score(analysis("B", "Hold", 1.0, 30))
+    assert calculate_stock_score(analysis("A", "Buy", 0.8, 30)) == pytest.approx(7.8)
+    assert calculate_stock_score({"technical_indicators": {"RSI": "N/A"}}) == pytest.approx(4.0)
+
+
+def test_crypto_score_rewards_an_uptrend():
+    flat = analysis("BTC", "Hold", 0.5, 50, MA_20=100, MA_120=100)
+    rising = analysis("BTC", "Hold", 0.5, 50, MA_20=110, MA_120=100)
+    assert calculate_crypto_score(rising) == pytest.approx(calculate_crypto_score(flat) + recommendation.TREND_BONUS)
+
+
+def test_recommend_top_stocks_scans_scores_and_ranks(monkeypatch):
+    analyses = {
+        "AAPL": analysis("AAPL", "Hold", 0.5, 50, MA_50=1),
+        "MSFT": analysis("MSFT", "Buy", 0.8, 35, MA_50=1),
+        "TSLA": {"error": "No data found for stock symbol: TSLA"},
+    }
+
+    async def analyze(symbol):
+        if symbol not in analyses:
+            raise RuntimeError("no data")
+        return analyses[symbol]
+
+    async def price(symbol):
+        return {"price": 100.0, "change_percent": 1.0}
+
+    monkeypatch.setattr(recommendation, "analyze_stock_strategy", analyze)
+    monkeypatch.setattr(recommendation, "get_stock_price", price)
+
+    result = asyncio.run(recommendation.recommend_top_stocks(count=5))
+    assert [item["symbol"] for item in result] == ["MSFT", "AAPL"]
+    assert result[0]["score"] == calculate_stock_score(analyses["MSFT"])
+    assert result[0]["price"] == 100.0
+
+
+def test_prices_are_looked_up_together_and_only_for_the_top(monkeypatch):
+    async def analyze(symbol):
+        return analysis(symbol, "Buy" if symbol in ("NVDA", "AMD", "META") else "Hold", 0.5, 50)
+
+    priced = []
+
+    async def price(symbol):
+        priced.append(symbol)
+        await asyncio.sleep(0.1)
+        return {"price": 1.0, "change_percent": 0.0}
+
+    monkeypatch.setattr(recommendation, "analyze_stock_strategy", analyze)
+    monkeypatch.setattr(recommendation, "get_stock_price", price)
+
+    start = time.perf_counter()
+    result = asyncio.run(recommendation.recommend_top_stocks(count=3))
+    assert time.perf_counter() - start < 0.25
+    assert sorted(priced) == ["AMD", "META", "NVDA"]
+    assert [item["symbol"] for item in result] == ["NVDA", "META", "AMD"]
@@ -0,0 +1,61 @@
+import asyncio
+
+from services.scanner import iter_scan, scan_symbols
+
+
+def test_scan_collects_results_timeouts_and_errors():
+    async def analyze(symbol):
+        if symbol == "SLOW":
+            await asyncio.sleep(1)
+        if symbol == "BAD":
+            raise RuntimeError("no data")
+        return {"symbol": symbol}
+
+    result = asyncio.run(scan_symbols(["AAA", "SLOW", "BAD", "BBB"], analyze, symbol_timeout=0.05))
+    assert list(result["results"]) == ["AAA", "BBB"]
+    assert result["timed_out"] == ["SLOW"]
+    assert result["failed"] == {"BAD": "no data"}
+
+
+def test_cancellation_inside_one_analysis_fails_only_that_symbol():
+    async def analyze(symbol):
+        if symbol == "CANCELLED":
+            # e.g. a coalesced call cancelled by another caller
+            raise asyncio.CancelledError()
+        return {"symbol": symbol}
+
+    result = asyncio.run(scan_symbols(["AAA", "CANCELLED", "BBB"], analyze))
+    assert list(result["results"]) == ["AAA", "BBB"]
+    assert result["failed"] == {"CANCELLED": "cancelled"}
+
+
+def test_deadline_reports_unfinished_symbols_as_timed_out():
+    async def analyze(symbol):
+        await asyncio.sleep(0 if symbol == "FAST" else 1)
+        return symbol
+
+    async def run():
+        return [(symbol, status) async for symbol, status, _ in iter_scan(["FAST", "SLOW"], analyze, deadline=0.05)]
+
+    assert asyncio.run(run()) == [("FAST", "ok"), ("SLOW", "timeout")]
+
+
+def test_cancelling_the_scan_stops_it():
+    started = []
+
+    async def analyze(symbol):
+        started.append(symbol)
+        await asyncio.sleep(1)
+
+    async def run():
+        scan = asyncio.ensure_future(scan_symbols(["AAA", "BBB"], analyze))
+        while len(started) < 2:
+            await asyncio.sleep(0)
+        scan.cancel()
+        try:
+            await scan
+        except asyncio.CancelledError:
+            return "cancelled"
+        return "finished"
+
+    assert asyncio.run(run()) == "cancelled"
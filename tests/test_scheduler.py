@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from services import scheduler
+from services.scheduler import FileLease
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    """A scratch registry, snapshot file and lease."""
+    monkeypatch.setattr(scheduler, "_jobs", {})
+    monkeypatch.setattr(scheduler, "_snapshots", {})
+    monkeypatch.setattr(scheduler, "_sync_listeners", [])
+    monkeypatch.setattr(scheduler, "_synced_mtime", None)
+    monkeypatch.setattr(scheduler, "_leading", False)
+    monkeypatch.setattr(scheduler, "SNAPSHOT_FILE", str(tmp_path / "snapshots.json"))
+    monkeypatch.setattr(scheduler, "_shared_client", lambda: None)
+    return tmp_path
+
+
+def test_only_one_worker_holds_the_file_lease(tmp_path):
+    leader, follower = FileLease(str(tmp_path / "lease")), FileLease(str(tmp_path / "lease"))
+    assert leader.acquire()
+    assert leader.acquire()  # renewing
+    assert not follower.acquire()
+
+    leader.release()
+    assert follower.acquire()
+    follower.release()
+
+
+def test_follower_serves_the_leaders_snapshot_without_refreshing(jobs):
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    scheduler.register_job("prices", 60, refresh)
+    path = str(jobs / "snapshots.json")
+    stale = time.time() - 3600
+    with open(path, "w") as f:
+        json.dump({"prices": {"value": {"value": "leader"}, "updated_at": stale}}, f)
+
+    synced = []
+    scheduler.on_sync(lambda name, snapshot: synced.append(name))
+    assert scheduler.sync_snapshots(path) == 1
+    assert scheduler.sync_snapshots(path) == 0  # unchanged file isn't re-read
+
+    # Stale, but only the leader refreshes
+    assert asyncio.run(scheduler.serve("prices")) == {"value": "leader"}
+    assert calls == []
+    assert synced == ["prices"]
+
+
+def test_leader_refreshes_and_publishes(jobs, monkeypatch):
+    async def refresh():
+        return {"value": "fresh"}
+
+    scheduler.register_job("prices", 60, refresh)
+    monkeypatch.setattr(scheduler, "_leading", True)
+    asyncio.run(scheduler.refresh("prices"))
+
+    with open(str(jobs / "snapshots.json")) as f:
+        assert json.load(f)["prices"]["value"] == {"value": "fresh"}
+
+
+def test_follower_keeps_its_cold_start_value_local(jobs):
+    async def refresh():
+        return {"value": "local"}
+
+    scheduler.register_job("prices", 60, refresh)
+    assert asyncio.run(scheduler.serve("prices")) == {"value": "local"}
+    assert not (jobs / "snapshots.json").exists()
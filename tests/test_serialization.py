@@ -0,0 +1,77 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from starlette.requests import Request
+
+from services import serialization
+from services.serialization import COMPRESS_MIN_BYTES, encoded_response, dumps
+
+SMALL = {"articles": [{"title": "Stocks rally"}]}
+LARGE = {"articles": [{"title": f"Headline {i}", "content": "x" * 50} for i in range(100)]}
+
+
+def request(**headers):
+    return Request({"type": "http", "method": "GET", "path": "/news", "query_string": b"",
+                    "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]})
+
+
+def test_the_etag_follows_the_content():
+    first = encoded_response(request(), SMALL)
+    again = encoded_response(request(), {"articles": [{"title": "Stocks rally"}]})
+    changed = encoded_response(request(), {"articles": [{"title": "Stocks fall"}]})
+    assert first.status_code == 200 and first.body == dumps(SMALL)
+    assert first.headers["etag"] == again.headers["etag"] != changed.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+
+def test_if_none_match_gives_a_304_for_any_representation():
+    etag = encoded_response(request(), LARGE).headers["etag"]
+    gzipped = encoded_response(request(accept_encoding="gzip"), LARGE).headers["etag"]
+    assert gzipped == etag[:-1] + '-gzip"'
+
+    for tag in (etag, gzipped, f"W/{etag}", f'"other", {etag}', "*"):
+        response = encoded_response(request(if_none_match=tag, accept_encoding="gzip"), LARGE)
+        assert response.status_code == 304 and response.body == b""
+        assert response.headers["etag"] == gzipped
+    assert encoded_response(request(if_none_match='"other"'), LARGE).status_code == 200
+
+
+def test_large_bodies_are_compressed_as_negotiated():
+    assert len(dumps(SMALL)) < COMPRESS_MIN_BYTES <= len(dumps(LARGE))
+    response = encoded_response(request(accept_encoding="gzip, deflate"), LARGE)
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == dumps(LARGE)
+    assert "content-encoding" not in encoded_response(request(accept_encoding="gzip"), SMALL).headers
+    assert "content-encoding" not in encoded_response(request(accept_encoding="gzip;q=0"), LARGE).headers
+
+
+def test_brotli_is_preferred_when_available():
+    if serialization.brotli is None:
+        pytest.skip("brotli is not installed")
+    response = encoded_response(request(accept_encoding="gzip, br"), LARGE)
+    assert response.headers["content-encoding"] == "br"
+    assert serialization.brotli.decompress(response.body) == dumps(LARGE)
+
+
+def test_msgpack_is_served_on_request():
+    msgpack = pytest.importorskip("msgpack")
+    response = encoded_response(request(accept="application/msgpack"), SMALL)
+    assert response.media_type == "application/msgpack"
+    assert msgpack.unpackb(response.body) == SMALL
+    assert encoded_response(request(accept="application/msgpack;q=0"), SMALL).media_type == "application/json"
+
+
+def test_keyed_values_are_encoded_once():
+    made = []
+
+    def make():
+        made.append(1)
+        return SMALL
+
+    first = serialization._encode(make, ("test", 1))
+    assert serialization._encode(make, ("test", 1)) is first
+    serialization._encode(make, ("test", 2))
+    assert len(made) == 2
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def run():
+        return await asyncio.gather(*(group.do_async("key", compute, 21) for _ in range(5)))
+
+    assert asyncio.run(run()) == [42] * 5
+    assert calls == [21]
+    assert group.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    group = SingleFlight("test")
+    release = None
+
+    async def compute():
+        await release.wait()
+        return "done"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.ensure_future(group.do_async("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do_async("key", compute))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+    assert group.stats()["executions"] == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_leader_timeout_leaves_follower_result():
+    group = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "slow"
+
+    async def run():
+        leader = asyncio.ensure_future(asyncio.wait_for(group.do_async("key", compute), 0.01))
+        while not group.stats()["in_flight"]:
+            await asyncio.sleep(0)
+        follower = group.do_async("key", compute)
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(run())
+    assert isinstance(leader, asyncio.TimeoutError)
+    assert follower == "slow"
+
+
+def test_errors_reach_every_caller():
+    group = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*(group.do_async("key", compute) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) and str(result) == "upstream failed" for result in results)
+    assert group.stats()["executions"] == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_call_runs_again_once_finished():
+    group = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        return [await group.do_async("key", compute), await group.do_async("key", compute)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_threaded_errors_reach_the_caller():
+    group = SingleFlight("test")
+
+    def compute():
+        raise KeyError("missing")
+
+    with pytest.raises(KeyError):
+        group.do("key", compute)
+    assert group.stats()["in_flight"] == 0
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from services import indicator_state, technical_analysis
+from services.indicator_state import INTERVAL_MS, closed_rows
+
+DAY = INTERVAL_MS["1d"]
+
+
+@pytest.fixture
+def states(monkeypatch):
+    monkeypatch.setattr(indicator_state, "_states", {})
+    monkeypatch.setattr(indicator_state, "_loaded", True)
+    monkeypatch.setattr(indicator_state, "maybe_save_states", lambda: None)
+    technical_analysis.indicator_cache.clear()
+
+
+def klines(count):
+    """`count` daily candles, the newest one still open."""
+    today = int(time.time() * 1000) // DAY * DAY
+    rng = np.random.default_rng(7)
+    return {
+        "open_time": np.array([today - (count - 1 - i) * DAY for i in range(count)], dtype=np.int64),
+        "close": 100 + np.cumsum(rng.normal(0, 2, count)),
+        "volume": rng.uniform(1e3, 1e4, count),
+    }
+
+
+def test_closed_rows_leaves_out_the_open_candle():
+    candles = klines(5)
+    assert closed_rows(candles["open_time"], "1d") == 4
+    assert closed_rows(candles["open_time"], "1d", now=time.time() + 2 * DAY / 1000) == 5
+
+
+def test_cold_and_warm_paths_agree(states, monkeypatch):
+    candles = klines(121)
+    # A wild open candle would move every indicator if it were counted
+    candles["close"][-1] = 10_000
+
+    async def get_binance_klines(symbol, interval="1d", limit=120):
+        return candles
+
+    monkeypatch.setattr(technical_analysis, "get_binance_klines", get_binance_klines)
+    cold = asyncio.run(technical_analysis.get_crypto_technical_indicator("TEST"))
+    warm = technical_analysis.get_live_indicators("TEST", is_crypto=True)
+    assert warm is not None
+    assert cold == warm
+
+
+def test_a_stale_state_is_replayed_instead_of_bridging_the_gap(states):
+    old = klines(200)
+    # Persisted weeks ago: its candles end 60 days before the fetched window starts
+    stale = {name: column[:50] for name, column in old.items()}
+    fresh = {name: column[-121:] for name, column in old.items()}
+    indicator_state.update_from_candles("GAPUSDT", "1d", stale)
+    state = indicator_state.update_from_candles("GAPUSDT", "1d", fresh)
+
+    replayed = indicator_state.IndicatorState("GAPUSDT", "1d")
+    for i in range(120):
+        replayed.update(int(fresh["open_time"][i]), float(fresh["close"][i]), float(fresh["volume"][i]))
+    assert state.count == 120
+    assert state.values() == replayed.values()
+
+
+def test_candles_that_continue_the_state_are_appended(states):
+    candles = klines(100)
+    # Sessions skip weekends: later candles still join the state through the window
+    weekdays = {name: np.delete(column, [40, 41]) for name, column in candles.items()}
+    indicator_state.update_from_candles("AAPL", "1d", {name: column[:60] for name, column in weekdays.items()})
+    state = indicator_state.update_from_candles("AAPL", "1d", {name: column[30:] for name, column in weekdays.items()})
+    assert state.count == len(weekdays["open_time"]) - 1
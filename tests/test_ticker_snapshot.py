@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from services import recommendation, ticker_snapshot
+from services.ticker_snapshot import TickerSnapshot
+
+
+def ticker(symbol, price, change, quote_volume):
+    return {"symbol": symbol, "lastPrice": str(price), "priceChangePercent": str(change),
+            "volume": "1000", "quoteVolume": str(quote_volume)}
+
+
+TICKERS = [
+    ticker("BTCUSDT", 60000, 1.5, 9e9),
+    ticker("ETHUSDT", 3000, -2.0, 5e9),
+    ticker("BNBUSDT", 500, 0.5, 1e9),
+    ticker("SOLUSDT", 150, 3.0, 2e9),
+    ticker("DOGEUSDT", 0.1, -1.0, 8e8),
+    ticker("ETHBTC", 0.05, 0.1, 7e9),
+]
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    snapshot = TickerSnapshot(TICKERS)
+    monkeypatch.setattr(ticker_snapshot, "_snapshot", snapshot)
+    return snapshot
+
+
+def test_snapshot_indexes_prices_and_ranks_by_quote_volume(snapshot):
+    assert snapshot.get("ethusdt")["price"] == 3000
+    assert snapshot.get("XRPUSDT") is None
+    assert snapshot.top_by_volume(3) == ["BTC", "ETH", "SOL"]
+
+
+def test_crypto_recommendations_come_from_one_snapshot(snapshot, monkeypatch):
+    scanned = []
+
+    async def analyze(symbol):
+        scanned.append(symbol)
+        return {"symbol": symbol, "final_signal": "Buy" if symbol == "SOL" else "Hold",
+                "positive_sentiment": 0.5, "technical_indicators": {"RSI": 50}}
+
+    monkeypatch.setattr(recommendation, "analyze_crypto_strategy", analyze)
+    result = asyncio.run(recommendation.recommend_top_cryptos(count=2))
+    # The ranking and every price are read from the snapshot, without further requests
+    assert sorted(scanned) == ["BNB", "BTC", "DOGE", "ETH", "SOL"]
+    assert [item["symbol"] for item in result] == ["SOL", "BTC"]
+    assert result[0]["price"] == 150 and result[0]["change_percent"] == 3.0
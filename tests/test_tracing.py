@@ -0,0 +1,31 @@
+import os
+
+from services import tracing
+from services.tracing import Profile, debug_allowed
+
+
+def test_debug_headers_are_off_by_default(monkeypatch):
+    monkeypatch.setattr(tracing, "DEBUG_TRACING", False)
+    monkeypatch.setattr(tracing, "DEBUG_TOKEN", None)
+    assert not debug_allowed(b"1")
+
+    monkeypatch.setattr(tracing, "DEBUG_TRACING", True)
+    assert debug_allowed(b"1")
+    assert not debug_allowed(b"0")
+
+
+def test_debug_token_must_match(monkeypatch):
+    monkeypatch.setattr(tracing, "DEBUG_TRACING", False)
+    monkeypatch.setattr(tracing, "DEBUG_TOKEN", "s3cret")
+    assert debug_allowed(b" s3cret ")
+    assert not debug_allowed(b"1")
+    assert not debug_allowed(b"")
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    paths = []
+    for i in range(4):
+        path = Profile(f"GET /item/{i}").save(str(tmp_path), keep=2)
+        os.utime(path, (i, i))  # saved within the same second
+        paths.append(path)
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths[2:])